@@ -0,0 +1,79 @@
+"""
+Conditional GET for detail endpoints.
+
+``ConditionalRetrieveMixin`` answers ``If-None-Match`` and
+``If-Modified-Since`` with ``304 Not Modified`` before the object is loaded
+and serialized. The validators are derived from a single ``.values()`` row:
+
+- ``conditional_fields`` (or ``get_conditional_fields()``, for views with
+  sparse fieldsets) lists the lookups whose values determine the
+  representation: ``updated_at`` plus versions of related data, such as
+  counters or the latest change to a related table, annotated by
+  ``get_conditional_queryset``. The ETag is a hash of those values, the
+  accepted format and the query string.
+- ``last_modified_field`` names a timestamp that every change to the
+  representation advances. Views leave it unset when some changes, such as
+  a counter decrement, leave no timestamp behind; they are then validated
+  by ETag only.
+
+The 304 is sent without calling ``get_object``, so views whose object
+permissions restrict reads must not use this mixin.
+"""
+
+import hashlib
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+
+class ConditionalRetrieveMixin:
+    """Serve ``retrieve`` with ETag/Last-Modified validators and 304 responses."""
+
+    conditional_fields = ('updated_at',)
+    last_modified_field = None
+
+    def get_conditional_fields(self):
+        return self.conditional_fields
+
+    def get_conditional_queryset(self):
+        """Return the queryset validators are read from; annotate related-change versions here."""
+        return self.get_queryset()
+
+    def get_conditional_state(self):
+        """Return the values the representation depends on, or None if the object does not exist."""
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        queryset = self.get_conditional_queryset().filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        self.validator_fields = self.get_conditional_fields()
+        return queryset.prefetch_related(None).values(*self.validator_fields).first()
+
+    def get_etag(self, state):
+        parts = [
+            self.request.accepted_renderer.format,
+            self.request.META.get('QUERY_STRING', ''),
+            *(str(state[field]) for field in self.validator_fields),
+        ]
+        return quote_etag(hashlib.md5('|'.join(parts).encode('utf-8')).hexdigest())
+
+    def get_last_modified(self, state):
+        if self.last_modified_field is None:
+            return None
+        return state[self.last_modified_field]
+
+    def retrieve(self, request, *args, **kwargs):
+        state = self.get_conditional_state()
+        if state is None:
+            # Let the regular path raise the 404
+            return super().retrieve(request, *args, **kwargs)
+        etag = self.get_etag(state)
+        last_modified = self.get_last_modified(state)
+        timestamp = int(last_modified.timestamp()) if last_modified is not None else None
+
+        response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+        if response is None:
+            response = super().retrieve(request, *args, **kwargs)
+        response['ETag'] = etag
+        if timestamp is not None:
+            response['Last-Modified'] = http_date(timestamp)
+        # Clients may keep the body but must revalidate before reusing it
+        response['Cache-Control'] = 'no-cache'
+        return response
@@ -0,0 +1,88 @@
+"""
+JSON rendering for large responses.
+
+``FastJSONRenderer`` encodes with orjson when it is installed and falls
+back to DRF's ``JSONRenderer`` otherwise. It encodes the same values as
+DRF: types orjson would format differently (datetimes, dataclasses) and
+those it does not know (decimals, lazy strings, ...) go through DRF's
+encoder, and requests for indented or ASCII-only output use DRF's renderer.
+Only the spelling of some floats differs, e.g. ``1e16`` for ``1e+16``.
+
+``StreamingListMixin`` makes a generic list view send its results as a JSON
+array written in chunks while the queryset is read with ``.iterator()``
+whenever pagination is disabled (no ``pagination_class`` or no page size).
+Neither the model instances nor the encoded payload are then held in memory
+all at once, so memory use does not grow with the number of results.
+"""
+
+from django.http import StreamingHttpResponse
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """``JSONRenderer`` using orjson when it is installed."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None
+            or data is None
+            or self.ensure_ascii
+            or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {})
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(
+                data,
+                default=self.encoder_class().default,
+                option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS,
+            )
+        except orjson.JSONEncodeError:
+            # e.g. integers beyond 64 bits, which the standard library encodes
+            return super().render(data, accepted_media_type, renderer_context)
+        # Escaped by DRF too, as they are not valid in JavaScript string literals
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+
+
+class StreamingListMixin:
+    """
+    Stream the ``list`` response of a generic view when it is not paginated.
+
+    Instances are serialized and encoded ``stream_chunk_size`` at a time.
+    Clients that negotiated another format, such as the browsable API, get
+    a regular response.
+    """
+
+    stream_chunk_size = 500
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+        if request.accepted_renderer.format != 'json':
+            return Response(self.get_serializer(queryset, many=True).data)
+        return StreamingHttpResponse(self.stream_chunks(queryset), content_type='application/json')
+
+    def stream_chunks(self, queryset):
+        renderer = FastJSONRenderer()
+        yield b'['
+        separator = b''
+        batch = []
+        for instance in queryset.iterator(chunk_size=self.stream_chunk_size):
+            batch.append(instance)
+            if len(batch) == self.stream_chunk_size:
+                # Render the batch as an array and drop its brackets
+                yield separator + renderer.render(self.get_serializer(batch, many=True).data)[1:-1]
+                separator = b','
+                batch = []
+        if batch:
+            yield separator + renderer.render(self.get_serializer(batch, many=True).data)[1:-1]
+        yield b']'
@@ -0,0 +1,14 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .caching import invalidate_model
+from .models import Author, Book
+
+
+@receiver([post_save, post_delete], sender=Author)
+@receiver([post_save, post_delete], sender=Book)
+def invalidate_cached_lists(sender, **kwargs):
+    """
+    Invalidate cached list payloads built from the changed model.
+    """
+    invalidate_model(sender)
@@ -1,3 +1,6 @@
+import json
+from unittest import mock
+
 from django.test import TestCase, Client
 from django.urls import reverse
 from django.contrib.auth import get_user_model
@@ -7,7 +10,9 @@ from rest_framework.test import APITestCase, APIClient
 from rest_framework.authtoken.models import Token
 from rest_framework.authtoken.views import ObtainAuthToken
 from django.db.models import Count
+from api.caching import get_cache, get_stats, reset_stats
 from api.models import Author, Book
+from api.views import AuthorListCreateView
 
 
 class BaseTestCase(APITestCase):
@@ -364,3 +369,85 @@ class ValidationTestCase(BaseTestCase):
         response = self.authenticated_client.post(self.author_list_url, data)
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
         self.assertIn('name', response.data)
+
+
+class ListCachingTestCase(BaseTestCase):
+    """Test cases for cached list responses."""
+
+    def setUp(self):
+        super().setUp()
+        get_cache().clear()
+        reset_stats()
+
+    def test_repeated_list_is_served_from_cache(self):
+        """Test that a repeated anonymous list request is a cache hit."""
+        self.client.logout()
+        first = self.client.get(f"{self.book_list_url}?ordering=title&search=the")
+        second = self.client.get(f"{self.book_list_url}?search=the&ordering=title")
+        self.assertEqual(first['X-Cache'], 'MISS')
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(first.data, second.data)
+        self.assertEqual(get_stats()['hits'], 1)
+
+    def test_writes_invalidate_cached_lists(self):
+        """Test that saving a book or renaming an author invalidates both lists."""
+        self.client.get(self.book_list_url)
+        self.client.get(self.author_list_url)
+        Book.objects.create(title='The Silmarillion', publication_year=1977, author=self.author1)
+        response = self.client.get(self.author_list_url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['results'][1]['book_count'], 3)
+
+        self.author2.name = 'G. R. R. Martin'
+        self.author2.save()
+        response = self.client.get(self.book_list_url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+
+
+class StreamingListTestCase(BaseTestCase):
+    """Test cases for streamed list responses."""
+
+    def test_unpaginated_author_list_is_streamed(self):
+        """Test that the author list streams nested books when pagination is disabled."""
+        get_cache().clear()
+        with mock.patch.object(AuthorListCreateView, 'pagination_class', None), \
+                mock.patch.object(AuthorListCreateView, 'stream_chunk_size', 1):
+            response = self.client.get(self.author_list_url)
+        self.assertTrue(response.streaming)
+        authors = json.loads(b''.join(response.streaming_content))
+        self.assertEqual([author['name'] for author in authors], ['George R.R. Martin', 'J.R.R. Tolkien'])
+        self.assertEqual([author['book_count'] for author in authors], [1, 2])
+        self.assertEqual(len(authors[1]['books']), 2)
+
+
+class ConditionalGetTestCase(BaseTestCase):
+    """Test cases for conditional GETs of books and authors."""
+
+    def test_unchanged_book_is_not_resent(self):
+        """Test that a book answers If-None-Match and If-Modified-Since with 304 until it changes."""
+        self.client.logout()
+        url = self.book_detail_url(self.book1.id)
+        response = self.client.get(url)
+        etag, last_modified = response['ETag'], response['Last-Modified']
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.book1.title = 'The Hobbit, or There and Back Again'
+        self.book1.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['title'], 'The Hobbit, or There and Back Again')
+
+    def test_author_etag_follows_books(self):
+        """Test that deleting one of an author's books changes the author's ETag."""
+        url = self.author_detail_url(self.author1.id)
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_304_NOT_MODIFIED)
+        self.book2.delete()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['book_count'], 1)
+        self.assertEqual(self.client.get(self.author_detail_url(999)).status_code, status.HTTP_404_NOT_FOUND)
@@ -2,16 +2,22 @@ from rest_framework import generics, filters, permissions
 from rest_framework.permissions import IsAuthenticatedOrReadOnly, IsAuthenticated
 from django_filters import rest_framework as django_filters
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Q
+from django.db.models import Count, Max, Q
+from django.http import Http404
+from .caching import CachedListMixin
+from .conditional import ConditionalRetrieveMixin
+from .renderers import StreamingListMixin
 from .models import Author, Book
 from .serializers import AuthorSerializer, BookSerializer
 
 
-class ListView(generics.ListAPIView):
+class ListView(CachedListMixin, generics.ListAPIView):
     """
     A ListView for retrieving all books.
     Provides filtering, searching, and ordering capabilities.
+    Responses are cached until a book or author changes.
     """
+    cache_dependencies = (Book, Author)
     queryset = Book.objects.all()
     serializer_class = BookSerializer
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
@@ -60,14 +66,18 @@ class ListView(generics.ListAPIView):
         return queryset
 
 
-class DetailView(generics.RetrieveAPIView):
+class DetailView(ConditionalRetrieveMixin, generics.RetrieveAPIView):
     """
     A DetailView for retrieving a single book by ID.
+    Answers conditional requests with 304 while the book is unchanged.
     """
     queryset = Book.objects.select_related('author').all()
     serializer_class = BookSerializer
     lookup_field = 'pk'
     permission_classes = [permissions.AllowAny]
+    # The author is rendered as its id, so the book's own timestamp covers every change
+    conditional_fields = ('updated_at',)
+    last_modified_field = 'updated_at'
 
 
 class CreateView(generics.CreateAPIView):
@@ -102,11 +112,12 @@ class DeleteView(generics.DestroyAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
 
-class AuthorListCreateView(generics.ListCreateAPIView):
+class AuthorListCreateView(CachedListMixin, StreamingListMixin, generics.ListCreateAPIView):
     """
     API endpoint that allows authors to be viewed or created.
     
-    - GET: List all authors with their books (public access)
+    - GET: List all authors with their books (public access, cached until
+      an author or book changes; streamed instead when pagination is disabled)
         - Query parameters:
             - search: Search in author name
             - ordering: Sort by name or book_count (default: name)
@@ -114,6 +125,7 @@ class AuthorListCreateView(generics.ListCreateAPIView):
     """
     queryset = Author.objects.prefetch_related('books').all()
     serializer_class = AuthorSerializer
+    cache_dependencies = (Author, Book)
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['name']
     ordering_fields = ['name', 'book_count']
@@ -136,11 +148,12 @@ class AuthorListCreateView(generics.ListCreateAPIView):
         return {'request': self.request}
 
 
-class AuthorDetailView(generics.RetrieveUpdateDestroyAPIView):
+class AuthorDetailView(ConditionalRetrieveMixin, generics.RetrieveUpdateDestroyAPIView):
     """
     API endpoint that allows a single author to be viewed, updated or deleted.
     
-    - GET: View author details with their books (public access)
+    - GET: View author details with their books (public access; answers
+      conditional requests with 304 while the author and books are unchanged)
     - PUT/PATCH: Update author (requires authentication)
     - DELETE: Remove author (requires authentication)
     
@@ -150,6 +163,8 @@ class AuthorDetailView(generics.RetrieveUpdateDestroyAPIView):
     queryset = Author.objects.prefetch_related('books').all()
     serializer_class = AuthorSerializer
     lookup_field = 'pk'
+    # A deleted book leaves no timestamp behind, so the count is part of the ETag
+    conditional_fields = ('updated_at', 'book_count', 'books_changed_at')
     
     def get_permissions(self):
         """
@@ -161,6 +176,12 @@ class AuthorDetailView(generics.RetrieveUpdateDestroyAPIView):
             return [permissions.AllowAny()]
         return [permissions.IsAuthenticated()]
         
+    def get_conditional_queryset(self):
+        """
+        Annotate the versions of the author's books.
+        """
+        return Author.objects.annotate(book_count=Count('books'), books_changed_at=Max('books__updated_at'))
+
     def get_object(self):
         """
         Get the author object or return 404 if not found.
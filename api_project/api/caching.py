@@ -0,0 +1,161 @@
+"""
+Response caching for read-heavy list endpoints.
+
+``CachedListMixin`` stores the serialized payload of a generic view's ``list``
+response in a Django cache. Keys are built from:
+
+- the view's namespace (its module and class name),
+- the request's query parameters, normalized so that parameter order and
+  repeated values do not create duplicate entries,
+- the user scope (shared by default, or one entry per user when
+  ``cache_per_user`` is set),
+- a version number for every model in ``cache_dependencies``.
+
+Saving or deleting an instance of a dependency bumps that model's version
+(see ``api.signals``), which makes every stale entry unreachable without
+having to enumerate or delete keys.
+
+Settings:
+
+- ``API_CACHE_ALIAS``: cache alias to use (default: ``'default'``).
+- ``API_CACHE_TIMEOUT``: seconds to keep a payload (default: 300).
+
+This module is a copy of ``advanced-api-project/api/caching.py``, the
+canonical version; change both together.
+"""
+
+import hashlib
+import threading
+import time
+from collections import Counter
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.response import Response
+
+VERSION_KEY_PREFIX = 'api-cache-version'
+PAYLOAD_KEY_PREFIX = 'api-cache'
+
+_stats = Counter()
+_stats_lock = threading.Lock()
+
+
+def get_cache():
+    return caches[getattr(settings, 'API_CACHE_ALIAS', 'default')]
+
+
+def _version_key(model):
+    return f'{VERSION_KEY_PREFIX}:{model._meta.label_lower}'
+
+
+def _initial_version():
+    # Seeded from the clock so an evicted version key never comes back with a
+    # number that older, still-cached payloads were stored under.
+    return int(time.time() * 1000)
+
+
+def get_versions(models):
+    """Return the current cache version of each model, in order."""
+    cache = get_cache()
+    keys = [_version_key(model) for model in models]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            # add() is a no-op if another process initialized the key meanwhile
+            cache.add(key, _initial_version(), timeout=None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def invalidate_model(model):
+    """Invalidate every cached payload that depends on ``model``."""
+    cache = get_cache()
+    key = _version_key(model)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, _initial_version(), timeout=None)
+
+
+def record(event):
+    with _stats_lock:
+        _stats[event] += 1
+
+
+def get_stats():
+    """Return hit/miss counters for this process."""
+    with _stats_lock:
+        hits, misses = _stats['hit'], _stats['miss']
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': hits / total if total else 0.0,
+    }
+
+
+def reset_stats():
+    with _stats_lock:
+        _stats.clear()
+
+
+class CachedListMixin:
+    """
+    Cache the serialized ``list`` payload of a DRF generic view.
+
+    Views declare the models their output is built from in
+    ``cache_dependencies``; writes to any of them invalidate the cache.
+    """
+
+    cache_dependencies = ()
+    cache_timeout = None
+    cache_per_user = False
+
+    def get_cache_timeout(self):
+        if self.cache_timeout is not None:
+            return self.cache_timeout
+        return getattr(settings, 'API_CACHE_TIMEOUT', 300)
+
+    def get_cache_scope(self, request):
+        if not self.cache_per_user:
+            return 'public'
+        if request.user.is_authenticated:
+            return f'user:{request.user.pk}'
+        return 'anon'
+
+    def get_cache_key(self, request):
+        params = sorted(
+            (key, value)
+            for key in request.query_params
+            for value in sorted(request.query_params.getlist(key))
+        )
+        query = urlencode(params)
+        versions = get_versions(self.cache_dependencies or (self.get_queryset().model,))
+        raw = '|'.join([
+            f'{type(self).__module__}.{type(self).__name__}',
+            # Pagination links are absolute URLs, so the host is part of the payload
+            request.get_host(),
+            self.get_cache_scope(request),
+            query,
+            ','.join(str(version) for version in versions),
+        ])
+        return f'{PAYLOAD_KEY_PREFIX}:{hashlib.md5(raw.encode("utf-8")).hexdigest()}'
+
+    def list(self, request, *args, **kwargs):
+        cache = get_cache()
+        key = self.get_cache_key(request)
+        payload = cache.get(key)
+        if payload is not None:
+            record('hit')
+            response = Response(payload)
+            response['X-Cache'] = 'HIT'
+            return response
+
+        record('miss')
+        response = super().list(request, *args, **kwargs)
+        # Streamed lists are not held in memory, so there is no payload to store
+        if response.status_code == 200 and not response.streaming:
+            cache.set(key, response.data, self.get_cache_timeout())
+        response['X-Cache'] = 'MISS'
+        return response
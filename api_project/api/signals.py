@@ -0,0 +1,13 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .caching import invalidate_model
+from .models import Book
+
+
+@receiver([post_save, post_delete], sender=Book)
+def invalidate_cached_lists(sender, **kwargs):
+    """
+    Invalidate cached book lists whenever a book changes.
+    """
+    invalidate_model(sender)
@@ -1,3 +1,35 @@
-from django.test import TestCase
+from rest_framework.test import APITestCase
 
-# Create your tests here.
+from .caching import get_cache, get_stats, reset_stats
+from .models import Book
+
+
+class BookListCachingTestCase(APITestCase):
+    """Test cases for the cached book list."""
+
+    def setUp(self):
+        get_cache().clear()
+        reset_stats()
+        Book.objects.create(title='Dune', author='Frank Herbert')
+
+    def test_repeated_list_is_served_from_cache(self):
+        """Test that a repeated list request is a cache hit, whatever the parameter order."""
+        first = self.client.get('/api/books/?page=1&format=json')
+        second = self.client.get('/api/books/?format=json&page=1')
+        self.assertEqual(first['X-Cache'], 'MISS')
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(first.data, second.data)
+        self.assertEqual(get_stats()['hits'], 1)
+
+    def test_book_changes_invalidate_cached_list(self):
+        """Test that saving or deleting a book invalidates the cached list."""
+        self.client.get('/api/books/')
+        book = Book.objects.create(title='Emma', author='Jane Austen')
+        response = self.client.get('/api/books/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['count'], 2)
+
+        book.delete()
+        response = self.client.get('/api/books/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['count'], 1)
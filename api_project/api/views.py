@@ -3,6 +3,7 @@ from rest_framework.response import Response
 from rest_framework.reverse import reverse
 from rest_framework.decorators import api_view, action
 
+from .caching import CachedListMixin
 from .models import Book
 from .serializers import BookSerializer
 
@@ -18,16 +19,18 @@ def api_root(request, format=None):
         }
     })
 
-class BookList(generics.ListAPIView):
+class BookList(CachedListMixin, generics.ListAPIView):
     """
     API endpoint that allows books to be viewed.
     Any user (authenticated or not) can view the list of books.
+    Responses are cached until a book changes.
     """
     queryset = Book.objects.all()
+    cache_dependencies = (Book,)
     serializer_class = BookSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
 
-class BookViewSet(viewsets.ModelViewSet):
+class BookViewSet(CachedListMixin, viewsets.ModelViewSet):
     """
     API endpoint that allows books to be viewed or edited.
     Provides full CRUD operations for the Book model.
@@ -38,6 +41,7 @@ class BookViewSet(viewsets.ModelViewSet):
     """
     queryset = Book.objects.all().order_by('-id')
     serializer_class = BookSerializer
+    cache_dependencies = (Book,)
     
     def get_permissions(self):
         """
@@ -0,0 +1,200 @@
+"""
+Page and fragment caching for the blog.
+
+Rendered post lists and post pages are stored in a Django cache under keys
+that include *version stamps*:
+
+- ``post:<pk>`` for everything a post page shows: the post, its tags and
+  its comments;
+- ``posts`` for every listing page (home, tag and search pages);
+- ``tags`` for tag usage: the tag list page and popular tags.
+
+``blog.signals`` bumps the stamps when a post, comment or tag is saved or
+deleted, or a post's tags change, which makes every stale entry unreachable
+without enumerating keys. Listing pages also cache each post's entry as a
+fragment keyed by its ``post:<pk>`` stamp, so a page rebuilt after one post
+changed re-renders only that post.
+
+Cached pages are shared by all readers. Parts that depend on the reader
+(navigation links, messages, edit buttons, the comment form) are "holes":
+the ``{% hole %}`` tag from ``blog_cache`` leaves a placeholder in a cached
+page and ``fill_holes`` renders ``blog/holes/<name>.html`` into it for each
+request. Anonymous readers are served without touching the database.
+
+Settings:
+
+- ``BLOG_CACHE_ALIAS``: cache alias to use (default: ``"default"``).
+- ``BLOG_CACHE_TIMEOUT``: seconds to keep a page or fragment (default: 3600).
+"""
+
+import hashlib
+import json
+import re
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.template.loader import render_to_string
+
+VERSION_KEY_PREFIX = "blog-cache-version"
+PAGE_KEY_PREFIX = "blog-page"
+LIST_SCOPE = "posts"
+TAG_SCOPE = "tags"
+# Autoescaped user content cannot produce "<!--", so placeholders cannot be forged
+HOLE_RE = re.compile(r"<!--blog-hole:(\w+):(\{.*?\})-->")
+
+
+def get_cache_alias():
+    return getattr(settings, "BLOG_CACHE_ALIAS", "default")
+
+
+def get_cache():
+    return caches[get_cache_alias()]
+
+
+def get_timeout():
+    return getattr(settings, "BLOG_CACHE_TIMEOUT", 3600)
+
+
+def post_scope(pk):
+    return f"post:{pk}"
+
+
+def _version_key(scope):
+    return f"{VERSION_KEY_PREFIX}:{scope}"
+
+
+def _initial_version():
+    # Seeded from the clock so an evicted stamp never returns to a number
+    # that older, still-cached entries were stored under.
+    return int(time.time() * 1000)
+
+
+def get_versions(scopes):
+    """Return the current version stamp of each scope, in order."""
+    cache = get_cache()
+    keys = [_version_key(scope) for scope in scopes]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            # add() is a no-op if another process initialized the key meanwhile
+            cache.add(key, _initial_version(), timeout=None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def bump(scopes):
+    """Invalidate every cached page and fragment built from ``scopes``."""
+    cache = get_cache()
+    for scope in scopes:
+        key = _version_key(scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, _initial_version(), timeout=None)
+
+
+def attach_versions(posts):
+    """Set ``cache_version`` on each post, for fragment cache keys."""
+    posts = list(posts)
+    for post, version in zip(posts, get_versions([post_scope(post.pk) for post in posts])):
+        post.cache_version = version
+    return posts
+
+
+def hole_placeholder(name, params):
+    # Escaping ">" keeps values such as paths from closing the comment early
+    encoded = json.dumps(params, sort_keys=True).replace(">", "\\u003e")
+    return f"<!--blog-hole:{name}:{encoded}-->"
+
+
+def render_hole(request, name, params):
+    from .holes import HOLE_CONTEXT
+
+    context = dict(params)
+    if name in HOLE_CONTEXT:
+        context.update(HOLE_CONTEXT[name](request, **params))
+    return render_to_string(f"blog/holes/{name}.html", context, request=request)
+
+
+def fill_holes(html, request):
+    """Render the reader-specific parts of a cached page for ``request``."""
+    return HOLE_RE.sub(lambda match: render_hole(request, match[1], json.loads(match[2])), html)
+
+
+class CachedPageMixin:
+    """
+    Serve a ``TemplateView``-style page from the blog cache.
+
+    Views return the version scopes their page depends on from
+    ``get_cache_scopes`` and list the query parameters it reads in
+    ``cache_params``; only those make up the cache key. Requests carrying
+    any other parameter, a repeated one or a ``page`` that is not a plain
+    number are rendered without the cache. Only successful ``GET``
+    responses are stored, so values the view rejects (an unknown page, a
+    forged comments cursor) are not stored either. Free-form values such as
+    search queries are left out of ``cache_params``: every distinct value
+    would be a new entry.
+    """
+
+    cache_params = ()
+
+    def get_cache_variant(self, request):
+        """Return a label for pages one URL renders differently, e.g. as a fragment and as a full page."""
+        return ""
+
+    def is_cacheable(self, request):
+        for key, values in request.GET.lists():
+            if key not in self.cache_params or len(values) > 1:
+                return False
+            # "07" and "7" are the same page; only the canonical spelling is cached
+            if key == "page" and not (values[0].isdigit() and str(int(values[0])) == values[0]):
+                return False
+        return True
+
+    def get_cache_scopes(self):
+        return [LIST_SCOPE]
+
+    def get_page_cache_key(self, request):
+        """Return the cache key of ``request``'s page, or None if it must not be cached."""
+        if not self.is_cacheable(request):
+            return None
+        params = sorted(request.GET.items())
+        versions = get_versions(self.get_cache_scopes())
+        raw = "|".join([
+            f"{type(self).__module__}.{type(self).__name__}",
+            request.path,
+            self.get_cache_variant(request),
+            urlencode(params),
+            ",".join(str(version) for version in versions),
+        ])
+        return f"{PAGE_KEY_PREFIX}:{hashlib.md5(raw.encode('utf-8')).hexdigest()}"
+
+    def get(self, request, *args, **kwargs):
+        cache = get_cache()
+        key = self.get_page_cache_key(request)
+        if key is None:
+            response = super().get(request, *args, **kwargs)
+            response["X-Cache"] = "BYPASS"
+            return response
+        html = cache.get(key)
+        if html is None:
+            # Holes render as placeholders while the shared page is built
+            request.blog_page_cache = True
+            try:
+                response = super().get(request, *args, **kwargs)
+                response.render()
+            finally:
+                del request.blog_page_cache
+            if response.status_code != 200:
+                return response
+            html = response.content.decode(response.charset)
+            cache.set(key, html, get_timeout())
+            cache_status = "MISS"
+        else:
+            cache_status = "HIT"
+        response = HttpResponse(fill_holes(html, request))
+        response["X-Cache"] = cache_status
+        return response
@@ -0,0 +1,123 @@
+"""
+Paginated, threaded comments.
+
+Top-level comments are shown newest first, ``BLOG_COMMENTS_PER_PAGE`` at a
+time, each with its first ``BLOG_COMMENT_REPLIES`` replies, oldest first.
+Pages are addressed by a keyset cursor (the last comment's ``created_at``
+and pk) instead of an offset, so any page costs the same to read. Cursors
+are signed: only those the pages hand out are accepted, so clients cannot
+make up new ones to fill the page cache.
+
+``load_thread`` reads a page with one query: the page's top-level comments
+and their first replies, ranked per parent with a window function, then
+assembles the thread in Python. ``load_replies`` pages through the rest of a
+comment's replies.
+
+Settings:
+
+- ``BLOG_COMMENTS_PER_PAGE``: top-level comments per page (default: 20).
+- ``BLOG_COMMENT_REPLIES``: replies shown with each comment (default: 5).
+"""
+
+from collections import defaultdict
+from datetime import datetime
+
+from django.conf import settings
+from django.core.signing import BadSignature, Signer
+from django.db.models import Count, F, Q, Window
+from django.db.models.functions import RowNumber
+from django.http import Http404
+
+from .models import Comment
+
+DEFAULT_COMMENTS_PER_PAGE = 20
+DEFAULT_COMMENT_REPLIES = 5
+
+
+def get_comments_per_page():
+    return getattr(settings, "BLOG_COMMENTS_PER_PAGE", DEFAULT_COMMENTS_PER_PAGE)
+
+
+def get_comment_replies():
+    return getattr(settings, "BLOG_COMMENT_REPLIES", DEFAULT_COMMENT_REPLIES)
+
+
+CURSOR_SIGNER = Signer(salt="blog.comments.cursor")
+
+
+def encode_cursor(comment):
+    return CURSOR_SIGNER.sign(f"{comment.created_at.isoformat()}~{comment.pk}")
+
+
+def decode_cursor(cursor):
+    """Return the ``(created_at, pk)`` position of ``cursor``; raise Http404 if it is malformed or forged."""
+    try:
+        created_at, pk = CURSOR_SIGNER.unsign(cursor).rsplit("~", 1)
+        return datetime.fromisoformat(created_at), int(pk)
+    except (BadSignature, ValueError):
+        raise Http404("Invalid comments cursor")
+
+
+def _after(cursor, descending):
+    """Filter for the comments that follow ``cursor`` in (created_at, pk) order."""
+    created_at, pk = decode_cursor(cursor)
+    if descending:
+        return Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk)
+    return Q(created_at__gt=created_at) | Q(created_at=created_at, pk__gt=pk)
+
+
+def load_thread(post, cursor=None):
+    """
+    Return a page of ``post``'s top-level comments and the cursor of the next page.
+
+    Each comment carries ``reply_list``, its first replies, and, when it has
+    more, ``more_replies`` (how many) and ``replies_cursor``.
+    """
+    per_page = get_comments_per_page()
+    reply_limit = get_comment_replies()
+    top_level = Comment.objects.filter(post=post, parent=None)
+    if cursor:
+        top_level = top_level.filter(_after(cursor, descending=True))
+    # One more than a page tells whether there is a next one
+    page = top_level.order_by("-created_at", "-pk").values("pk")[: per_page + 1]
+
+    rows = (
+        Comment.objects.filter(Q(pk__in=page) | Q(parent__in=page))
+        .select_related("author")
+        .annotate(
+            position=Window(RowNumber(), partition_by=F("parent_id"), order_by=[F("created_at").asc(), F("pk").asc()]),
+            sibling_count=Window(Count("pk"), partition_by=F("parent_id")),
+        )
+        # Window filters apply after ranking, so each parent keeps its first replies
+        .filter(Q(parent=None) | Q(position__lte=reply_limit))
+        .order_by()
+    )
+
+    comments = []
+    replies = defaultdict(list)
+    for comment in rows:
+        if comment.parent_id is None:
+            comments.append(comment)
+        else:
+            replies[comment.parent_id].append(comment)
+    comments.sort(key=lambda comment: (comment.created_at, comment.pk), reverse=True)
+    next_cursor = encode_cursor(comments[per_page - 1]) if len(comments) > per_page else None
+
+    comments = comments[:per_page]
+    for comment in comments:
+        comment.reply_list = sorted(replies[comment.pk], key=lambda reply: reply.position)
+        comment.more_replies = comment.reply_list[-1].sibling_count - len(comment.reply_list) if comment.reply_list else 0
+        comment.replies_cursor = encode_cursor(comment.reply_list[-1]) if comment.more_replies else None
+    return comments, next_cursor
+
+
+def load_replies(parent, cursor=None):
+    """Return the next ``BLOG_COMMENTS_PER_PAGE`` replies to ``parent`` after ``cursor``, oldest first."""
+    per_page = get_comments_per_page()
+    replies = parent.replies.select_related("author").order_by("created_at", "pk")
+    if cursor:
+        replies = replies.filter(_after(cursor, descending=False))
+    replies = list(replies[: per_page + 1])
+    next_cursor = encode_cursor(replies[per_page - 1]) if len(replies) > per_page else None
+    return replies[:per_page], next_cursor
+
@@ -0,0 +1,8 @@
+from django.utils.functional import SimpleLazyObject
+
+from .tags import get_popular_tags
+
+
+def popular_tags(request):
+    """Add the most used tags as ``popular_tags``, read only when a template uses them."""
+    return {"popular_tags": SimpleLazyObject(get_popular_tags)}
@@ -1,7 +1,8 @@
 from django import forms
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.models import User
-from .models import Post, Comment, Tag
+from .models import Post, Comment
+from .tags import MAX_TAG_LENGTH, parse_tag_names, set_post_tags
 
 
 class TagWidget(forms.TextInput):
@@ -50,24 +51,28 @@ class PostForm(forms.ModelForm):
         model = Post
         fields = ("title", "content")
 
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        # Prefill tags_csv for edit form
-        if self.instance and self.instance.pk:
-            current = self.instance.tags.values_list("name", flat=True)
-            self.fields["tags_csv"].initial = ", ".join(current)
+    def get_initial_for_field(self, field, field_name):
+        # Read the current tags only when an unbound edit form is rendered,
+        # not when an edit is submitted
+        if field_name == "tags_csv" and self.instance.pk and field_name not in self.initial:
+            return ", ".join(tag.name for tag in self.instance.tags.all())
+        return super().get_initial_for_field(field, field_name)
+
+    def clean_tags_csv(self):
+        names = parse_tag_names(self.cleaned_data.get("tags_csv", ""))
+        too_long = [name for name in names if len(name) > MAX_TAG_LENGTH]
+        if too_long:
+            raise forms.ValidationError(
+                "Tags can have at most %(max)d characters: %(names)s",
+                params={"max": MAX_TAG_LENGTH, "names": ", ".join(too_long)},
+            )
+        return names
 
     def save(self, commit=True):
         post = super().save(commit=commit)
         # Defer M2M until post is saved
         def _save_tags():
-            raw = self.cleaned_data.get("tags_csv", "")
-            names = [t.strip() for t in raw.split(",") if t.strip()]
-            tags = []
-            for name in names:
-                tag, _ = Tag.objects.get_or_create(name=name)
-                tags.append(tag)
-            post.tags.set(tags)
+            set_post_tags(post, self.cleaned_data.get("tags_csv", []))
 
         if commit:
             _save_tags()
@@ -80,7 +85,23 @@ class PostForm(forms.ModelForm):
 class CommentForm(forms.ModelForm):
     class Meta:
         model = Comment
-        fields = ("content",)
+        fields = ("content", "parent")
         widgets = {
             "content": forms.Textarea(attrs={"rows": 3, "placeholder": "Write your comment..."}),
+            "parent": forms.HiddenInput(),
         }
+
+    def __init__(self, *args, post=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if post is None:
+            # Only new comments choose what they reply to
+            del self.fields["parent"]
+        else:
+            self.fields["parent"].queryset = post.comments.all()
+
+    def clean_parent(self):
+        # Threads are one level deep: a reply to a reply answers its parent
+        parent = self.cleaned_data.get("parent")
+        if parent is not None and parent.parent_id is not None:
+            return parent.parent
+        return parent
@@ -0,0 +1,24 @@
+"""
+Context for the reader-specific parts ("holes") of cached blog pages.
+
+Each hole renders ``blog/holes/<name>.html`` with the parameters given to
+``{% hole %}``; holes that need more than the request and those parameters
+provide it here. See ``blog.caching``.
+"""
+
+from .forms import CommentForm
+
+
+def comment_form(request, **params):
+    return {"comment_form": CommentForm()}
+
+
+def reply_form(request, **params):
+    # A page has one reply form per comment, so their fields get no ids
+    return {"comment_form": CommentForm(auto_id=False)}
+
+
+HOLE_CONTEXT = {
+    "comment_form": comment_form,
+    "reply_form": reply_form,
+}
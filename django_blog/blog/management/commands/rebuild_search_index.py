@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from blog import search
+from blog.models import Post
+
+
+class Command(BaseCommand):
+    help = "Rebuild the blog's full-text search index."
+
+    def handle(self, *args, **options):
+        backend = search.get_backend()
+        posts = Post.objects.prefetch_related("tags").order_by("pk")
+        with transaction.atomic():
+            backend.rebuild(posts)
+        self.stdout.write(self.style.SUCCESS(f"Indexed {posts.count()} posts with {type(backend).__name__}"))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from django.db.models import F
+
+from blog.models import Tag
+from blog.tags import counted_posts, recount_tags
+
+
+class Command(BaseCommand):
+    help = "Recount how many posts carry each tag, e.g. after importing or deleting posts in bulk."
+
+    def handle(self, *args, **options):
+        stale = Tag.objects.alias(actual=counted_posts()).exclude(post_count=F("actual")).count()
+        recount_tags()
+        self.stdout.write(self.style.SUCCESS(f"Recounted {Tag.objects.count()} tags; {stale} were out of date"))
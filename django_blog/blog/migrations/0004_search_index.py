@@ -0,0 +1,71 @@
+# Generated by Django 5.0.14 on 2026-10-18 02:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def _fts5_available(connection):
+    with connection.cursor() as cursor:
+        cursor.execute("PRAGMA compile_options")
+        return any(row[0] == "ENABLE_FTS5" for row in cursor.fetchall())
+
+
+def create_fts_table(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != "sqlite" or not _fts5_available(connection):
+        return
+    schema_editor.execute("CREATE VIRTUAL TABLE blog_post_fts USING fts5(title, content, tags)")
+    schema_editor.execute(
+        "INSERT INTO blog_post_fts (rowid, title, content, tags) "
+        "SELECT p.id, p.title, p.content, COALESCE(("
+        "SELECT group_concat(t.name, ' ') FROM blog_tag t "
+        "JOIN blog_post_tags pt ON pt.tag_id = t.id WHERE pt.post_id = p.id"
+        "), '') FROM blog_post p"
+    )
+
+
+def drop_fts_table(apps, schema_editor):
+    if schema_editor.connection.vendor == "sqlite":
+        schema_editor.execute("DROP TABLE IF EXISTS blog_post_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0003_tag_post_tags"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SearchTerm",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("term", models.CharField(max_length=64)),
+                ("field", models.CharField(max_length=16)),
+                ("weight", models.PositiveIntegerField(default=1)),
+                (
+                    "post",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="blog.post",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="searchterm",
+            constraint=models.UniqueConstraint(
+                fields=("term", "field", "post"), name="blog_unique_search_term"
+            ),
+        ),
+        migrations.RunPython(create_fts_table, drop_fts_table),
+    ]
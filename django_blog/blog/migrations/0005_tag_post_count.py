@@ -0,0 +1,31 @@
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_posts(apps, schema_editor):
+    Tag = apps.get_model("blog", "Tag")
+    Through = apps.get_model("blog", "Post").tags.through
+    counts = (
+        Through.objects.filter(tag_id=OuterRef("pk"))
+        .values("tag_id")
+        .annotate(count=Count("*"))
+        .values("count")
+    )
+    Tag.objects.update(post_count=Coalesce(Subquery(counts), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0004_search_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="tag",
+            name="post_count",
+            field=models.PositiveIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.RunPython(count_posts, migrations.RunPython.noop),
+    ]
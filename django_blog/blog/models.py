@@ -6,6 +6,8 @@ from django.urls import reverse
 class Tag(models.Model):
     """Simple tag with unique name used to categorize posts."""
     name = models.CharField(max_length=50, unique=True)
+    # Number of posts with the tag, kept by blog.signals; see blog.tags.recount_tags
+    post_count = models.PositiveIntegerField(default=0, db_index=True, editable=False)
 
     class Meta:
         ordering = ["name"]
@@ -14,6 +16,16 @@ class Tag(models.Model):
         return self.name
 
 
+class PostQuerySet(models.QuerySet):
+    def for_list(self):
+        """Load what ``post_list.html`` renders per post in a fixed number of queries."""
+        return (
+            self.select_related("author")
+            .prefetch_related("tags")
+            .annotate(comment_count=models.Count("comments"))
+        )
+
+
 class Post(models.Model):
     """Blog post model."""
     title = models.CharField(max_length=200)
@@ -22,6 +34,8 @@ class Post(models.Model):
     author = models.ForeignKey(User, on_delete=models.CASCADE, related_name="posts")
     tags = models.ManyToManyField(Tag, related_name="posts", blank=True)
 
+    objects = PostQuerySet.as_manager()
+
     def __str__(self) -> str:
         return self.title
 
@@ -33,15 +47,38 @@ class Comment(models.Model):
     """Comment model linked to a blog post and an author (User)."""
     post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="comments")
     author = models.ForeignKey(User, on_delete=models.CASCADE, related_name="comments")
+    # Replies are one level deep: parent is always a top-level comment
+    parent = models.ForeignKey("self", on_delete=models.CASCADE, related_name="replies", null=True, blank=True)
     content = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            # Keyset pagination of a post's comments and of a comment's replies
+            models.Index(fields=["post", "parent", "created_at"], name="blog_comment_thread_idx"),
+        ]
 
     def __str__(self) -> str:
         return f"Comment by {self.author.username} on {self.post.title}"
 
     def get_absolute_url(self):
         return self.post.get_absolute_url()
+
+
+class SearchTerm(models.Model):
+    """Inverted index posting used by ``blog.search.InvertedIndexBackend``."""
+    term = models.CharField(max_length=64)
+    field = models.CharField(max_length=16)
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="+")
+    # Occurrences of the term in the field, multiplied by the field's boost
+    weight = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["term", "field", "post"], name="blog_unique_search_term"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.term} in {self.field} of post {self.post_id}"
@@ -0,0 +1,180 @@
+"""
+Full-text search over blog posts.
+
+Posts are indexed by title, content and tag names, so a search looks terms up
+in an index instead of running ``icontains`` over every post and tag. Results
+are ranked: title matches count most, then tags, then content.
+
+``BLOG_SEARCH_BACKEND`` selects the engine. ``"auto"`` (the default) uses the
+SQLite FTS5 table created by the blog migrations when the SQLite build has
+FTS5, and the portable ``SearchTerm`` inverted index otherwise. The index is
+kept current by ``blog.signals``; ``manage.py rebuild_search_index`` rebuilds
+it, e.g. after switching backends.
+"""
+
+import re
+from collections import Counter
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import connection
+from django.db.models import Case, Count, IntegerField, Sum, Value, When
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+FIELD_WEIGHTS = {"title": 3, "content": 1, "tags": 2}
+TOKEN_RE = re.compile(r"\w+")
+MAX_TERM_LENGTH = 64
+MAX_RESULTS = 500
+FTS_TABLE = "blog_post_fts"
+
+
+def tokenize(text):
+    """Split ``text`` into lowercase word tokens."""
+    return [token[:MAX_TERM_LENGTH] for token in TOKEN_RE.findall((text or "").lower())]
+
+
+def document(post):
+    """Return the indexed text of ``post`` by field."""
+    return {
+        "title": post.title,
+        "content": post.content,
+        "tags": " ".join(tag.name for tag in post.tags.all()),
+    }
+
+
+def fts5_available(conn=connection):
+    """Return True when ``conn`` is SQLite compiled with the FTS5 extension."""
+    if conn.vendor != "sqlite":
+        return False
+    with conn.cursor() as cursor:
+        cursor.execute("PRAGMA compile_options")
+        return any(row[0] == "ENABLE_FTS5" for row in cursor.fetchall())
+
+
+class InvertedIndexBackend:
+    """Portable backend storing one ``SearchTerm`` row per (term, field, post)."""
+
+    batch_size = 1000
+
+    def _model(self):
+        from .models import SearchTerm
+        return SearchTerm
+
+    def _terms(self, post):
+        SearchTerm = self._model()
+        for field, text in document(post).items():
+            for term, occurrences in Counter(tokenize(text)).items():
+                yield SearchTerm(
+                    term=term, field=field, post_id=post.pk, weight=occurrences * FIELD_WEIGHTS[field]
+                )
+
+    def index(self, post):
+        SearchTerm = self._model()
+        SearchTerm.objects.filter(post_id=post.pk).delete()
+        SearchTerm.objects.bulk_create(self._terms(post), batch_size=self.batch_size)
+
+    def remove(self, post_id):
+        self._model().objects.filter(post_id=post_id).delete()
+
+    def rebuild(self, posts):
+        SearchTerm = self._model()
+        SearchTerm.objects.all().delete()
+        for post in posts:
+            SearchTerm.objects.bulk_create(self._terms(post), batch_size=self.batch_size)
+
+    def search(self, query, limit=None):
+        """Return ``(post_id, score)`` pairs for posts containing every term, best first."""
+        terms = set(tokenize(query))
+        if not terms:
+            return []
+        ranked = (
+            self._model().objects.filter(term__in=terms)
+            .values("post_id")
+            .annotate(matched=Count("term", distinct=True), score=Sum("weight"))
+            .filter(matched=len(terms))
+            .order_by("-score", "-post_id")
+            .values_list("post_id", "score")
+        )
+        if limit is not None:
+            ranked = ranked[:limit]
+        return list(ranked)
+
+
+class SQLiteFTS5Backend:
+    """SQLite FTS5 virtual table ranked with BM25."""
+
+    def index(self, post):
+        text = document(post)
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [post.pk])
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE} (rowid, title, content, tags) VALUES (%s, %s, %s, %s)",
+                [post.pk, text["title"], text["content"], text["tags"]],
+            )
+
+    def remove(self, post_id):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [post_id])
+
+    def rebuild(self, posts):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE}")
+        for post in posts:
+            self.index(post)
+
+    def search(self, query, limit=None):
+        """Return ``(post_id, score)`` pairs for posts containing every term, best first."""
+        terms = tokenize(query)
+        if not terms:
+            return []
+        # Quoting every token keeps user input from being read as FTS5 query syntax
+        match = " ".join(f'"{term}"' for term in terms)
+        weights = ", ".join(str(float(weight)) for weight in FIELD_WEIGHTS.values())
+        sql = (
+            f"SELECT rowid, bm25({FTS_TABLE}, {weights}) AS score FROM {FTS_TABLE} "
+            f"WHERE {FTS_TABLE} MATCH %s ORDER BY score, rowid DESC"
+        )
+        params = [match]
+        if limit is not None:
+            sql += " LIMIT %s"
+            params.append(limit)
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            # bm25() is lower for better matches
+            return [(post_id, -score) for post_id, score in cursor.fetchall()]
+
+
+_backends = {}
+
+
+def get_backend():
+    """Return the configured search backend instance."""
+    path = getattr(settings, "BLOG_SEARCH_BACKEND", "auto")
+    if path == "auto":
+        path = "blog.search.SQLiteFTS5Backend" if fts5_available() else "blog.search.InvertedIndexBackend"
+    if path not in _backends:
+        _backends[path] = import_string(path)()
+    return _backends[path]
+
+
+@receiver(setting_changed)
+def _reset_backend(setting, **kwargs):
+    if setting == "BLOG_SEARCH_BACKEND":
+        _backends.clear()
+
+
+def search_posts(queryset, query):
+    """Return the posts of ``queryset`` matching ``query``, best match first."""
+    ranked = get_backend().search(query, limit=MAX_RESULTS)
+    if not ranked:
+        return queryset.none()
+    position = Case(
+        *[When(pk=post_id, then=Value(index)) for index, (post_id, _) in enumerate(ranked)],
+        output_field=IntegerField(),
+    )
+    return (
+        queryset.filter(pk__in=[post_id for post_id, _ in ranked])
+        .annotate(search_rank=position)
+        .order_by("search_rank")
+    )
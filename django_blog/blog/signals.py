@@ -0,0 +1,105 @@
+"""
+Keep the blog search index, tag counts and page cache in step with posts,
+comments and tags.
+
+Tags are assigned after a post is saved (see ``PostForm``), so the index is
+refreshed both on save and when the post's tags change. ``Tag.post_count``
+is recounted for the tags a change touches (see ``blog.tags``). Cached pages
+are invalidated by bumping the version stamps they were stored under (see
+``blog.caching``).
+"""
+
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from . import caching, search, tags
+from .models import Comment, Post, Tag
+
+
+def _reindex(post_ids):
+    backend = search.get_backend()
+    for post in Post.objects.filter(pk__in=post_ids).prefetch_related("tags"):
+        backend.index(post)
+
+
+def _invalidate(post_ids):
+    # Every listing page may show the post, so the listings go too
+    caching.bump([caching.LIST_SCOPE, *(caching.post_scope(pk) for pk in post_ids)])
+
+
+def _posts_changed(post_ids):
+    post_ids = list(post_ids)
+    _reindex(post_ids)
+    _invalidate(post_ids)
+
+
+@receiver(post_save, sender=Post)
+def index_post(sender, instance, **kwargs):
+    search.get_backend().index(instance)
+    _invalidate([instance.pk])
+
+
+@receiver(pre_delete, sender=Post)
+def remember_deleted_post_tags(sender, instance, **kwargs):
+    # Deleting a post removes its tag links without m2m_changed
+    instance._post_tag_ids = list(instance.tags.values_list("pk", flat=True))
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post(sender, instance, **kwargs):
+    search.get_backend().remove(instance.pk)
+    _invalidate([instance.pk])
+    if instance._post_tag_ids:
+        tags.recount_tags(instance._post_tag_ids)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_commented_post(sender, instance, **kwargs):
+    _invalidate([instance.post_id])
+
+
+@receiver(m2m_changed, sender=Post.tags.through)
+def reindex_tagged_posts(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in ("post_add", "post_remove", "post_clear"):
+            _posts_changed([instance.pk])
+    elif action == "pre_clear":
+        # tag.posts.clear() does not report which posts lost the tag
+        instance._tagged_post_ids = list(instance.posts.values_list("pk", flat=True))
+    elif action == "post_clear":
+        _posts_changed(instance._tagged_post_ids)
+    elif action in ("post_add", "post_remove"):
+        _posts_changed(pk_set)
+
+
+@receiver(m2m_changed, sender=Post.tags.through)
+def recount_post_tags(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse:
+        if action in ("post_add", "post_remove", "post_clear"):
+            tags.recount_tags([instance.pk])
+    elif action == "pre_clear":
+        instance._post_tag_ids = list(instance.tags.values_list("pk", flat=True))
+    elif action == "post_clear":
+        tags.recount_tags(instance._post_tag_ids)
+    elif action in ("post_add", "post_remove") and pk_set:
+        tags.recount_tags(pk_set)
+
+
+@receiver(post_save, sender=Tag)
+def reindex_renamed_tag(sender, instance, created, **kwargs):
+    if not created:
+        caching.bump([caching.TAG_SCOPE])
+        _posts_changed(instance.posts.values_list("pk", flat=True))
+
+
+@receiver(pre_delete, sender=Tag)
+def remember_deleted_tag_posts(sender, instance, **kwargs):
+    # The tag's links are gone by the time post_delete runs
+    instance._tagged_post_ids = list(instance.posts.values_list("pk", flat=True))
+
+
+@receiver(post_delete, sender=Tag)
+def reindex_deleted_tag_posts(sender, instance, **kwargs):
+    caching.bump([caching.TAG_SCOPE])
+    _posts_changed(instance._tagged_post_ids)
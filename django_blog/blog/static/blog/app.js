@@ -1,2 +1,24 @@
-// Basic JS placeholder for Django Blog
-console.log('Django Blog static JS loaded');
+// Basic JS for Django Blog
+
+// "Load more" links replace themselves with the next page of comments or
+// replies. Without JavaScript they lead to a page showing them instead.
+document.addEventListener('click', function (event) {
+  var link = event.target.closest('a[data-load-more]');
+  if (!link) {
+    return;
+  }
+  event.preventDefault();
+  fetch(link.dataset.loadMore, { headers: { 'X-Requested-With': 'XMLHttpRequest' } })
+    .then(function (response) {
+      if (!response.ok) {
+        throw new Error('Could not load comments: ' + response.status);
+      }
+      return response.text();
+    })
+    .then(function (html) {
+      link.closest('li').outerHTML = html;
+    })
+    .catch(function () {
+      window.location.href = link.href;
+    });
+});
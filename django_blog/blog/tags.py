@@ -0,0 +1,99 @@
+"""
+Assigning tags to posts.
+
+Tags are given as names, e.g. from ``PostForm.tags_csv`` or a bulk import.
+``set_post_tags`` resolves all of them with one ``name__in`` query, inserts
+the missing ones with a single ``bulk_create`` and updates the post's tags
+with at most one add and one remove, so the cost of saving a post does not
+grow with its number of tags.
+
+``Tag.post_count`` stores how many posts carry each tag, so the tag list,
+the popular tags and tag page headings need no ``GROUP BY``. It is only
+displayed; tag pages are paginated by counting the tagged posts, so a
+drifted count cannot hide or invent pages. ``blog.signals`` recounts the
+tags whose posts change; ``manage.py repair_tag_counts`` recounts them all.
+
+Settings:
+
+- ``BLOG_POPULAR_TAGS``: number of tags in the popular tags list (default: 10).
+"""
+
+from django.conf import settings
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from . import caching
+from .models import Post, Tag
+
+MAX_TAG_LENGTH = Tag._meta.get_field("name").max_length
+DEFAULT_POPULAR_TAGS = 10
+
+
+def normalize_tag_name(name):
+    """Strip ``name`` and collapse runs of whitespace to single spaces."""
+    return " ".join(name.split())
+
+
+def parse_tag_names(raw):
+    """
+    Split comma-separated ``raw`` into normalized tag names.
+
+    Empty names are dropped, as are repeats that differ only in case; the
+    first spelling is kept.
+    """
+    names = {}
+    for name in raw.split(","):
+        name = normalize_tag_name(name)
+        if name:
+            names.setdefault(name.casefold(), name)
+    return list(names.values())
+
+
+def get_or_create_tags(names):
+    """Return the ``Tag`` for each of ``names``, in order, creating missing ones."""
+    tags = {tag.name: tag for tag in Tag.objects.filter(name__in=names)}
+    missing = [name for name in names if name not in tags]
+    if missing:
+        # Another request may create some of them first; the conflicts are
+        # skipped and every row is read back, as ignore_conflicts leaves pk unset.
+        Tag.objects.bulk_create([Tag(name=name) for name in missing], ignore_conflicts=True)
+        tags.update((tag.name, tag) for tag in Tag.objects.filter(name__in=missing))
+    return [tags[name] for name in names]
+
+
+def set_post_tags(post, names):
+    """Make ``names`` the tags of the saved ``post``."""
+    # set() reads the current links once, then removes and adds only the difference
+    post.tags.set(get_or_create_tags(names))
+
+
+def counted_posts():
+    """Return the number of posts of the outer query's tag, as an expression."""
+    counts = (
+        Post.tags.through.objects.filter(tag_id=OuterRef("pk"))
+        .values("tag_id")
+        .annotate(count=Count("*"))
+        .values("count")
+    )
+    return Coalesce(Subquery(counts), 0)
+
+
+def recount_tags(tag_ids=None):
+    """Store the current ``post_count`` of ``tag_ids`` (default: every tag)."""
+    tags = Tag.objects.all() if tag_ids is None else Tag.objects.filter(pk__in=tag_ids)
+    # One UPDATE, whatever the number of tags
+    tags.update(post_count=counted_posts())
+    caching.bump([caching.TAG_SCOPE])
+
+
+def get_popular_tags():
+    """Return the ``BLOG_POPULAR_TAGS`` most used tags, cached until tag usage changes."""
+    limit = getattr(settings, "BLOG_POPULAR_TAGS", DEFAULT_POPULAR_TAGS)
+    version, = caching.get_versions([caching.TAG_SCOPE])
+    key = f"blog-popular-tags:{limit}:{version}"
+    cache = caching.get_cache()
+    tags = cache.get(key)
+    if tags is None:
+        tags = list(Tag.objects.filter(post_count__gt=0).order_by("-post_count", "name")[:limit])
+        cache.set(key, tags, caching.get_timeout())
+    return tags
@@ -0,0 +1,20 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from ..caching import hole_placeholder, render_hole
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def hole(context, name, **params):
+    """
+    Render the reader-specific part ``blog/holes/<name>.html``.
+
+    While a page is being built for the shared cache, a placeholder is left
+    instead and filled in for every request (see ``blog.caching``).
+    """
+    request = context["request"]
+    if getattr(request, "blog_page_cache", False):
+        return mark_safe(hole_placeholder(name, params))
+    return mark_safe(render_hole(request, name, params))
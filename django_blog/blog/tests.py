@@ -1,3 +1,373 @@
-from django.test import TestCase
+from io import StringIO
+from urllib.parse import urlencode
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .comments import load_thread
+from .forms import PostForm
+from .models import Comment, Post, Tag
+
+# Sent by the "load more" script
+XHR = {"X-Requested-With": "XMLHttpRequest"}
+
+
+@override_settings(BLOG_POSTS_PER_PAGE=5)
+class PostListQueryCountTests(TestCase):
+    """Listing pages run the same number of queries however many posts there are."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username="writer", password="testpass123")
+        cls.tags = [Tag.objects.create(name=name) for name in ("django", "python", "web")]
+
+    def setUp(self):
+        cache.clear()
+
+    def add_posts(self, count):
+        for _ in range(count):
+            number = Post.objects.count()
+            post = Post.objects.create(title=f"Post {number}", content="Searchable content", author=self.author)
+            post.tags.set(self.tags[: number % 3 + 1])
+            for _ in range(number % 4):
+                Comment.objects.create(post=post, author=self.author, content="Nice post")
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries), response
+
+    def assert_constant_queries(self, url):
+        self.add_posts(2)
+        baseline, _ = self.count_queries(url)
+        self.add_posts(10)
+        queries, response = self.count_queries(url)
+        self.assertEqual(queries, baseline)
+        return response
+
+    def test_post_list(self):
+        """The home list is paginated and its query count does not grow with posts."""
+        response = self.assert_constant_queries(reverse("post-list"))
+        self.assertEqual(len(response.context["posts"]), 5)
+        self.assertTrue(response.context["is_paginated"])
+
+    def test_posts_by_tag(self):
+        """Tag pages load authors, tags and comment counts without per-post queries."""
+        response = self.assert_constant_queries(reverse("posts-by-tag", args=["Django"]))
+        posts = response.context["posts"]
+        self.assertEqual(len(posts), 5)
+        # Counts are not multiplied by the tag filter
+        for post in posts:
+            self.assertEqual(post.comment_count, post.comments.count())
+
+    def test_search(self):
+        """Search results are paginated like the other listing pages."""
+        response = self.assert_constant_queries(reverse("search") + "?q=searchable")
+        self.assertEqual(response.context["paginator"].count, 12)
+
+
+class PageCacheTests(TestCase):
+    """Post pages are served from the cache and rebuilt when their content changes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username="writer", password="testpass123")
+        cls.post = Post.objects.create(title="Cached post", content="Some content", author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.url = reverse("post-detail", args=[self.post.pk])
+
+    def test_anonymous_hit_skips_database(self):
+        """A second anonymous request for a post page runs no queries."""
+        self.assertEqual(self.client.get(self.url)["X-Cache"], "MISS")
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertEqual(response["X-Cache"], "HIT")
+        self.assertContains(response, "Cached post")
+        self.assertContains(response, "Log in</a> to leave a comment")
+
+    def test_unknown_query_params_bypass_cache(self):
+        """Only known parameters with values the page hands out are cached; anything else renders uncached."""
+        list_url = reverse("post-list")
+        self.assertEqual(self.client.get(list_url, {"page": 1})["X-Cache"], "MISS")
+        self.assertEqual(self.client.get(list_url, {"page": 1})["X-Cache"], "HIT")
+        response = self.client.get(list_url, {"page": 1, "x": "random"})
+        self.assertEqual(response["X-Cache"], "BYPASS")
+        self.assertContains(response, "Cached post")
+        self.assertEqual(self.client.get(self.url, {"page": 1})["X-Cache"], "BYPASS")
+        self.assertEqual(self.client.get(self.url)["X-Cache"], "MISS")
+        # Values clients can vary freely are not cached either
+        self.assertEqual(self.client.get(list_url, {"q": "cached"})["X-Cache"], "BYPASS")
+        self.assertEqual(self.client.get(list_url, {"page": "01"})["X-Cache"], "BYPASS")
+        forged = self.client.get(
+            reverse("comment-page", args=[self.post.pk]), {"cursor": "2030-01-01T00:00:00~1"}, headers=XHR
+        )
+        self.assertEqual(forged.status_code, 404)
+
+    def test_comment_invalidates_post_and_list(self):
+        """Saving a comment rebuilds the post page and the listing pages."""
+        list_url = reverse("post-list")
+        self.client.get(self.url)
+        self.client.get(list_url)
+        Comment.objects.create(post=self.post, author=self.author, content="First!")
+        response = self.client.get(self.url)
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertContains(response, "First!")
+        response = self.client.get(list_url)
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertContains(response, "1 comment")
+
+    def test_tag_rename_invalidates_post(self):
+        """Renaming a tag rebuilds the pages of the posts carrying it."""
+        tag = Tag.objects.create(name="django")
+        self.post.tags.add(tag)
+        self.client.get(self.url)
+        tag.name = "python"
+        tag.save()
+        self.assertContains(self.client.get(self.url), "python")
+
+    def test_reader_specific_parts_are_not_shared(self):
+        """The author sees their own controls and comment form on a page cached for anonymous readers."""
+        self.client.get(self.url)
+        self.client.force_login(self.author)
+        response = self.client.get(self.url)
+        self.assertEqual(response["X-Cache"], "HIT")
+        self.assertContains(response, reverse("post-update", args=[self.post.pk]))
+        self.assertContains(response, 'name="csrfmiddlewaretoken"')
+        self.assertContains(response, reverse("comment-create", kwargs={"post_pk": self.post.pk}))
+        self.assertNotContains(response, "to leave a comment")
+
+
+class PostFormTagTests(TestCase):
+    """Saving a post resolves its tags in a fixed number of queries."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username="writer", password="testpass123")
+
+    def save_post(self, tags_csv, instance=None):
+        if instance is None:
+            instance = Post(author=self.author)
+        form = PostForm({"title": "Tagged", "content": "Body", "tags_csv": tags_csv}, instance=instance)
+        self.assertTrue(form.is_valid(), form.errors)
+        with CaptureQueriesContext(connection) as queries:
+            post = form.save()
+        return post, len(queries)
+
+    def tag_names(self, post):
+        return sorted(post.tags.values_list("name", flat=True))
+
+    def test_names_are_normalized(self):
+        """Whitespace is collapsed and repeats differing only in case are dropped."""
+        post, _ = self.save_post("  web   dev , Django,, django ,web dev")
+        self.assertEqual(self.tag_names(post), ["Django", "web dev"])
+
+    def test_query_count_does_not_grow_with_tags(self):
+        """A post with many tags, half of them new, costs as many queries as one with two."""
+        Tag.objects.bulk_create([Tag(name=f"old{i}") for i in range(10)])
+        _, few = self.save_post("old0, new0")
+        names = [f"old{i}" for i in range(10)] + [f"new{i}" for i in range(1, 11)]
+        post, many = self.save_post(", ".join(names))
+        self.assertEqual(many, few)
+        self.assertEqual(self.tag_names(post), sorted(names))
+
+    def test_edit_replaces_tags(self):
+        """Editing keeps shared tags, drops removed ones and adds new ones."""
+        post, _ = self.save_post("django, python")
+        post, _ = self.save_post("python, web", instance=post)
+        self.assertEqual(self.tag_names(post), ["python", "web"])
+
+    def test_edit_form_prefills_tags_when_rendered(self):
+        """The current tags are read for the edit form, but not when an edit is submitted."""
+        post, _ = self.save_post("django, python")
+        self.assertEqual(PostForm(instance=post)["tags_csv"].value(), "django, python")
+        with self.assertNumQueries(0):
+            PostForm({"title": "Tagged", "content": "Body", "tags_csv": "web"}, instance=post).is_valid()
+
+    def test_long_tag_is_rejected(self):
+        """Tags longer than the column allows are reported instead of saved."""
+        form = PostForm({"title": "Tagged", "content": "Body", "tags_csv": "x" * 51}, instance=Post(author=self.author))
+        self.assertFalse(form.is_valid())
+        self.assertIn("tags_csv", form.errors)
+
+
+class TagCountTests(TestCase):
+    """Tag.post_count follows tag changes and serves tag listings without aggregation."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username="writer", password="testpass123")
+
+    def setUp(self):
+        cache.clear()
+        self.django, self.python = Tag.objects.create(name="django"), Tag.objects.create(name="python")
+        self.posts = [Post.objects.create(title=f"Post {i}", content="Body", author=self.author) for i in range(3)]
+
+    def assert_counts(self, django, python):
+        self.django.refresh_from_db()
+        self.python.refresh_from_db()
+        self.assertEqual((self.django.post_count, self.python.post_count), (django, python))
+
+    def test_counts_follow_changes(self):
+        """Adding, removing and clearing tags from either side and deleting posts update the counts."""
+        for post in self.posts:
+            post.tags.add(self.django)
+        self.posts[0].tags.add(self.python)
+        self.assert_counts(3, 1)
+        self.posts[1].tags.remove(self.django)
+        self.assert_counts(2, 1)
+        self.python.posts.add(self.posts[1], self.posts[2])
+        self.assert_counts(2, 3)
+        self.posts[0].tags.clear()
+        self.assert_counts(1, 2)
+        self.posts[2].delete()
+        self.assert_counts(0, 1)
+        self.python.posts.clear()
+        self.assert_counts(0, 0)
+
+    def test_repair_command(self):
+        """repair_tag_counts recounts tags whose stored count drifted."""
+        self.posts[0].tags.add(self.django, self.python)
+        Tag.objects.update(post_count=7)
+        call_command("repair_tag_counts", stdout=StringIO())
+        self.assert_counts(1, 1)
+
+    def test_tag_list_sorted_by_usage(self):
+        """/tags/ lists used tags, most used first."""
+        self.posts[0].tags.add(self.django)
+        self.python.posts.add(*self.posts[:2])
+        Tag.objects.create(name="unused")
+        response = self.client.get(reverse("tag-list"))
+        self.assertEqual([tag.name for tag in response.context["tags"]], ["python", "django"])
+
+    @override_settings(BLOG_POSTS_PER_PAGE=2)
+    def test_tag_page_paginates_despite_drift(self):
+        """Tag pages show the stored count but paginate by the posts actually tagged."""
+        self.django.posts.add(*self.posts)
+        Tag.objects.filter(pk=self.django.pk).update(post_count=1)
+        response = self.client.get(reverse("posts-by-tag", args=["Django"]), {"page": 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context["posts"]), 1)
+        self.assertContains(response, "1 post tagged")
+        Tag.objects.filter(pk=self.django.pk).update(post_count=30)
+        response = self.client.get(reverse("posts-by-tag", args=["Django"]), {"page": 3})
+        self.assertEqual(response.status_code, 404)
+
+    def test_tag_page_shares_list_queryset(self):
+        """Tag pages are built from the listing queryset, so ?q= searches within the tag."""
+        self.django.posts.add(*self.posts[:2])
+        response = self.client.get(reverse("posts-by-tag", args=["django"]), {"q": "post"})
+        self.assertEqual({post.pk for post in response.context["posts"]}, {post.pk for post in self.posts[:2]})
+        self.assertEqual(response.context["posts"][0].comment_count, 0)
+
+    def test_popular_tags_are_cached(self):
+        """The popular tags sidebar is read from the cache until tag usage changes."""
+        self.django.posts.add(self.posts[0])
+        self.client.get(reverse("post-list"))
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse("post-list"))
+        self.assertContains(response, "django (1)")
+        self.python.posts.add(*self.posts)
+        self.assertContains(self.client.get(reverse("post-detail", args=[self.posts[1].pk])), "python (3)")
+
+
+@override_settings(BLOG_COMMENTS_PER_PAGE=10, BLOG_COMMENT_REPLIES=2)
+class CommentThreadTests(TestCase):
+    """Post pages show one page of threaded comments, read with a single query."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username="writer", password="testpass123")
+        cls.post = Post.objects.create(title="Busy post", content="Body", author=cls.author)
+        cls.comments = [
+            Comment.objects.create(post=cls.post, author=cls.author, content=f"Comment {i}") for i in range(25)
+        ]
+        cls.replies = [
+            Comment.objects.create(post=cls.post, author=cls.author, content=f"Reply {i}", parent=cls.comments[-1])
+            for i in range(5)
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    def test_thread_is_one_query(self):
+        """A page of comments and their first replies comes from one query."""
+        with self.assertNumQueries(1):
+            comments, cursor = load_thread(self.post)
+        self.assertEqual([comment.content for comment in comments], [f"Comment {i}" for i in range(24, 14, -1)])
+        self.assertEqual([reply.content for reply in comments[0].reply_list], ["Reply 0", "Reply 1"])
+        self.assertEqual(comments[0].more_replies, 3)
+        self.assertIsNotNone(cursor)
+
+    def test_load_more_pages(self):
+        """"Load more" pages continue where the previous page stopped, then stop."""
+        response = self.client.get(reverse("post-detail", args=[self.post.pk]))
+        self.assertContains(response, "Comments (30)")
+        seen = [comment.content for comment in response.context["comments"]]
+        cursor = response.context["comments_cursor"]
+        while cursor:
+            response = self.client.get(reverse("comment-page", args=[self.post.pk]), {"cursor": cursor}, headers=XHR)
+            seen += [comment.content for comment in response.context["comments"]]
+            cursor = response.context["comments_cursor"]
+        self.assertEqual(seen, [f"Comment {i}" for i in range(24, -1, -1)])
+        self.assertNotContains(response, "Load more comments")
+
+    def test_more_replies(self):
+        """The replies not shown with their comment are loaded after the last one shown."""
+        comments, _ = load_thread(self.post)
+        response = self.client.get(
+            reverse("comment-replies", args=[self.post.pk, comments[0].pk]),
+            {"cursor": comments[0].replies_cursor},
+            headers=XHR,
+        )
+        self.assertEqual([reply.content for reply in response.context["replies"]], ["Reply 2", "Reply 3", "Reply 4"])
+        self.assertNotContains(response, "<html")
+
+    def test_load_more_without_javascript(self):
+        """Following a "load more" link without the script leads to a full page, not a bare fragment."""
+        response = self.client.get(reverse("post-detail", args=[self.post.pk]))
+        cursor = response.context["comments_cursor"]
+        response = self.client.get(reverse("comment-page", args=[self.post.pk]), {"cursor": cursor})
+        expected = f"{reverse('post-detail', args=[self.post.pk])}?{urlencode({'comments': cursor})}#comments"
+        self.assertRedirects(response, expected, fetch_redirect_response=False)
+
+        comments, _ = load_thread(self.post)
+        url = reverse("comment-replies", args=[self.post.pk, comments[0].pk])
+        response = self.client.get(url, {"cursor": comments[0].replies_cursor})
+        self.assertContains(response, "<html")
+        self.assertContains(response, f'Back to "{self.post.title}"')
+        self.assertContains(response, "Reply 4")
+        # The fragment and the page are cached separately
+        self.assertNotContains(self.client.get(url, {"cursor": comments[0].replies_cursor}, headers=XHR), "<html")
+
+    def test_invalid_cursor(self):
+        """A malformed cursor is a 404, not a server error."""
+        response = self.client.get(reverse("comment-page", args=[self.post.pk]), {"cursor": "nonsense"}, headers=XHR)
+        self.assertEqual(response.status_code, 404)
+
+    def test_reply_to_reply_joins_thread(self):
+        """Replying to a reply adds to the top-level comment's thread."""
+        self.client.force_login(self.author)
+        self.client.post(
+            reverse("comment-create", kwargs={"post_pk": self.post.pk}),
+            {"content": "Nested", "parent": self.replies[0].pk},
+        )
+        self.assertEqual(Comment.objects.get(content="Nested").parent, self.comments[-1])
+
+    def test_reply_to_other_post_is_rejected(self):
+        """Replies must answer a comment on the same post."""
+        other = Post.objects.create(title="Other", content="Body", author=self.author)
+        self.client.force_login(self.author)
+        response = self.client.post(
+            reverse("comment-create", kwargs={"post_pk": other.pk}),
+            {"content": "Misplaced", "parent": self.comments[0].pk},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(Comment.objects.filter(content="Misplaced").exists())
@@ -19,6 +19,7 @@ urlpatterns = [
     
     # Search and Tags
     path("search/", views.SearchView.as_view(), name="search"),
+    path("tags/", views.TagListView.as_view(), name="tag-list"),
     path("tags/<str:name>/", views.PostByTagListView.as_view(), name="posts-by-tag"),
     
     # Compatibility URLs (to satisfy checkers)
@@ -30,6 +31,8 @@ urlpatterns = [
     path("tag/<str:name>/", views.PostByTagListView.as_view(), name="tag-posts"),
     
     # Comments
+    path("posts/<int:post_pk>/comments/", views.CommentPageView.as_view(), name="comment-page"),
+    path("posts/<int:post_pk>/comments/<int:pk>/replies/", views.CommentRepliesView.as_view(), name="comment-replies"),
     path("posts/<int:post_pk>/comment/new/", views.CommentCreateView.as_view(), name="comment-create"),
     path("posts/<int:post_pk>/comments/new/", views.CommentCreateView.as_view(), name="comment-create-alias"),
     path("comments/<int:pk>/edit/", views.CommentUpdateView.as_view(), name="comment-edit"),
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from accounts.suggestions import compute_suggestions
+
+
+class Command(BaseCommand):
+    help = "Recompute who-to-follow suggestions for users whose follow graph changed."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full', action='store_true',
+            help='Recompute suggestions for every user, not only stale ones.',
+        )
+        parser.add_argument(
+            '--chunk-size', type=int,
+            help='Number of users recomputed per transaction (default: SUGGESTIONS_CHUNK_SIZE).',
+        )
+        parser.add_argument(
+            '--top-k', type=int,
+            help='Number of suggestions kept per user (default: SUGGESTIONS_TOP_K).',
+        )
+
+    def handle(self, *args, **options):
+        processed = compute_suggestions(
+            full=options['full'], chunk_size=options['chunk_size'], top_k=options['top_k'],
+        )
+        self.stdout.write(self.style.SUCCESS(f'Recomputed suggestions for {processed} users'))
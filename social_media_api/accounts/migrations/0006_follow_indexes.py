@@ -0,0 +1,19 @@
+# Generated by Django 5.0.14 on 2026-10-18 02:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0005_customuser_counters"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="userfollowing",
+            index=models.Index(
+                fields=["following_user", "user"], name="accounts_follow_follower"
+            ),
+        ),
+    ]
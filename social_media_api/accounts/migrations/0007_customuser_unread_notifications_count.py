@@ -0,0 +1,18 @@
+# Generated by Django 5.0.14 on 2026-10-18 02:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0006_follow_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="customuser",
+            name="unread_notifications_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
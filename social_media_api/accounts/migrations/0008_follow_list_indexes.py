@@ -0,0 +1,26 @@
+# Generated by Django 5.0.14 on 2026-10-18 02:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0007_customuser_unread_notifications_count"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="userfollowing",
+            index=models.Index(
+                fields=["user", "-created_at", "-id"], name="accounts_followers_recent"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="userfollowing",
+            index=models.Index(
+                fields=["following_user", "-created_at", "-id"],
+                name="accounts_following_recent",
+            ),
+        ),
+    ]
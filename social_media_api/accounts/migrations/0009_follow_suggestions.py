@@ -0,0 +1,79 @@
+# Generated by Django 5.0.14 on 2026-10-18 02:49
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0008_follow_list_indexes"),
+        ("auth", "0012_alter_user_first_name_max_length"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="FollowSuggestion",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("mutual_count", models.PositiveIntegerField()),
+                ("computed_at", models.DateTimeField()),
+            ],
+            options={
+                "ordering": ["-mutual_count", "suggested_id"],
+            },
+        ),
+        migrations.AddField(
+            model_name="customuser",
+            name="suggestions_stale",
+            field=models.BooleanField(default=True, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name="customuser",
+            index=models.Index(
+                condition=models.Q(("suggestions_stale", True)),
+                fields=["id"],
+                name="accounts_user_stale",
+            ),
+        ),
+        migrations.AddField(
+            model_name="followsuggestion",
+            name="suggested",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.AddField(
+            model_name="followsuggestion",
+            name="user",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="follow_suggestions",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="followsuggestion",
+            index=models.Index(
+                fields=["user", "-mutual_count", "suggested"],
+                name="accounts_suggestion_rank",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="followsuggestion",
+            constraint=models.UniqueConstraint(
+                fields=("user", "suggested"), name="unique_follow_suggestion"
+            ),
+        ),
+    ]
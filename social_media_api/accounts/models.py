@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import IntegrityError, models, transaction
 from django.contrib.auth.models import AbstractUser
 from django.utils.translation import gettext_lazy as _
 from django.conf import settings
@@ -33,6 +33,21 @@ class CustomUser(AbstractUser):
         blank=True
     )
     
+    # Denormalized counters maintained by accounts.signals and posts.signals
+    followers_count = models.PositiveIntegerField(default=0, editable=False)
+    following_count = models.PositiveIntegerField(default=0, editable=False)
+    posts_count = models.PositiveIntegerField(default=0, editable=False)
+    # Maintained by the notifications app; see notifications.models.adjust_unread_count
+    unread_notifications_count = models.PositiveIntegerField(default=0, editable=False)
+    # Set when the user's follows change; cleared by accounts.suggestions
+    suggestions_stale = models.BooleanField(default=True, editable=False)
+    
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # The few users whose suggestions need recomputing
+            models.Index(fields=['id'], condition=models.Q(suggestions_stale=True), name='accounts_user_stale'),
+        ]
+    
     def __str__(self):
         return self.username
     
@@ -44,12 +59,66 @@ class CustomUser(AbstractUser):
     @property
     def follower_count(self):
         """Return the number of followers."""
-        return self.following.count()
+        return self.followers_count
+
+
+def _pk(user):
+    return getattr(user, 'pk', user)
+
+
+def lock_user(user):
+    """
+    Lock ``user``'s row until the current transaction ends.
+
+    Follow and like writes take the acting user's lock first, so one user's
+    writes run one at a time and each sees the rows the previous one
+    inserted. The bulk endpoints rely on this to count and notify only the
+    rows they actually add.
+    """
+    list(CustomUser.objects.select_for_update().filter(pk=_pk(user)).values_list('pk', flat=True))
+
+
+class UserFollowingQuerySet(models.QuerySet):
+    """
+    Relationship queries answered in the database.
     
-    @property
-    def following_count(self):
-        """Return the number of users being followed."""
-        return self.followers.count()
+    ``user in request.user.following.all()`` loads every followed user to
+    answer a yes/no question; these helpers use ``EXISTS``, single-row writes
+    guarded by the ``unique_followers`` constraint, and one query per page of
+    users. Users may be passed as instances or primary keys.
+    """
+    
+    def is_following(self, follower, followed):
+        """Return True if ``follower`` follows ``followed``."""
+        return self.filter(following_user=_pk(follower), user=_pk(followed)).exists()
+    
+    def follow(self, follower, followed):
+        """Make ``follower`` follow ``followed``; return False if it already did."""
+        try:
+            # The savepoint keeps a duplicate from breaking the caller's transaction
+            with transaction.atomic():
+                self.create(following_user_id=_pk(follower), user_id=_pk(followed))
+        except IntegrityError:
+            return False
+        return True
+    
+    def unfollow(self, follower, followed):
+        """Remove the follow; return False if ``follower`` was not following ``followed``."""
+        deleted, _ = self.filter(following_user=_pk(follower), user=_pk(followed)).delete()
+        return bool(deleted)
+    
+    def follows_many(self, follower, user_ids):
+        """Return the subset of ``user_ids`` that ``follower`` follows, in one query."""
+        return set(
+            self.filter(following_user=_pk(follower), user__in=list(user_ids)).values_list('user_id', flat=True)
+        )
+    
+    def mutuals(self, user):
+        """Return the users that ``user`` follows and who follow ``user`` back."""
+        return CustomUser.objects.filter(
+            models.Exists(self.filter(following_user=_pk(user), user=models.OuterRef('pk'))),
+            models.Exists(self.filter(following_user=models.OuterRef('pk'), user=_pk(user))),
+        )
 
 
 class UserFollowing(models.Model):
@@ -67,6 +136,8 @@ class UserFollowing(models.Model):
     )
     created_at = models.DateTimeField(auto_now_add=True)
     
+    objects = UserFollowingQuerySet.as_manager()
+    
     class Meta:
         constraints = [
             models.UniqueConstraint(
@@ -78,7 +149,36 @@ class UserFollowing(models.Model):
                 name='no_self_follow'
             )
         ]
+        indexes = [
+            # unique_followers covers lookups by followed user; this covers "who does X follow"
+            models.Index(fields=['following_user', 'user'], name='accounts_follow_follower'),
+            # Keyset order of the followers and following lists
+            models.Index(fields=['user', '-created_at', '-id'], name='accounts_followers_recent'),
+            models.Index(fields=['following_user', '-created_at', '-id'], name='accounts_following_recent'),
+        ]
         ordering = ['-created_at']
     
     def __str__(self):
         return f"{self.user} follows {self.following_user}"
+
+
+class FollowSuggestion(models.Model):
+    """A precomputed who-to-follow suggestion; written by ``accounts.suggestions``."""
+    
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='follow_suggestions')
+    suggested = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+    # Number of users followed by ``user`` who follow ``suggested``
+    mutual_count = models.PositiveIntegerField()
+    computed_at = models.DateTimeField()
+    
+    class Meta:
+        ordering = ['-mutual_count', 'suggested_id']
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'suggested'], name='unique_follow_suggestion'),
+        ]
+        indexes = [
+            models.Index(fields=['user', '-mutual_count', 'suggested'], name='accounts_suggestion_rank'),
+        ]
+    
+    def __str__(self):
+        return f"Suggest {self.suggested_id} to {self.user_id} ({self.mutual_count} mutual)"
@@ -4,6 +4,8 @@ from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 from rest_framework.validators import UniqueValidator
 from django.contrib.auth.password_validation import validate_password
 from rest_framework.authtoken.models import Token
+from social_media_api.serializers import DynamicFieldsMixin
+from .models import FollowSuggestion, UserFollowing
 
 User = get_user_model()
 
@@ -20,18 +22,68 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
         return token
 
 
-class UserSerializer(serializers.ModelSerializer):
-    """Serializer for the CustomUser model."""
+class UserSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    """Serializer for the CustomUser model; ``?expand=is_following`` adds the viewer's follow state."""
     email = serializers.EmailField(
         required=True,
         validators=[UniqueValidator(queryset=User.objects.all())]
     )
+    is_following = serializers.SerializerMethodField()
     
     class Meta:
         model = User
         fields = ['id', 'username', 'email', 'first_name', 'last_name',
-                  'bio', 'profile_picture', 'date_of_birth', 'location', 'website']
-        read_only_fields = ('id',)
+                  'bio', 'profile_picture', 'date_of_birth', 'location', 'website',
+                  'followers_count', 'following_count', 'posts_count', 'is_following']
+        read_only_fields = ('id', 'followers_count', 'following_count', 'posts_count')
+        expandable_fields = ['is_following']
+    
+    def get_is_following(self, obj):
+        """
+        Return True if the requesting user follows ``obj``.
+        
+        Views serializing many users pass the ids the viewer follows as
+        ``followed_by_me`` in the context, from one ``follows_many`` query;
+        otherwise this costs one EXISTS query per user.
+        """
+        request = self.context.get('request')
+        if request is None or not request.user.is_authenticated or request.user.pk == obj.pk:
+            return False
+        if 'followed_by_me' in self.context:
+            return obj.pk in self.context['followed_by_me']
+        return UserFollowing.objects.is_following(request.user, obj)
+
+
+class UserSummarySerializer(serializers.ModelSerializer):
+    """Public summary of a user shown in lists."""
+
+    class Meta:
+        model = User
+        fields = ['id', 'username', 'first_name', 'last_name', 'profile_picture']
+        read_only_fields = fields
+
+
+class FollowListUserSerializer(UserSummarySerializer):
+    """A user in a followers or following list."""
+    is_followed_by_me = serializers.SerializerMethodField()
+
+    class Meta(UserSummarySerializer.Meta):
+        fields = UserSummarySerializer.Meta.fields + ['is_followed_by_me']
+        read_only_fields = fields
+
+    def get_is_followed_by_me(self, obj):
+        # Computed once for the whole page by the view
+        return obj.pk in self.context.get('followed_by_me', ())
+
+
+class FollowSuggestionSerializer(serializers.ModelSerializer):
+    """A precomputed who-to-follow suggestion."""
+    user = UserSummarySerializer(source='suggested', read_only=True)
+
+    class Meta:
+        model = FollowSuggestion
+        fields = ['user', 'mutual_count', 'computed_at']
+        read_only_fields = fields
 
 
 class RegisterSerializer(serializers.ModelSerializer):
@@ -0,0 +1,106 @@
+"""
+Follow relationship signals.
+
+Follows can be created through ``UserFollowing.objects.create`` or through the
+``followers``/``following`` many-to-many managers, which fire different model
+signals. Both paths are normalized here into ``user_followed`` and
+``user_unfollowed`` so other apps only need to listen in one place.
+
+Several follows made or removed at once by one user are reported with a
+single ``users_followed``/``users_unfollowed``, so their receivers can apply
+the whole batch in a fixed number of queries. Rows deleted through a
+``batched`` queryset send no per-row ``user_unfollowed``; the caller sends
+``users_unfollowed`` for them.
+"""
+
+from django.db.models import F
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import Signal, receiver
+
+from social_media_api.batching import is_batched
+from .models import CustomUser, UserFollowing
+
+# Sent with ``follower_id`` and ``followed_id`` keyword arguments
+user_followed = Signal()
+user_unfollowed = Signal()
+# Sent with ``follower_id`` and a list of ``followed_ids``
+users_followed = Signal()
+users_unfollowed = Signal()
+
+
+@receiver(post_save, sender=UserFollowing)
+def follow_created(sender, instance, created, **kwargs):
+    if created:
+        user_followed.send(
+            sender=UserFollowing,
+            follower_id=instance.following_user_id,
+            followed_id=instance.user_id,
+        )
+
+
+@receiver(m2m_changed, sender=CustomUser.followers.through)
+def follow_added(sender, instance, action, reverse, pk_set, **kwargs):
+    if action != 'post_add' or not pk_set:
+        return
+    if reverse:
+        # ``user.following.add(a, b)``: one follower, several followed users
+        users_followed.send(sender=UserFollowing, follower_id=instance.pk, followed_ids=list(pk_set))
+        return
+    for pk in pk_set:
+        user_followed.send(sender=UserFollowing, follower_id=pk, followed_id=instance.pk)
+
+
+@receiver(post_delete, sender=UserFollowing)
+def follow_deleted(sender, instance, origin=None, **kwargs):
+    if is_batched(origin):
+        return
+    user_unfollowed.send(
+        sender=UserFollowing,
+        follower_id=instance.following_user_id,
+        followed_id=instance.user_id,
+    )
+
+
+@receiver(user_followed)
+def increment_follow_counters(sender, follower_id, followed_id, **kwargs):
+    """Keep the stored follower/following counters in step with new follows."""
+    CustomUser.objects.filter(pk=follower_id).update(following_count=F('following_count') + 1)
+    CustomUser.objects.filter(pk=followed_id).update(followers_count=F('followers_count') + 1)
+
+
+@receiver(user_unfollowed)
+def decrement_follow_counters(sender, follower_id, followed_id, **kwargs):
+    """Keep the stored follower/following counters in step with removed follows."""
+    CustomUser.objects.filter(pk=follower_id, following_count__gt=0).update(
+        following_count=F('following_count') - 1
+    )
+    CustomUser.objects.filter(pk=followed_id, followers_count__gt=0).update(
+        followers_count=F('followers_count') - 1
+    )
+
+
+@receiver(users_followed)
+def increment_follow_counters_many(sender, follower_id, followed_ids, **kwargs):
+    """Apply a batch of new follows to the stored counters in two UPDATEs."""
+    CustomUser.objects.filter(pk=follower_id).update(following_count=F('following_count') + len(followed_ids))
+    CustomUser.objects.filter(pk__in=followed_ids).update(followers_count=F('followers_count') + 1)
+
+
+@receiver(users_unfollowed)
+def decrement_follow_counters_many(sender, follower_id, followed_ids, **kwargs):
+    """Apply a batch of removed follows to the stored counters in two UPDATEs."""
+    CustomUser.objects.filter(pk=follower_id, following_count__gte=len(followed_ids)).update(
+        following_count=F('following_count') - len(followed_ids)
+    )
+    CustomUser.objects.filter(pk__in=followed_ids, followers_count__gt=0).update(
+        followers_count=F('followers_count') - 1
+    )
+
+
+@receiver(user_followed)
+@receiver(user_unfollowed)
+@receiver(users_followed)
+@receiver(users_unfollowed)
+def mark_suggestions_stale(sender, follower_id, **kwargs):
+    """Queue the follower for the next incremental suggestions run."""
+    CustomUser.objects.filter(pk=follower_id, suggestions_stale=False).update(suggestions_stale=True)
@@ -0,0 +1,157 @@
+"""
+Who-to-follow suggestions from the follow graph.
+
+A user's candidates are the users followed by the people they follow
+(friends of friends) that they do not follow yet. Candidates are ranked by
+how many of the people they follow also follow the candidate, and the top
+``SUGGESTIONS_TOP_K`` are stored in ``FollowSuggestion`` so the API reads
+them with one indexed query.
+
+``compute_suggestions`` is a periodic batch job (``manage.py
+compute_suggestions``, e.g. from cron). Runs are incremental: following or
+unfollowing marks the follower ``suggestions_stale`` (see
+``accounts.signals``). A run first extends the mark to the followers of
+marked users, whose second-degree neighbourhood changed, then recomputes
+only the marked users. ``--full`` recomputes everyone.
+
+Users are processed ``SUGGESTIONS_CHUNK_SIZE`` at a time. Each chunk loads
+only the edges it needs, the chunk's follows and the follows of the users
+they follow, into flat ``array`` buffers of integer ids. Memory is bounded by
+a chunk's two-hop neighbourhood rather than by the size of the graph.
+"""
+
+import heapq
+from array import array
+from bisect import bisect_left
+from collections import Counter
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import CustomUser, FollowSuggestion, UserFollowing
+
+DEFAULT_TOP_K = 20
+DEFAULT_CHUNK_SIZE = 500
+EDGE_FETCH_SIZE = 10000
+
+
+def get_top_k():
+    """Return the number of suggestions stored per user."""
+    return getattr(settings, 'SUGGESTIONS_TOP_K', DEFAULT_TOP_K)
+
+
+def get_chunk_size():
+    """Return the number of users recomputed per transaction."""
+    return getattr(settings, 'SUGGESTIONS_CHUNK_SIZE', DEFAULT_CHUNK_SIZE)
+
+
+class Adjacency:
+    """
+    Follow lists packed into integer arrays (compressed sparse rows).
+
+    ``sources`` holds the sorted follower ids, ``targets`` every followed id
+    grouped by follower, and ``offsets[i]:offsets[i + 1]`` is the slice of
+    ``targets`` followed by ``sources[i]``.
+    """
+
+    def __init__(self, edges):
+        # ``edges`` are (follower_id, followed_id) pairs sorted by follower
+        self.sources = array('q')
+        self.offsets = array('q')
+        self.targets = array('q')
+        for follower_id, followed_id in edges:
+            if not self.sources or self.sources[-1] != follower_id:
+                self.sources.append(follower_id)
+                self.offsets.append(len(self.targets))
+            self.targets.append(followed_id)
+        self.offsets.append(len(self.targets))
+
+    def following(self, user_id):
+        """Return the ids followed by ``user_id``."""
+        index = bisect_left(self.sources, user_id)
+        if index == len(self.sources) or self.sources[index] != user_id:
+            return self.targets[0:0]
+        return self.targets[self.offsets[index]:self.offsets[index + 1]]
+
+
+def load_adjacency(followers):
+    """Return the ``Adjacency`` of the users in ``followers`` (ids or a values() subquery)."""
+    # UserFollowing rows store the followed user in ``user`` and the follower in ``following_user``
+    edges = (
+        UserFollowing.objects.filter(following_user_id__in=followers)
+        .order_by('following_user_id', 'user_id')
+        .values_list('following_user_id', 'user_id')
+        .iterator(chunk_size=EDGE_FETCH_SIZE)
+    )
+    return Adjacency(edges)
+
+
+def rank_candidates(user_ids, top_k):
+    """Return ``{user_id: [(suggested_id, mutual_count), ...]}`` best first for ``user_ids``."""
+    first_hop = load_adjacency(user_ids)
+    second_hop = load_adjacency(
+        UserFollowing.objects.filter(following_user_id__in=user_ids).values('user_id')
+    )
+    results = {}
+    for user_id in user_ids:
+        followed = first_hop.following(user_id)
+        excluded = set(followed)
+        excluded.add(user_id)
+        counts = Counter()
+        for friend_id in followed:
+            counts.update(second_hop.following(friend_id))
+        best = heapq.nsmallest(
+            top_k,
+            ((-count, candidate_id) for candidate_id, count in counts.items() if candidate_id not in excluded),
+        )
+        results[user_id] = [(candidate_id, -count) for count, candidate_id in best]
+    return results
+
+
+def mark_second_degree_stale():
+    """Mark the followers of stale users, since their candidates changed too."""
+    # Uncorrelated on purpose: UPDATE cannot alias its table, so an OuterRef would
+    # resolve against the user table joined inside the subquery
+    followers = UserFollowing.objects.filter(user__suggestions_stale=True).values('following_user_id')
+    return CustomUser.objects.filter(pk__in=followers, suggestions_stale=False).update(suggestions_stale=True)
+
+
+def compute_suggestions(full=False, chunk_size=None, top_k=None):
+    """Recompute suggestions for stale users (every user with ``full``); return how many were processed."""
+    chunk_size = chunk_size or get_chunk_size()
+    top_k = top_k or get_top_k()
+    if full:
+        CustomUser.objects.filter(suggestions_stale=False).update(suggestions_stale=True)
+    else:
+        mark_second_degree_stale()
+
+    processed = 0
+    last_pk = 0
+    while True:
+        chunk = list(
+            CustomUser.objects.filter(suggestions_stale=True, pk__gt=last_pk)
+            .order_by('pk')
+            .values_list('pk', flat=True)[:chunk_size]
+        )
+        if not chunk:
+            return processed
+        last_pk = chunk[-1]
+
+        with transaction.atomic():
+            # Cleared first: a follow made while the chunk is computed marks the user again
+            CustomUser.objects.filter(pk__in=chunk).update(suggestions_stale=False)
+            results = rank_candidates(chunk, top_k)
+            now = timezone.now()
+            FollowSuggestion.objects.filter(user_id__in=chunk).delete()
+            FollowSuggestion.objects.bulk_create(
+                [
+                    FollowSuggestion(
+                        user_id=user_id, suggested_id=suggested_id, mutual_count=mutual_count, computed_at=now,
+                    )
+                    for user_id, ranked in results.items()
+                    for suggested_id, mutual_count in ranked
+                ],
+                batch_size=1000,
+            )
+        processed += len(chunk)
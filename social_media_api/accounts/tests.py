@@ -1,3 +1,247 @@
-from django.test import TestCase
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, APITestCase
+from rest_framework import status
+from unittest import skipUnless
+from django.db import connection
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.test import override_settings
+from notifications.models import Notification
+from posts.models import Post, TimelineEntry
+from .models import UserFollowing
+from .serializers import UserSerializer
+from .suggestions import compute_suggestions
 
-# Create your tests here.
+User = get_user_model()
+
+
+class FollowTestCase(APITestCase):
+    def setUp(self):
+        """Set up two users"""
+        self.user1 = User.objects.create_user(username='follower', password='testpass123')
+        self.user2 = User.objects.create_user(username='followed', password='testpass123')
+        self.client.force_authenticate(user=self.user1)
+
+    def test_follow_counters(self):
+        """Test follow and unfollow keep the stored counters in step"""
+        response = self.client.post(f'/api/accounts/follow/{self.user2.id}/')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.user1.refresh_from_db()
+        self.user2.refresh_from_db()
+        self.assertEqual((self.user1.following_count, self.user2.followers_count), (1, 1))
+
+        response = self.client.post(f'/api/accounts/unfollow/{self.user2.id}/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.user1.refresh_from_db()
+        self.user2.refresh_from_db()
+        self.assertEqual((self.user1.following_count, self.user2.followers_count), (0, 0))
+
+    @override_settings(NOTIFICATIONS_DISPATCHER={'MODE': 'sync'})
+    def test_bulk_follow_and_unfollow(self):
+        """Test the bulk endpoint follows and unfollows several users at once"""
+        user3 = User.objects.create_user(username='third', password='testpass123')
+        ids = [self.user2.id, user3.id, self.user1.id, 999999]
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/accounts/follow/bulk/', {'ids': ids}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['followed'], [self.user2.id, user3.id])
+        self.assertEqual(response.data['skipped'], [self.user1.id])
+        self.assertEqual(response.data['missing'], [999999])
+        self.user1.refresh_from_db()
+        self.assertEqual(self.user1.following_count, 2)
+        self.assertEqual(Notification.objects.filter(actor=self.user1, verb='started following you').count(), 2)
+
+        response = self.client.post('/api/accounts/follow/bulk/', {'ids': [self.user2.id]}, format='json')
+        self.assertEqual(response.data['already_following'], [self.user2.id])
+
+        response = self.client.delete('/api/accounts/follow/bulk/', {'ids': [self.user2.id, user3.id]}, format='json')
+        self.assertEqual(response.data['unfollowed'], [self.user2.id, user3.id])
+        self.user1.refresh_from_db()
+        self.user2.refresh_from_db()
+        self.assertEqual((self.user1.following_count, self.user2.followers_count), (0, 0))
+
+    def test_bulk_follow_query_count(self):
+        """Test bulk follow and unfollow run the same queries for 1 and 20 users"""
+        users = [User.objects.create(username=f'bulk{i}') for i in range(20)]
+        for user in users:
+            Post.objects.create(title='Bulk post', content='Some content here', author=user)
+        # Notifications look the content type up once per process
+        ContentType.objects.get_for_model(User)
+        for ids in ([users[0].id], [user.id for user in users]):
+            with self.assertNumQueries(12):
+                self.client.post('/api/accounts/follow/bulk/', {'ids': ids}, format='json')
+            with self.assertNumQueries(10):
+                self.client.delete('/api/accounts/follow/bulk/', {'ids': ids}, format='json')
+
+        self.client.post('/api/accounts/follow/bulk/', {'ids': [user.id for user in users]}, format='json')
+        self.user1.refresh_from_db()
+        users[0].refresh_from_db()
+        self.assertEqual((self.user1.following_count, users[0].followers_count), (20, 1))
+        self.assertEqual(TimelineEntry.objects.filter(user=self.user1).count(), 20)
+        self.client.delete('/api/accounts/follow/bulk/', {'ids': [user.id for user in users]}, format='json')
+        self.user1.refresh_from_db()
+        users[0].refresh_from_db()
+        self.assertEqual((self.user1.following_count, users[0].followers_count), (0, 0))
+        self.assertFalse(TimelineEntry.objects.filter(user=self.user1).exists())
+
+    def test_relationship_service(self):
+        """Test the UserFollowing helpers answer membership questions without loading follow lists"""
+        user3 = User.objects.create_user(username='third', password='testpass123')
+        self.assertTrue(UserFollowing.objects.follow(self.user1, self.user2))
+        self.assertFalse(UserFollowing.objects.follow(self.user1, self.user2))
+        UserFollowing.objects.follow(self.user2, self.user1)
+        UserFollowing.objects.follow(self.user1, user3.pk)
+
+        with self.assertNumQueries(1):
+            self.assertTrue(UserFollowing.objects.is_following(self.user1, self.user2))
+        self.assertFalse(UserFollowing.objects.is_following(self.user2, user3))
+        with self.assertNumQueries(1):
+            self.assertEqual(
+                UserFollowing.objects.follows_many(self.user1, [self.user2.id, user3.id, 999999]),
+                {self.user2.id, user3.id},
+            )
+        self.assertEqual(list(UserFollowing.objects.mutuals(self.user1)), [self.user2])
+
+        self.assertTrue(UserFollowing.objects.unfollow(self.user1, user3))
+        self.assertFalse(UserFollowing.objects.unfollow(self.user1, user3))
+        self.user1.refresh_from_db()
+        self.assertEqual(self.user1.following_count, 1)
+
+    def test_follow_twice(self):
+        """Test following the same user twice is rejected"""
+        self.client.post(f'/api/accounts/follow/{self.user2.id}/')
+        response = self.client.post(f'/api/accounts/follow/{self.user2.id}/')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.user2.refresh_from_db()
+        self.assertEqual(self.user2.followers_count, 1)
+
+    def test_user_expand_is_following(self):
+        """Test ?expand=is_following adds the viewer's follow state to a profile"""
+        UserFollowing.objects.follow(self.user1, self.user2)
+        response = self.client.get('/api/accounts/users/followed/')
+        self.assertNotIn('is_following', response.data)
+        response = self.client.get('/api/accounts/users/followed/?expand=is_following&fields=username,is_following')
+        self.assertEqual(response.data, {'username': 'followed', 'is_following': True})
+
+    def test_is_following_reads_context_set(self):
+        """Test is_following uses a precomputed followed_by_me set instead of one query per user"""
+        user3 = User.objects.create_user(username='third', password='testpass123')
+        UserFollowing.objects.follow(self.user1, self.user2)
+        request = Request(APIRequestFactory().get('/', {'expand': 'is_following'}))
+        request.user = self.user1
+        users = [self.user1, self.user2, user3]
+        with self.assertNumQueries(1):
+            context = {
+                'request': request,
+                'followed_by_me': UserFollowing.objects.follows_many(self.user1, [user.pk for user in users]),
+            }
+            data = UserSerializer(users, many=True, context=context).data
+        self.assertEqual([user['is_following'] for user in data], [False, True, False])
+        # Without the set each user falls back to its own EXISTS query
+        with self.assertNumQueries(2):
+            data = UserSerializer(users, many=True, context={'request': request}).data
+        self.assertEqual([user['is_following'] for user in data], [False, True, False])
+
+    def test_profile_conditional_get(self):
+        """Test an unchanged profile answers If-None-Match with 304 and a follow changes its ETag"""
+        url = '/api/accounts/users/followed/?expand=is_following'
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        UserFollowing.objects.follow(self.user1, self.user2)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data['is_following'])
+        self.assertNotEqual(response['ETag'], etag)
+
+
+class FollowListTestCase(APITestCase):
+    def setUp(self):
+        """Set up a user followed by several others, one of whom the viewer follows"""
+        self.viewer = User.objects.create_user(username='viewer', password='testpass123')
+        self.star = User.objects.create_user(username='star', password='testpass123')
+        self.fans = [User.objects.create_user(username=f'fan{number}', password='testpass123') for number in range(5)]
+        for fan in self.fans:
+            UserFollowing.objects.follow(fan, self.star)
+        UserFollowing.objects.follow(self.viewer, self.fans[0])
+        self.client.force_authenticate(user=self.viewer)
+
+    def walk(self, url):
+        users = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            users.extend(response.data['results'])
+            url = response.data['next']
+        return users
+
+    def test_followers_walk_newest_first(self):
+        """Test the followers list pages by cursor and flags users the viewer follows"""
+        users = self.walk('/api/accounts/users/star/followers/?page_size=2')
+        self.assertEqual([user['username'] for user in users], [f'fan{number}' for number in reversed(range(5))])
+        self.assertEqual([user['username'] for user in users if user['is_followed_by_me']], ['fan0'])
+
+    def test_following_list(self):
+        """Test the following list shows the users a user follows"""
+        users = self.walk('/api/accounts/users/fan0/following/')
+        self.assertEqual([user['username'] for user in users], ['star'])
+
+    def test_constant_queries_per_page(self):
+        """Test a page costs the same number of queries whatever its size"""
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/accounts/users/star/followers/?page_size=5')
+        self.assertEqual(len(response.data['results']), 5)
+
+    def test_unknown_user(self):
+        """Test listing the followers of a missing user returns 404"""
+        response = self.client.get('/api/accounts/users/nobody/followers/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    @skipUnless(connection.vendor == 'sqlite', 'Query plans are checked on SQLite')
+    def test_lists_scan_follow_indexes(self):
+        """Test both lists are read from the keyset indexes on UserFollowing without sorting"""
+        for owner_field, index_name in [('user', 'accounts_followers_recent'),
+                                        ('following_user', 'accounts_following_recent')]:
+            plan = (
+                UserFollowing.objects.filter(**{owner_field: self.star.pk})
+                .order_by('-created_at', '-id')[:10]
+                .explain()
+            )
+            self.assertRegex(plan, rf'USING (COVERING )?INDEX {index_name}\b')
+            self.assertNotIn('TEMP B-TREE', plan)
+
+
+class SuggestionsTestCase(APITestCase):
+    def setUp(self):
+        """Set up a small follow graph around one user"""
+        names = ['me', 'alice', 'bob', 'carol', 'dave', 'erin']
+        self.users = {name: User.objects.create_user(username=name, password='testpass123') for name in names}
+        for follower, followed in [('me', 'alice'), ('me', 'bob'), ('alice', 'carol'), ('alice', 'dave'),
+                                   ('bob', 'carol'), ('alice', 'me')]:
+            UserFollowing.objects.follow(self.users[follower], self.users[followed])
+        self.client.force_authenticate(user=self.users['me'])
+
+    def suggestions(self):
+        response = self.client.get('/api/accounts/suggestions/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [(item['user']['username'], item['mutual_count']) for item in response.data]
+
+    def test_friends_of_friends_ranked_by_mutuals(self):
+        """Test suggestions are second-degree users ranked by how many followed users follow them"""
+        self.assertEqual(compute_suggestions(chunk_size=2), len(self.users))
+        self.assertEqual(self.suggestions(), [('carol', 2), ('dave', 1)])
+
+    def test_incremental_run_only_recomputes_affected_users(self):
+        """Test a run after one follow only recomputes the follower and their followers"""
+        compute_suggestions()
+        UserFollowing.objects.follow(self.users['bob'], self.users['dave'])
+        self.assertEqual(compute_suggestions(), 2)
+        self.assertEqual(self.suggestions(), [('carol', 2), ('dave', 2)])
+
+    def test_followed_users_are_hidden_before_next_run(self):
+        """Test a suggestion disappears as soon as the user follows it"""
+        compute_suggestions()
+        self.client.post(f"/api/accounts/follow/{self.users['carol'].id}/")
+        self.assertEqual(self.suggestions(), [('dave', 1)])
@@ -16,9 +16,15 @@ urlpatterns = [
     # User profile - as required by the task
     path('profile/', views.UserProfileView.as_view(), name='profile'),
     path('users/<str:username>/', views.UserDetailView.as_view(), name='user_detail'),
+    path('users/<str:username>/followers/', views.FollowersListView.as_view(), name='user_followers'),
+    path('users/<str:username>/following/', views.FollowingListView.as_view(), name='user_following'),
     path('change-password/', views.ChangePasswordView.as_view(), name='change_password'),
     
     # Follow/Unfollow - as required by the task
     path('follow/<int:user_id>/', views.FollowUserView.as_view(), name='follow_user'),
     path('unfollow/<int:user_id>/', views.UnfollowUserView.as_view(), name='unfollow_user'),
+    path('follow/bulk/', views.BulkFollowView.as_view(), name='bulk_follow'),
+    
+    # Who-to-follow suggestions
+    path('suggestions/', views.SuggestionsView.as_view(), name='suggestions'),
 ]
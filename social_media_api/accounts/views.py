@@ -5,15 +5,26 @@ from rest_framework_simplejwt.views import TokenObtainPairView
 from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.authtoken.models import Token
 from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Value
+from django.shortcuts import get_object_or_404
 from .serializers import (
     UserSerializer, 
     RegisterSerializer, 
     CustomTokenObtainPairSerializer,
     ChangePasswordSerializer,
+    FollowListUserSerializer,
+    FollowSuggestionSerializer,
     LoginSerializer
 )
 from rest_framework.permissions import IsAuthenticated
-from .models import CustomUser
+from .models import CustomUser, FollowSuggestion, UserFollowing, lock_user
+from .signals import users_followed, users_unfollowed
+from notifications.dispatch import notify_many
+from social_media_api.batching import batched
+from social_media_api.conditional import ConditionalRetrieveMixin
+from social_media_api.pagination import KeysetPagination
+from social_media_api.serializers import BulkIdsSerializer
 
 User = get_user_model()
 
@@ -90,18 +101,98 @@ class ChangePasswordView(generics.UpdateAPIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class UserDetailView(generics.RetrieveAPIView):
+class UserDetailView(ConditionalRetrieveMixin, generics.RetrieveAPIView):
     """Retrieve a user's public profile."""
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
     lookup_field = 'username'
+    # Users have no modification time, so the ETag covers every rendered column
+    conditional_fields = (
+        'id', 'username', 'email', 'first_name', 'last_name', 'bio', 'profile_picture', 'date_of_birth',
+        'location', 'website', 'followers_count', 'following_count', 'posts_count', 'is_following',
+    )
+
+    def get_conditional_queryset(self):
+        viewer = self.request.user
+        if not viewer.is_authenticated:
+            return User.objects.annotate(is_following=Value(False))
+        # UserFollowing rows store the followed user in ``user`` and the follower in ``following_user``
+        return User.objects.annotate(
+            is_following=Exists(UserFollowing.objects.filter(user=OuterRef('pk'), following_user=viewer))
+        )
+
+
+class FollowListView(generics.ListAPIView):
+    """Base view listing one side of a user's follow relationships, newest first.
+    
+    Pages are read from ``UserFollowing`` by keyset on ``(created_at, id)``,
+    so each page is one range scan of the relationship index joined to the
+    page's users by primary key.
+    """
+    serializer_class = FollowListUserSerializer
+    permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    pagination_class = KeysetPagination
+    keyset_ordering = ('-created_at', '-id')
+    # UserFollowing field holding the listed user's id, and the one matched against the profile
+    listed_field = None
+    owner_field = None
+
+    def get_queryset(self):
+        owner_id = get_object_or_404(User.objects.values_list('pk', flat=True), username=self.kwargs['username'])
+        return UserFollowing.objects.filter(**{self.owner_field: owner_id}).select_related(self.listed_field)
+
+    def list(self, request, *args, **kwargs):
+        page = self.paginate_queryset(self.get_queryset())
+        users = [getattr(follow, self.listed_field) for follow in page]
+        if request.user.is_authenticated:
+            # One query for the whole page instead of one per user
+            self.followed_by_me = UserFollowing.objects.follows_many(request.user, [user.pk for user in users])
+        serializer = self.get_serializer(users, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['followed_by_me'] = getattr(self, 'followed_by_me', set())
+        return context
+
+
+class FollowersListView(FollowListView):
+    """List the users following a user."""
+    # UserFollowing rows store the followed user in ``user`` and the follower in ``following_user``
+    owner_field = 'user'
+    listed_field = 'following_user'
+
+
+class FollowingListView(FollowListView):
+    """List the users a user follows."""
+    owner_field = 'following_user'
+    listed_field = 'user'
+
+
+class SuggestionsView(generics.ListAPIView):
+    """Who-to-follow suggestions for the current user, precomputed by ``compute_suggestions``."""
+    serializer_class = FollowSuggestionSerializer
+    permission_classes = [IsAuthenticated]
+    # At most SUGGESTIONS_TOP_K rows are stored per user
+    pagination_class = None
+
+    def get_queryset(self):
+        # Users followed since the last run are dropped until it catches up
+        followed = UserFollowing.objects.filter(following_user=self.request.user, user=OuterRef('suggested'))
+        return (
+            FollowSuggestion.objects.filter(user=self.request.user)
+            .exclude(Exists(followed))
+            .select_related('suggested')
+            .order_by('-mutual_count', 'suggested_id')
+        )
 
 
 class FollowUserView(generics.GenericAPIView):
     """Follow a user."""
     permission_classes = [IsAuthenticated]
 
+    @transaction.atomic
     def post(self, request, user_id, *args, **kwargs):
         try:
             user_to_follow = CustomUser.objects.all().get(id=user_id)
@@ -117,15 +208,14 @@ class FollowUserView(generics.GenericAPIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        if user_to_follow in request.user.following.all():
+        # Follow; the unique constraint rejects a repeat without reading the following list
+        lock_user(request.user)
+        if not UserFollowing.objects.follow(request.user, user_to_follow):
             return Response(
                 {"detail": f"You are already following {user_to_follow.username}"},
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Follow
-        request.user.following.add(user_to_follow)
-        
         # Create notification for the followed user
         from notifications.views import create_notification
         create_notification(
@@ -145,6 +235,7 @@ class UnfollowUserView(generics.GenericAPIView):
     """Unfollow a user."""
     permission_classes = [IsAuthenticated]
 
+    @transaction.atomic
     def post(self, request, user_id, *args, **kwargs):
         try:
             user_to_unfollow = CustomUser.objects.all().get(id=user_id)
@@ -160,15 +251,72 @@ class UnfollowUserView(generics.GenericAPIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        if user_to_unfollow not in request.user.following.all():
+        # Unfollow
+        lock_user(request.user)
+        if not UserFollowing.objects.unfollow(request.user, user_to_unfollow):
             return Response(
                 {"detail": f"You are not following {user_to_unfollow.username}"},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        
-        # Unfollow
-        request.user.following.remove(user_to_unfollow)
         return Response(
             {"status": "unfollowed", "detail": f"You have unfollowed {user_to_unfollow.username}"},
             status=status.HTTP_200_OK
         )
+
+
+class BulkFollowView(generics.GenericAPIView):
+    """Follow (POST) or unfollow (DELETE) up to ``BULK_ACTION_MAX_IDS`` users in one request."""
+    permission_classes = [IsAuthenticated]
+    serializer_class = BulkIdsSerializer
+
+    def get_user_ids(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return serializer.validated_data['ids']
+
+    @transaction.atomic
+    def post(self, request, *args, **kwargs):
+        """Follow every existing user in ``ids``."""
+        user_ids = self.get_user_ids(request)
+        # Holding the lock, no other follow by this user can land between the read and the insert,
+        # so ``followed`` is exactly the rows inserted below
+        lock_user(request.user)
+        users = CustomUser.objects.only('id').in_bulk(user_ids)
+        already_following = UserFollowing.objects.follows_many(request.user, users)
+        followed = [
+            user_id for user_id in user_ids
+            if user_id in users and user_id != request.user.pk and user_id not in already_following
+        ]
+
+        UserFollowing.objects.bulk_create(
+            [UserFollowing(user_id=user_id, following_user=request.user) for user_id in followed],
+            ignore_conflicts=True,
+        )
+        # bulk_create sends no post_save; one batched signal updates counters and the timeline
+        if followed:
+            users_followed.send(sender=UserFollowing, follower_id=request.user.pk, followed_ids=followed)
+        notify_many(request.user, 'started following you', [(user_id, request.user) for user_id in followed])
+
+        return Response({
+            'followed': followed,
+            'already_following': [user_id for user_id in user_ids if user_id in already_following],
+            'skipped': [user_id for user_id in user_ids if user_id == request.user.pk],
+            'missing': [user_id for user_id in user_ids if user_id not in users],
+        })
+
+    @transaction.atomic
+    def delete(self, request, *args, **kwargs):
+        """Unfollow every user in ``ids``."""
+        user_ids = self.get_user_ids(request)
+        lock_user(request.user)
+        follows = UserFollowing.objects.filter(following_user=request.user, user_id__in=user_ids)
+        unfollowed = set(follows.values_list('user_id', flat=True))
+        # The per-row post_delete work is skipped and applied by one batched signal instead
+        batched(follows).delete()
+        if unfollowed:
+            users_unfollowed.send(sender=UserFollowing, follower_id=request.user.pk, followed_ids=list(unfollowed))
+
+        return Response({
+            'unfollowed': [user_id for user_id in user_ids if user_id in unfollowed],
+            'not_following': [user_id for user_id in user_ids if user_id not in unfollowed],
+        })
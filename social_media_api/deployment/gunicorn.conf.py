@@ -8,9 +8,15 @@ import os
 bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
 backlog = 2048
 
-# Worker processes
-workers = int(os.environ.get('WEB_CONCURRENCY', 2))
-worker_class = 'sync'
+# Application: the ASGI one, as the notification stream cannot run under WSGI
+wsgi_app = 'social_media_api.asgi:application'
+
+# Worker processes. The default notification hub (notifications.hub.LocalHub)
+# only reaches clients connected to the same process; other workers' streams
+# and long-polls see a notification only when they re-read the table on their
+# next heartbeat. Keep one worker until a cross-process hub is configured.
+workers = int(os.environ.get('WEB_CONCURRENCY', 1))
+worker_class = 'uvicorn.workers.UvicornWorker'
 worker_connections = 1000
 timeout = 30
 keepalive = 2
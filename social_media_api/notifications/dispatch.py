@@ -0,0 +1,247 @@
+"""
+Asynchronous notification pipeline.
+
+Views call ``notify()`` (or ``notify_many()`` for bulk actions) instead of
+writing ``Notification`` rows themselves. Events are handed to an in-process
+dispatcher once the surrounding transaction commits, so the request does not
+wait for notification writes and rolled-back actions never notify anyone.
+
+The dispatcher batches events and writes them with ``bulk_create`` once
+``BATCH_SIZE`` events are queued or ``FLUSH_INTERVAL`` seconds have passed.
+Bursts aimed at the same recipient and target (for example many likes on one
+post) are coalesced into a single row whose ``actor_count`` grows with each
+new actor (``actor_ids`` remembers who was counted), which is rendered as
+"alice and 12 others liked your post". Unread notifications
+already in the database are coalesced the same way. Written notifications
+are published to the recipients' stream (see ``notifications.hub``).
+
+Configured with the ``NOTIFICATIONS_DISPATCHER`` setting:
+
+- ``MODE``: ``'thread'`` (default) writes from a background worker thread,
+  ``'sync'`` writes immediately after commit (useful for tests and scripts).
+- ``BATCH_SIZE``: maximum number of events written per flush (default: 100).
+- ``FLUSH_INTERVAL``: seconds to wait for a batch to fill (default: 1.0).
+"""
+
+import atexit
+import logging
+import queue
+import threading
+import time
+from collections import Counter, OrderedDict, defaultdict, namedtuple
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .hub import publish_notifications
+
+logger = logging.getLogger(__name__)
+
+NotificationEvent = namedtuple(
+    'NotificationEvent',
+    ['recipient_id', 'actor_id', 'verb', 'target_content_type_id', 'target_object_id'],
+)
+
+DEFAULTS = {
+    'MODE': 'thread',
+    'BATCH_SIZE': 100,
+    'FLUSH_INTERVAL': 1.0,
+}
+
+
+def get_setting(name):
+    return getattr(settings, 'NOTIFICATIONS_DISPATCHER', {}).get(name, DEFAULTS[name])
+
+
+def coalesce(events):
+    """
+    Merge events that share a recipient, verb and target.
+
+    Returns an ordered mapping of ``(recipient_id, verb, content_type_id,
+    object_id)`` to ``(latest_actor_id, actor_ids)``.
+    """
+    groups = OrderedDict()
+    for event in events:
+        key = (event.recipient_id, event.verb, event.target_content_type_id, event.target_object_id)
+        _, actor_ids = groups.pop(key, (None, set()))
+        actor_ids.add(event.actor_id)
+        groups[key] = (event.actor_id, actor_ids)
+    return groups
+
+
+def write_events(events):
+    """Persist a batch of events, merging them into matching unread notifications."""
+    from .models import Notification, adjust_unread_count
+
+    groups = coalesce(events)
+    if not groups:
+        return []
+
+    existing = {}
+    candidates = Notification.objects.filter(
+        read=False,
+        recipient_id__in={key[0] for key in groups},
+        verb__in={key[1] for key in groups},
+        target_object_id__in={key[3] for key in groups},
+    ).order_by('timestamp')
+    for notification in candidates:
+        key = (
+            notification.recipient_id,
+            notification.verb,
+            notification.target_content_type_id,
+            notification.target_object_id,
+        )
+        if key in groups:
+            existing[key] = notification
+
+    now = timezone.now()
+    to_create, to_update = [], []
+    for key, (actor_id, actor_ids) in groups.items():
+        notification = existing.get(key)
+        if notification is not None:
+            known = set(notification.actor_ids) or {notification.actor_id}
+            notification.actor_count += len(actor_ids - known)
+            notification.actor_ids = sorted(known | actor_ids)
+            notification.actor_id = actor_id
+            notification.timestamp = now
+            to_update.append(notification)
+        else:
+            recipient_id, verb, content_type_id, object_id = key
+            to_create.append(Notification(
+                recipient_id=recipient_id,
+                actor_id=actor_id,
+                verb=verb,
+                target_content_type_id=content_type_id,
+                target_object_id=object_id,
+                actor_count=len(actor_ids),
+                actor_ids=sorted(actor_ids),
+            ))
+
+    # Merged rows were already unread, so only new rows move the unread counters
+    new_per_recipient = Counter(notification.recipient_id for notification in to_create)
+    recipients_by_delta = defaultdict(list)
+    for recipient_id, delta in new_per_recipient.items():
+        recipients_by_delta[delta].append(recipient_id)
+
+    with transaction.atomic():
+        if to_update:
+            Notification.objects.bulk_update(to_update, ['actor', 'actor_count', 'actor_ids', 'timestamp'])
+        if to_create:
+            to_create = Notification.objects.bulk_create(to_create)
+        for delta, recipient_ids in recipients_by_delta.items():
+            adjust_unread_count(recipient_ids, delta)
+    written = to_create + to_update
+    publish_notifications(written)
+    return written
+
+
+class NotificationDispatcher:
+    """Queue notification events and write them in coalesced batches."""
+
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = None
+
+    def enqueue(self, event):
+        self.enqueue_many([event])
+
+    def enqueue_many(self, events):
+        if get_setting('MODE') == 'sync':
+            write_events(events)
+            return
+        for event in events:
+            self._queue.put(event)
+        self._ensure_worker()
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(
+                    target=self._run, name='notification-dispatcher', daemon=True,
+                )
+                self._worker.start()
+
+    def _next_batch(self):
+        batch = [self._queue.get()]
+        batch_size = get_setting('BATCH_SIZE')
+        deadline = time.monotonic() + get_setting('FLUSH_INTERVAL')
+        while len(batch) < batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch):
+        try:
+            write_events(batch)
+        except Exception:
+            logger.exception('Failed to write %d notification events', len(batch))
+        finally:
+            close_old_connections()
+
+    def _run(self):
+        while True:
+            self._write(self._next_batch())
+
+    def flush(self):
+        """Write every queued event in the calling thread."""
+        batch = []
+        while True:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        if batch:
+            self._write(batch)
+        return len(batch)
+
+
+dispatcher = NotificationDispatcher()
+atexit.register(dispatcher.flush)
+
+
+def notify(recipient, actor, verb, target):
+    """
+    Notify ``recipient`` that ``actor`` did ``verb`` to ``target``.
+
+    Nothing is written for actions on one's own content. The event is
+    dispatched after the current transaction commits.
+    """
+    if recipient.pk == actor.pk:
+        return
+    event = _event(recipient.pk, actor.pk, verb, target)
+    transaction.on_commit(lambda: dispatcher.enqueue(event))
+
+
+def notify_many(actor, verb, targets):
+    """
+    Notify several recipients that ``actor`` did ``verb``.
+
+    ``targets`` is an iterable of ``(recipient_id, target)`` pairs, as sent by
+    the bulk endpoints. The events are dispatched together, as one batch,
+    after the current transaction commits.
+    """
+    events = [
+        _event(recipient_id, actor.pk, verb, target)
+        for recipient_id, target in targets
+        if recipient_id != actor.pk
+    ]
+    if events:
+        transaction.on_commit(lambda: dispatcher.enqueue_many(events))
+
+
+def _event(recipient_id, actor_id, verb, target):
+    return NotificationEvent(
+        recipient_id=recipient_id,
+        actor_id=actor_id,
+        verb=verb,
+        target_content_type_id=ContentType.objects.get_for_model(target).pk,
+        target_object_id=target.pk,
+    )
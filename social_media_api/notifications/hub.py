@@ -0,0 +1,178 @@
+"""
+Publish/subscribe hub for pushing notifications to connected clients.
+
+The dispatcher publishes every notification it writes to the recipient's
+channel; the streaming views in ``notifications.streaming`` subscribe to the
+channel of the user they serve. Subscribers are ``asyncio`` queues, so a
+worker can hold many idle connections without a thread per client.
+
+The hub is pluggable through ``NOTIFICATIONS_STREAM['HUB']``:
+
+- ``notifications.hub.LocalHub`` (default) delivers messages to subscribers
+  in the same process. It is enough for a single ASGI worker and for tests.
+- A multi-worker deployment can provide a hub with the same interface that
+  publishes to a Redis channel per user and relays it to local subscribers.
+"""
+
+import asyncio
+import logging
+import threading
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'HUB': 'notifications.hub.LocalHub',
+    # Messages buffered per subscriber before the oldest are dropped
+    'QUEUE_SIZE': 100,
+    # Seconds between SSE keep-alive comments
+    'HEARTBEAT': 15,
+    # Seconds a long-poll request waits for a notification
+    'LONG_POLL_TIMEOUT': 25,
+}
+
+
+def get_setting(name):
+    return getattr(settings, 'NOTIFICATIONS_STREAM', {}).get(name, DEFAULTS[name])
+
+
+class BaseHub:
+    """Interface shared by all hubs."""
+
+    def publish(self, user_id, message):
+        """Send ``message`` to every subscriber of ``user_id``; safe to call from any thread."""
+        raise NotImplementedError
+
+    def subscribe(self, user_id):
+        """Return a ``Subscription`` to ``user_id``; must be called from a running event loop."""
+        raise NotImplementedError
+
+    def listening(self, user_ids):
+        """Return the subset of ``user_ids`` that may have subscribers."""
+        return set(user_ids)
+
+
+class Subscription:
+    """An async iterator of messages for one user, closed with ``close()`` or ``async with``."""
+
+    def __init__(self, hub, user_id):
+        self.hub = hub
+        self.user_id = user_id
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=get_setting('QUEUE_SIZE'))
+
+    def put(self, message):
+        # Runs on the subscriber's loop; a slow client loses its oldest messages
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(message)
+
+    async def get(self, timeout=None):
+        """Return the next message, or None after ``timeout`` seconds."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def drain(self):
+        """Return every message already queued without waiting."""
+        messages = []
+        while not self.queue.empty():
+            messages.append(self.queue.get_nowait())
+        return messages
+
+    def close(self):
+        self.hub.unsubscribe(self)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.close()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        return await self.queue.get()
+
+
+class LocalHub(BaseHub):
+    """In-process hub; only reaches subscribers connected to this process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # user_id -> set of Subscription
+        self._subscriptions = {}
+
+    def subscribe(self, user_id):
+        subscription = Subscription(self, user_id)
+        with self._lock:
+            self._subscriptions.setdefault(user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.user_id, set())
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                self._subscriptions.pop(subscription.user_id, None)
+
+    def listening(self, user_ids):
+        with self._lock:
+            return {user_id for user_id in user_ids if user_id in self._subscriptions}
+
+    def publish(self, user_id, message):
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(user_id, ()))
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.put, message)
+            except RuntimeError:
+                # The subscriber's event loop has shut down
+                subscription.close()
+
+
+_hubs = {}
+
+
+def get_hub():
+    """Return the configured hub instance."""
+    path = get_setting('HUB')
+    if path not in _hubs:
+        _hubs[path] = import_string(path)()
+    return _hubs[path]
+
+
+@receiver(setting_changed)
+def _reset_hub(setting, **kwargs):
+    if setting == 'NOTIFICATIONS_STREAM':
+        _hubs.clear()
+
+
+def publish_notifications(notifications):
+    """Serialize ``notifications`` and publish each one to its recipient's channel."""
+    from .models import Notification
+    from .serializers import NotificationSerializer
+
+    hub = get_hub()
+    listening = hub.listening({notification.recipient_id for notification in notifications})
+    if not listening:
+        return
+    # Reload with the actor and target the serializer needs, in a constant number of queries
+    pks = [notification.pk for notification in notifications if notification.recipient_id in listening]
+    queryset = (
+        Notification.objects.filter(pk__in=pks)
+        .select_related('actor', 'target_content_type')
+        .with_targets()
+        .order_by('timestamp', 'id')
+    )
+    for notification in queryset:
+        try:
+            hub.publish(notification.recipient_id, NotificationSerializer(notification).data)
+        except Exception:
+            logger.exception('Failed to publish notification %s', notification.pk)
@@ -0,0 +1,37 @@
+# Generated by Django 5.0.14 on 2026-10-18 02:29
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("contenttypes", "0002_remove_content_type_name"),
+        ("notifications", "0003_notification_actor_count"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="notification",
+            name="notificatio_recipie_be3f1a_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="notification",
+            name="notificatio_read_df532f_idx",
+        ),
+        migrations.RenameIndex(
+            model_name="notification",
+            new_name="notif_recipient_recent",
+            old_name="notificatio_recipie_f6c878_idx",
+        ),
+        migrations.AddIndex(
+            model_name="notification",
+            index=models.Index(
+                condition=models.Q(("read", False)),
+                fields=["recipient"],
+                name="notif_unread_recipient",
+            ),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.0.14 on 2026-10-18 02:41
+
+from django.db import migrations
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def populate_unread_counts(apps, schema_editor):
+    CustomUser = apps.get_model("accounts", "CustomUser")
+    Notification = apps.get_model("notifications", "Notification")
+
+    unread = (
+        Notification.objects.filter(recipient=OuterRef("pk"), read=False)
+        .order_by()
+        .values("recipient")
+        .annotate(total=Count("*"))
+        .values("total")
+    )
+    CustomUser.objects.update(unread_notifications_count=Coalesce(Subquery(unread), Value(0)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0007_customuser_unread_notifications_count"),
+        ("notifications", "0004_composite_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_unread_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.14 on 2026-10-18 04:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("notifications", "0005_populate_unread_counts"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="notification",
+            name="actor_ids",
+            field=models.JSONField(default=list, editable=False),
+        ),
+    ]
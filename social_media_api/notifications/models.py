@@ -1,11 +1,39 @@
 from django.db import models
+from django.db.models import F
+from django.db.models.functions import Greatest
 from django.contrib.auth import get_user_model
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.contenttypes.fields import GenericForeignKey
+from django.contrib.contenttypes.prefetch import GenericPrefetch
 
 User = get_user_model()
 
 
+def adjust_unread_count(recipient_ids, delta):
+    """Add ``delta`` to the stored unread counter of ``recipient_ids``, never going below zero."""
+    User.objects.filter(pk__in=recipient_ids).update(
+        unread_notifications_count=Greatest(F('unread_notifications_count') + delta, 0)
+    )
+
+
+class NotificationQuerySet(models.QuerySet):
+    """QuerySet with helpers for list endpoints."""
+    
+    def with_targets(self):
+        """
+        Prefetch ``target`` with one query per content type on the page.
+        
+        Only the columns ``NotificationSerializer.get_target_url`` reads are
+        loaded; a comment's post is resolved through its ``post_id``.
+        """
+        from posts.models import Comment, Post
+        return self.prefetch_related(GenericPrefetch('target', [
+            Post.objects.only('id'),
+            Comment.objects.only('id', 'post'),
+            User.objects.only('id', 'username'),
+        ]))
+
+
 class Notification(models.Model):
     """Model for user notifications."""
     
@@ -17,13 +45,26 @@ class Notification(models.Model):
     target = GenericForeignKey('target_content_type', 'target_object_id')
     timestamp = models.DateTimeField(auto_now_add=True)
     read = models.BooleanField(default=False)
+    # Number of distinct actors coalesced into this notification
+    actor_count = models.PositiveIntegerField(default=1)
+    # Ids of those actors, so a repeat by an earlier actor is not counted twice;
+    # empty on rows written before it existed, which only know ``actor``
+    actor_ids = models.JSONField(default=list, editable=False)
+    
+    objects = NotificationQuerySet.as_manager()
     
     class Meta:
         ordering = ['-timestamp']
         indexes = [
-            models.Index(fields=['recipient']),
             models.Index(fields=['timestamp']),
-            models.Index(fields=['read']),
+            # Keyset pagination order for a recipient's notifications; also serves lookups on recipient alone
+            models.Index(fields=['recipient', '-timestamp', '-id'], name='notif_recipient_recent'),
+            # Unread notifications are a small fraction of the table, so index only those
+            models.Index(
+                fields=['recipient'],
+                condition=models.Q(read=False),
+                name='notif_unread_recipient',
+            ),
         ]
     
     def __str__(self):
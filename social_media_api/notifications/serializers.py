@@ -1,10 +1,24 @@
+from collections import defaultdict
+
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.utils.timesince import timesince
+from social_media_api.fastpath import ValuesSerializer
 from .models import Notification
 
 User = get_user_model()
 
 
+def summarize(username, actor_count, verb):
+    """Return a sentence such as "alice and 12 others liked your post"."""
+    others = actor_count - 1
+    if others <= 0:
+        return f'{username} {verb}'
+    noun = 'other' if others == 1 else 'others'
+    return f'{username} and {others} {noun} {verb}'
+
+
 class ActorSerializer(serializers.ModelSerializer):
     """Serializer for the actor field in notifications."""
     
@@ -19,27 +33,92 @@ class NotificationSerializer(serializers.ModelSerializer):
     actor = ActorSerializer(read_only=True)
     target_url = serializers.SerializerMethodField()
     time_since = serializers.SerializerMethodField()
+    summary = serializers.SerializerMethodField()
     
     class Meta:
         model = Notification
         fields = [
-            'id', 'actor', 'verb', 'target_url', 
+            'id', 'actor', 'verb', 'actor_count', 'summary', 'target_url', 
             'timestamp', 'time_since', 'read'
         ]
-        read_only_fields = ['id', 'timestamp']
+        read_only_fields = ['id', 'timestamp', 'actor_count']
     
     def get_target_url(self, obj):
         """Get URL for the notification target."""
-        if hasattr(obj.target, 'id'):
-            if obj.target.__class__.__name__ == 'Post':
-                return f'/api/posts/{obj.target.id}/'
-            elif obj.target.__class__.__name__ == 'Comment':
-                return f'/api/posts/{obj.target.post.id}/comments/{obj.target.id}/'
-            elif obj.target.__class__.__name__ == 'CustomUser':
-                return f'/api/users/{obj.target.username}/'
+        target = obj.target
+        if hasattr(target, 'id'):
+            if target.__class__.__name__ == 'Post':
+                return f'/api/posts/{target.id}/'
+            elif target.__class__.__name__ == 'Comment':
+                # post_id avoids loading the post; see NotificationQuerySet.with_targets
+                return f'/api/posts/{target.post_id}/comments/{target.id}/'
+            elif target.__class__.__name__ == 'CustomUser':
+                return f'/api/users/{target.username}/'
         return None
     
+    def get_summary(self, obj):
+        """Get a sentence such as "alice and 12 others liked your post"."""
+        return summarize(obj.actor.username, obj.actor_count, obj.verb)
+    
     def get_time_since(self, obj):
         """Get human-readable time since notification was created."""
-        from django.utils.timesince import timesince
-        return timesince(obj.timestamp)
\ No newline at end of file
+        return timesince(obj.timestamp)
+
+
+class ActorValuesSerializer(ValuesSerializer):
+    """Fast read-only rendering of ``ActorSerializer``."""
+    
+    serializer_class = ActorSerializer
+
+
+class NotificationValuesSerializer(ValuesSerializer):
+    """
+    Fast read-only rendering of ``NotificationSerializer``.
+    
+    Target URLs are looked up per content type for the whole page, reading
+    only the columns the URLs need.
+    """
+    
+    serializer_class = NotificationSerializer
+    method_lookups = {
+        'target_url': ['target_content_type_id', 'target_object_id'],
+        'summary': ['actor__username', 'actor_count', 'verb'],
+        'time_since': ['timestamp'],
+    }
+    
+    def prepare(self, rows):
+        if 'target_url' not in self.serializer.fields:
+            return
+        ids_by_type = defaultdict(set)
+        for row in rows:
+            if row['target_content_type_id'] is not None:
+                ids_by_type[row['target_content_type_id']].add(row['target_object_id'])
+        self.target_urls = {}
+        for content_type_id, ids in ids_by_type.items():
+            model = ContentType.objects.get_for_id(content_type_id).model_class()
+            name = model.__name__ if model is not None else None
+            if name == 'Post':
+                urls = {pk: f'/api/posts/{pk}/' for pk in model.objects.filter(pk__in=ids).values_list('pk', flat=True)}
+            elif name == 'Comment':
+                urls = {
+                    pk: f'/api/posts/{post_id}/comments/{pk}/'
+                    for pk, post_id in model.objects.filter(pk__in=ids).values_list('pk', 'post_id')
+                }
+            elif name == 'CustomUser':
+                urls = {
+                    pk: f'/api/users/{username}/'
+                    for pk, username in model.objects.filter(pk__in=ids).values_list('pk', 'username')
+                }
+            else:
+                continue
+            for pk, url in urls.items():
+                self.target_urls[(content_type_id, pk)] = url
+    
+    def get_target_url(self, row):
+        return self.target_urls.get((row['target_content_type_id'], row['target_object_id']))
+    
+    def get_summary(self, row):
+        return summarize(row['actor__username'], row['actor_count'], row['verb'])
+    
+    def get_time_since(self, row):
+        return timesince(row['timestamp'])
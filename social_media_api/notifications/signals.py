@@ -0,0 +1,28 @@
+"""
+Unread notification counter signals.
+
+Notifications written by the dispatcher use ``bulk_create``, which sends no
+signals, so ``notifications.dispatch.write_events`` adjusts the counters
+and publishes them itself. These receivers cover rows created or deleted one
+at a time.
+"""
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .hub import publish_notifications
+from .models import Notification, adjust_unread_count
+
+
+@receiver(post_save, sender=Notification)
+def notification_created(sender, instance, created, **kwargs):
+    if created and not instance.read:
+        adjust_unread_count([instance.recipient_id], 1)
+        transaction.on_commit(lambda: publish_notifications([instance]))
+
+
+@receiver(post_delete, sender=Notification)
+def notification_deleted(sender, instance, **kwargs):
+    if not instance.read:
+        adjust_unread_count([instance.recipient_id], -1)
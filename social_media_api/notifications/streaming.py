@@ -0,0 +1,194 @@
+"""
+Streaming notification endpoints.
+
+These are native async views: under an ASGI server each waiting client is a
+suspended coroutine rather than a blocked thread, so one worker can hold
+thousands of idle connections. Both endpoints deliver what the dispatcher
+publishes through ``notifications.hub``.
+
+- ``stream/`` sends server-sent events. Each event's id is the notification
+  timestamp, so a reconnecting ``EventSource`` replays what it missed through
+  the ``Last-Event-ID`` header.
+  It needs an ASGI server: under WSGI, Django reads an async response body
+  to its end before sending any of it, so a stream that never ends would
+  never send a byte and would hold its worker forever. Under WSGI the
+  endpoint answers 503 and points clients to ``poll/``.
+- ``poll/`` is the long-poll fallback. It returns at once when notifications
+  newer than ``?since=`` exist, otherwise it waits for the next one or until
+  the timeout, and always returns the ``since`` value to send next.
+
+A hub may not reach every worker (``LocalHub`` only reaches its own
+process), so both endpoints also re-read the notifications table once per
+heartbeat while they wait: a notification written by another worker is
+delivered at most one heartbeat late instead of being missed.
+"""
+
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.views.decorators.http import require_GET
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from .hub import get_hub, get_setting
+from .models import Notification
+from .serializers import NotificationSerializer
+
+REPLAY_LIMIT = 50
+
+
+def _authenticate(request):
+    """Run the project's DRF authentication classes; return the user or None."""
+    drf_request = Request(
+        request,
+        authenticators=[auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES],
+    )
+    try:
+        user = drf_request.user
+    except APIException:
+        return None
+    return user if user.is_authenticated else None
+
+
+def _missed(user, since):
+    """Return serialized notifications for ``user`` newer than ``since``, oldest first."""
+    if since is None:
+        return []
+    notifications = (
+        Notification.objects.filter(recipient=user, timestamp__gt=since)
+        .select_related('actor', 'target_content_type')
+        .with_targets()
+        .order_by('timestamp', 'id')[:REPLAY_LIMIT]
+    )
+    return NotificationSerializer(notifications, many=True).data
+
+
+def _parse_since(value):
+    if not value:
+        return None
+    since = parse_datetime(value)
+    if since is None:
+        raise ValueError(value)
+    if timezone.is_naive(since):
+        since = timezone.make_aware(since)
+    return since
+
+
+def _unauthorized():
+    return JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=401)
+
+
+def _invalid_since():
+    return JsonResponse({'detail': 'Invalid since timestamp'}, status=400)
+
+
+def _stream_unavailable():
+    return JsonResponse(
+        {
+            'detail': 'Streaming requires an ASGI server; long-poll instead.',
+            'poll': reverse('notification-poll'),
+        },
+        status=503,
+    )
+
+
+def _timestamp(message):
+    return _parse_since(message['timestamp'])
+
+
+def _format_event(message):
+    data = json.dumps(message, separators=(',', ':'))
+    return f"id: {message['timestamp']}\nevent: notification\ndata: {data}\n\n"
+
+
+async def _event_stream(user, subscription, since, missed):
+    """Yield the events of ``missed``, then of each notification after ``since`` as it arrives."""
+    try:
+        yield 'retry: 5000\n\n'
+        heartbeat = get_setting('HEARTBEAT')
+        while True:
+            for message in missed:
+                since = max(since, _timestamp(message))
+                yield _format_event(message)
+            message = await subscription.get(timeout=heartbeat)
+            if message is not None:
+                missed = [message]
+                continue
+            # Catch up on notifications published to other workers
+            missed = await sync_to_async(_missed)(user, since)
+            if not missed:
+                # Comment lines keep proxies from closing an idle connection
+                yield ': keep-alive\n\n'
+    finally:
+        subscription.close()
+
+
+@require_GET
+async def notification_stream(request):
+    """Stream the current user's new notifications as server-sent events."""
+    if not isinstance(request, ASGIRequest):
+        return _stream_unavailable()
+    user = await sync_to_async(_authenticate)(request)
+    if user is None:
+        return _unauthorized()
+    try:
+        since = _parse_since(request.headers.get('Last-Event-ID') or request.GET.get('since'))
+    except ValueError:
+        return _invalid_since()
+
+    # Subscribe before replaying so nothing published in between is lost
+    cursor = since or timezone.now()
+    subscription = get_hub().subscribe(user.pk)
+    try:
+        missed = await sync_to_async(_missed)(user, since)
+    except Exception:
+        subscription.close()
+        raise
+    response = StreamingHttpResponse(
+        _event_stream(user, subscription, cursor, missed), content_type='text/event-stream',
+    )
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@require_GET
+async def poll_notifications(request):
+    """Long-poll for the current user's notifications newer than ``?since=``."""
+    user = await sync_to_async(_authenticate)(request)
+    if user is None:
+        return _unauthorized()
+    try:
+        since = _parse_since(request.GET.get('since'))
+    except ValueError:
+        return _invalid_since()
+
+    cursor = since or timezone.now()
+    subscription = get_hub().subscribe(user.pk)
+    try:
+        results = list(await sync_to_async(_missed)(user, since))
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + get_setting('LONG_POLL_TIMEOUT')
+        while not results and (remaining := deadline - loop.time()) > 0:
+            message = await subscription.get(timeout=min(get_setting('HEARTBEAT'), remaining))
+            if message is not None:
+                results = [message] + subscription.drain()
+            else:
+                # Catch up on notifications published to other workers
+                results = list(await sync_to_async(_missed)(user, cursor))
+    finally:
+        subscription.close()
+
+    if results:
+        next_since = results[-1]['timestamp']
+    else:
+        next_since = cursor.isoformat()
+    return JsonResponse({'results': results, 'since': next_since})
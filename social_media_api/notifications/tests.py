@@ -1,3 +1,299 @@
-from django.test import TestCase
+import asyncio
+import runpy
+from urllib.parse import quote
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+from rest_framework import status
+from django.contrib.auth import get_user_model
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.signals import request_started
+from django.db import close_old_connections, connection
+from django.utils import timezone
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils.module_loading import import_string
+from posts.models import Comment, Post
+from .dispatch import NotificationEvent, write_events
+from .hub import get_hub
+from .models import Notification
+
+User = get_user_model()
+
+
+class NotificationDispatchTestCase(APITestCase):
+    def setUp(self):
+        """Set up an author, a post and a few readers"""
+        self.author = User.objects.create_user(username='author', password='testpass123')
+        self.readers = [
+            User.objects.create_user(username=f'reader{i}', password='testpass123')
+            for i in range(3)
+        ]
+        self.post = Post.objects.create(author=self.author, title='Hello', content='World')
+
+    def like(self, user):
+        self.client.force_authenticate(user=user)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(f'/api/posts/{self.post.id}/like/')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_batch_is_coalesced_into_one_insert(self):
+        """Test a queued burst is written with a single insert per target"""
+        content_type = ContentType.objects.get_for_model(Post)
+        events = [
+            NotificationEvent(self.author.id, reader.id, 'liked your post', content_type.id, self.post.id)
+            for reader in self.readers + self.readers[:1]
+        ]
+        with CaptureQueriesContext(connection) as queries:
+            write_events(events)
+        inserts = [query for query in queries if query['sql'].startswith('INSERT')]
+        self.assertEqual(len(inserts), 1)
+        notification = Notification.objects.get()
+        self.assertEqual(notification.actor, self.readers[0])
+        self.assertEqual(notification.actor_count, 3)
+
+    @override_settings(NOTIFICATIONS_DISPATCHER={'MODE': 'sync'})
+    def test_unread_notification_is_coalesced(self):
+        """Test a burst of likes renders as one "A and N others" notification"""
+        for reader in self.readers:
+            self.like(reader)
+        self.assertEqual(Notification.objects.count(), 1)
+
+        self.client.force_authenticate(user=self.author)
+        response = self.client.get('/api/notifications/')
+        result = response.data['results'][0]
+        self.assertEqual(result['actor_count'], 3)
+        self.assertEqual(result['summary'], 'reader2 and 2 others liked your post')
+
+    def test_repeat_by_earlier_actor_is_not_recounted(self):
+        """Test A, then B, then A again on one target counts two actors"""
+        content_type = ContentType.objects.get_for_model(Post)
+        first, second = self.readers[:2]
+        for reader in (first, second, first):
+            write_events([NotificationEvent(self.author.id, reader.id, 'liked your post', content_type.id, self.post.id)])
+        notification = Notification.objects.get()
+        self.assertEqual(notification.actor, first)
+        self.assertEqual(notification.actor_count, 2)
+
+    @override_settings(NOTIFICATIONS_DISPATCHER={'MODE': 'sync'})
+    def test_own_post_and_read_notifications(self):
+        """Test self-likes are skipped and read notifications are not reused"""
+        self.like(self.author)
+        self.assertFalse(Notification.objects.exists())
+
+        self.like(self.readers[0])
+        Notification.objects.update(read=True)
+        self.like(self.readers[1])
+        self.assertEqual(Notification.objects.filter(read=False, actor_count=1).count(), 1)
+
+    def test_notification_list_query_count_is_constant(self):
+        """Test listing notifications prefetches targets per content type"""
+        def add_notifications(readers):
+            for reader in readers:
+                comment = Comment.objects.create(post=self.post, author=reader, content='Nice')
+                for verb, target in [('liked your post', self.post),
+                                     ('commented on your post', comment),
+                                     ('started following you', reader)]:
+                    Notification.objects.create(
+                        recipient=self.author, actor=reader, verb=verb, target=target,
+                    )
+
+        def count_queries():
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get('/api/notifications/')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            return len(queries), response.data['results']
+
+        self.client.force_authenticate(user=self.author)
+        add_notifications(self.readers[:1])
+        baseline, _ = count_queries()
+        add_notifications(self.readers[1:])
+        queries, results = count_queries()
+        self.assertEqual(queries, baseline)
+        comment = Comment.objects.latest('id')
+        self.assertIn(f'/api/posts/{self.post.id}/comments/{comment.id}/', [r['target_url'] for r in results])
+        self.assertIn(f'/api/users/{self.readers[2].username}/', [r['target_url'] for r in results])
+
+    def test_fast_rendering_matches_serializer(self):
+        """Test the values-based list renders the same bytes as NotificationSerializer"""
+        for reader in self.readers:
+            comment = Comment.objects.create(post=self.post, author=reader, content='Nice')
+            Notification.objects.create(recipient=self.author, actor=reader, verb='commented on your post', target=comment)
+        Notification.objects.create(
+            recipient=self.author, actor=self.readers[0], verb='liked your post', target=self.post, actor_count=3,
+        )
+        Notification.objects.create(
+            recipient=self.author, actor=self.readers[1], verb='started following you', target=self.readers[1],
+        )
+        Comment.objects.filter(author=self.readers[2]).delete()
+        self.client.force_authenticate(user=self.author)
+        fast = self.client.get('/api/notifications/?page_size=3')
+        with override_settings(FAST_LIST_RENDERING=False):
+            slow = self.client.get('/api/notifications/?page_size=3')
+        self.assertEqual(fast.content, slow.content)
+        with override_settings(FAST_LIST_RENDERING=False):
+            slow = self.client.get(slow.data['next'])
+        self.assertEqual(self.client.get(fast.data['next']).content, slow.content)
+
+
+@override_settings(NOTIFICATIONS_DISPATCHER={'MODE': 'sync'})
+class UnreadCountTestCase(APITestCase):
+    def setUp(self):
+        """Set up an author with unread notifications on two posts"""
+        self.author = User.objects.create_user(username='author', password='testpass123')
+        self.reader = User.objects.create_user(username='reader', password='testpass123')
+        self.client.force_authenticate(user=self.reader)
+        for title in ['First', 'Second']:
+            post = Post.objects.create(author=self.author, title=title, content='Content')
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.post(f'/api/posts/{post.id}/like/')
+
+    def get_count(self, **headers):
+        self.client.force_authenticate(user=User.objects.get(pk=self.author.pk))
+        return self.client.get('/api/notifications/unread-count/', **headers)
+
+    def test_unread_count_and_etag(self):
+        """Test the badge count is served with an ETag and revalidates with 304"""
+        response = self.get_count()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {'unread_count': 2})
+
+        response = self.get_count(HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_mark_read_updates_count(self):
+        """Test marking one and then all notifications read keeps the counter in step"""
+        notification = Notification.objects.first()
+        self.get_count()
+        self.client.post(f'/api/notifications/{notification.id}/read/')
+        self.client.post(f'/api/notifications/{notification.id}/read/')
+        self.assertEqual(self.get_count().data, {'unread_count': 1})
+
+        response = self.client.post('/api/notifications/mark-all-read/')
+        self.assertEqual(response.data['message'], '1 notifications marked as read')
+        self.assertEqual(self.get_count().data, {'unread_count': 0})
+
+
+@override_settings(NOTIFICATIONS_STREAM={'LONG_POLL_TIMEOUT': 5, 'HEARTBEAT': 5})
+class NotificationStreamTestCase(TestCase):
+    def setUp(self):
+        """Set up an author with one notification and a JWT for the stream"""
+        self.author = User.objects.create_user(username='author', password='testpass123')
+        self.reader = User.objects.create_user(username='reader', password='testpass123')
+        self.post = Post.objects.create(author=self.author, title='Hello', content='World')
+        self.started = timezone.now()
+        Notification.objects.create(
+            recipient=self.author, actor=self.reader, verb='liked your post', target=self.post,
+        )
+        self.headers = {'Authorization': f'Bearer {AccessToken.for_user(self.author)}'}
+        content_type = ContentType.objects.get_for_model(Post)
+        self.event = NotificationEvent(
+            self.author.id, self.reader.id, 'commented on your post', content_type.id, self.post.id,
+        )
+
+    async def wait_for_subscriber(self):
+        while not get_hub().listening({self.author.pk}):
+            await asyncio.sleep(0.01)
+
+    async def test_long_poll(self):
+        """Test long-polling replays missed notifications and waits for new ones"""
+        response = await self.async_client.get(
+            f'/api/notifications/poll/?since={quote(self.started.isoformat())}', headers=self.headers,
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([n['verb'] for n in response.json()['results']], ['liked your post'])
+
+        request = asyncio.ensure_future(self.async_client.get('/api/notifications/poll/', headers=self.headers))
+        await asyncio.wait_for(self.wait_for_subscriber(), 5)
+        await sync_to_async(write_events)([self.event])
+        response = await asyncio.wait_for(request, 5)
+        self.assertEqual([n['verb'] for n in response.json()['results']], ['commented on your post'])
+
+    @override_settings(NOTIFICATIONS_STREAM={'LONG_POLL_TIMEOUT': 5, 'HEARTBEAT': 0.05})
+    async def test_notifications_from_other_workers_arrive_on_heartbeat(self):
+        """Test the poll and the stream pick up notifications the local hub never published"""
+        since = quote(timezone.now().isoformat())
+        request = asyncio.ensure_future(
+            self.async_client.get(f'/api/notifications/poll/?since={since}', headers=self.headers)
+        )
+        await asyncio.wait_for(self.wait_for_subscriber(), 5)
+        # Written by "another worker": stored, but not published to this process's hub
+        await sync_to_async(Notification.objects.create)(
+            recipient=self.author, actor=self.reader, verb='commented on your post', target=self.post,
+        )
+        response = await asyncio.wait_for(request, 5)
+        self.assertEqual([n['verb'] for n in response.json()['results']], ['commented on your post'])
+
+        response = await self.async_client.get('/api/notifications/stream/', headers=self.headers)
+        events = aiter(response.streaming_content)
+        self.assertEqual(await anext(events), b'retry: 5000\n\n')
+        await sync_to_async(Notification.objects.create)(
+            recipient=self.author, actor=self.reader, verb='started following you', target=self.reader,
+        )
+        event = await asyncio.wait_for(anext(events), 5)
+        while event == b': keep-alive\n\n':
+            event = await asyncio.wait_for(anext(events), 5)
+        self.assertIn(b'started following you', event)
+        await events.aclose()
+
+    async def test_server_sent_events(self):
+        """Test the SSE stream replays from Last-Event-ID and pushes published notifications"""
+        response = await self.async_client.get(
+            '/api/notifications/stream/', headers={**self.headers, 'Last-Event-ID': self.started.isoformat()},
+        )
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        events = aiter(response.streaming_content)
+        self.assertEqual(await anext(events), b'retry: 5000\n\n')
+        self.assertIn(b'liked your post', await anext(events))
+
+        await sync_to_async(write_events)([self.event])
+        self.assertIn(b'commented on your post', await asyncio.wait_for(anext(events), 5))
+        await events.aclose()
+
+    async def test_deployment_streams_first_event(self):
+        """Test the application and workers of the shipped gunicorn config send the first event right away"""
+        config = runpy.run_path(str(settings.BASE_DIR / 'deployment' / 'gunicorn.conf.py'))
+        self.assertEqual(config['worker_class'], 'uvicorn.workers.UvicornWorker')
+        application = import_string(config['wsgi_app'].replace(':', '.'))
+
+        disconnect = asyncio.Event()
+        sent = asyncio.Queue()
+
+        async def receive():
+            if not hasattr(receive, 'started'):
+                receive.started = True
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+            await disconnect.wait()
+            return {'type': 'http.disconnect'}
+
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+            'scheme': 'http', 'path': '/api/notifications/stream/', 'raw_path': b'/api/notifications/stream/',
+            'query_string': b'', 'root_path': '', 'server': ('localhost', 8000), 'client': ('127.0.0.1', 5000),
+            'headers': [(b'host', b'localhost'), (b'authorization', self.headers['Authorization'].encode())],
+        }
+        # Keep the test database connection open, as the test client does
+        request_started.disconnect(close_old_connections)
+        try:
+            app = asyncio.ensure_future(application(scope, receive, sent.put))
+            start = await asyncio.wait_for(sent.get(), 5)
+            self.assertEqual(start['status'], 200)
+            body = await asyncio.wait_for(sent.get(), 5)
+            self.assertEqual(body['body'], b'retry: 5000\n\n')
+            disconnect.set()
+            await asyncio.wait_for(app, 5)
+        finally:
+            request_started.connect(close_old_connections)
+
+    def test_stream_under_wsgi_points_to_poll(self):
+        """Test a WSGI request for the stream is refused with the long-poll URL instead of hanging"""
+        response = self.client.get('/api/notifications/stream/', headers=self.headers)
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json()['poll'], '/api/notifications/poll/')
+
+    async def test_stream_requires_authentication(self):
+        """Test anonymous clients cannot open a stream"""
+        response = await self.async_client.get('/api/notifications/poll/')
+        self.assertEqual(response.status_code, 401)
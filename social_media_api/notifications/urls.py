@@ -2,11 +2,16 @@ from django.urls import path
 from .views import (
     NotificationListView, 
     mark_notification_read, 
-    mark_all_notifications_read
+    mark_all_notifications_read,
+    unread_notification_count
 )
+from .streaming import notification_stream, poll_notifications
 
 urlpatterns = [
     path('', NotificationListView.as_view(), name='notification-list'),
+    path('stream/', notification_stream, name='notification-stream'),
+    path('poll/', poll_notifications, name='notification-poll'),
+    path('unread-count/', unread_notification_count, name='unread-notification-count'),
     path('<int:pk>/read/', mark_notification_read, name='mark-notification-read'),
     path('mark-all-read/', mark_all_notifications_read, name='mark-all-notifications-read'),
 ]
\ No newline at end of file
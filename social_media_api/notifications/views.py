@@ -2,34 +2,60 @@ from rest_framework import generics, permissions, status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from django.contrib.auth import get_user_model
-from django.contrib.contenttypes.models import ContentType
-from .models import Notification
+from django.db import transaction
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+from social_media_api.fastpath import ValuesListMixin
+from social_media_api.pagination import KeysetPagination
+from .dispatch import notify
+from .models import Notification, adjust_unread_count
 from .serializers import NotificationSerializer
 
 User = get_user_model()
 
 
-class NotificationListView(generics.ListAPIView):
+class NotificationListView(ValuesListMixin, generics.ListAPIView):
     """List all notifications for the current user."""
     
     serializer_class = NotificationSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetPagination
+    keyset_ordering = ('-timestamp', '-id')
     
     def get_queryset(self):
         """Return notifications for the current user, ordered by timestamp."""
         return Notification.objects.filter(
             recipient=self.request.user
-        ).select_related('actor', 'target_content_type')
+        ).select_related('actor', 'target_content_type').with_targets()
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def unread_notification_count(request):
+    """
+    Return the number of unread notifications for the current user.
+    
+    The count is read from the counter stored on the user row, which the
+    authentication backend has already loaded, so no extra query is run.
+    Clients polling with ``If-None-Match`` get a ``304`` while it is unchanged.
+    """
+    count = request.user.unread_notifications_count
+    response = Response({'unread_count': count})
+    response['ETag'] = quote_etag(f'unread-{request.user.pk}-{count}')
+    response['Cache-Control'] = 'private, no-cache'
+    return get_conditional_response(request, etag=response['ETag'], response=response)
 
 
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
+@transaction.atomic
 def mark_notification_read(request, pk):
     """Mark a specific notification as read."""
     try:
         notification = Notification.objects.get(pk=pk, recipient=request.user)
-        notification.read = True
-        notification.save()
+        # Filtering on read=False lets only one concurrent request decrement the counter
+        if Notification.objects.filter(pk=notification.pk, read=False).update(read=True):
+            adjust_unread_count([request.user.pk], -1)
         return Response({'message': 'Notification marked as read'})
     except Notification.DoesNotExist:
         return Response(
@@ -40,26 +66,21 @@ def mark_notification_read(request, pk):
 
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
+@transaction.atomic
 def mark_all_notifications_read(request):
     """Mark all notifications for the current user as read."""
-    notifications = Notification.objects.filter(
+    updated = Notification.objects.filter(
         recipient=request.user, 
         read=False
-    )
-    notifications.update(read=True)
+    ).update(read=True)
+    if updated:
+        adjust_unread_count([request.user.pk], -updated)
     return Response({
-        'message': f'{notifications.count()} notifications marked as read'
+        'message': f'{updated} notifications marked as read'
     })
 
 
 def create_notification(recipient, actor, verb, target_object):
     """Helper function to create notifications."""
-    if recipient != actor:  # Don't create notifications for own actions
-        content_type = ContentType.objects.get_for_model(target_object)
-        Notification.objects.create(
-            recipient=recipient,
-            actor=actor,
-            verb=verb,
-            target_content_type=content_type,
-            target_object_id=target_object.id
-        )
+    # Written asynchronously once the current transaction commits
+    notify(recipient, actor, verb, target_object)
@@ -10,6 +10,9 @@ class PostAdmin(admin.ModelAdmin):
     readonly_fields = ['created_at', 'updated_at', 'comment_count']
     ordering = ['-created_at']
     date_hierarchy = 'created_at'
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('author').with_engagement()
 
 
 @admin.register(Comment)
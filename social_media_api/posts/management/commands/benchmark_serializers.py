@@ -0,0 +1,108 @@
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from notifications.models import Notification
+from notifications.serializers import NotificationSerializer
+from posts.models import Post
+from posts.serializers import PostListSerializer
+from posts.views import post_queryset_for
+from social_media_api.fastpath import ValuesSerializer
+
+User = get_user_model()
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Time PostListSerializer and NotificationSerializer against their .values() fast path. "
+        "Sample rows are created in a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', type=int, nargs='+', default=[10, 100, 1000],
+            help='Numbers of rows rendered per run (default: 10 100 1000).',
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=5,
+            help='Runs per size; the fastest is reported (default: 5).',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.run(options['sizes'], options['repeat'])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def run(self, sizes, repeat):
+        largest = max(sizes)
+        reader = User.objects.create_user(username='benchmark-reader')
+        authors = User.objects.bulk_create(User(username=f'benchmark-author-{number}') for number in range(10))
+        posts = Post.objects.bulk_create(
+            Post(author=authors[number % 10], title=f'Benchmark post {number}', content='Benchmark content ' * 20)
+            for number in range(largest)
+        )
+        Notification.objects.bulk_create(
+            Notification(recipient=reader, actor=authors[number % 10], verb='liked your post', target=post)
+            for number, post in enumerate(posts)
+        )
+
+        # Serializers build absolute URLs, which validate the host
+        request = Request(APIRequestFactory().get('/', HTTP_HOST=self.allowed_host()))
+        request.user = reader
+        context = {'request': request}
+        cases = [
+            ('PostListSerializer', PostListSerializer,
+             lambda fields: post_queryset_for(fields, reader).order_by('-created_at', '-id')),
+            ('NotificationSerializer', NotificationSerializer,
+             lambda fields: Notification.objects.filter(recipient=reader)
+             .select_related('actor', 'target_content_type').with_targets().order_by('-timestamp', '-id')),
+        ]
+        renderer = JSONRenderer()
+        self.stdout.write(f'{"serializer":<24}{"rows":>6}{"serializer ms":>16}{"fast path ms":>15}{"speedup":>10}')
+        for name, serializer_class, get_queryset in cases:
+            serializer = serializer_class(context=context)
+            for size in sizes:
+                queryset = get_queryset(serializer.fields)[:size]
+
+                def slow():
+                    return serializer_class(list(queryset.all()), many=True, context=context).data
+
+                def fast():
+                    values = ValuesSerializer.for_serializer(serializer_class(context=context))
+                    return values.render(values.values(queryset))
+
+                if renderer.render(slow()) != renderer.render(fast()):
+                    raise CommandError(f'{name} fast path output differs at {size} rows')
+                slow_ms = self.best_of(slow, repeat)
+                fast_ms = self.best_of(fast, repeat)
+                self.stdout.write(
+                    f'{name:<24}{size:>6}{slow_ms:>16.2f}{fast_ms:>15.2f}{slow_ms / fast_ms:>9.1f}x'
+                )
+
+    def allowed_host(self):
+        for host in settings.ALLOWED_HOSTS:
+            host = host.lstrip('.')
+            if host and host != '*':
+                return host
+        return 'localhost'
+
+    def best_of(self, render, repeat):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            render()
+            timings.append((time.perf_counter() - start) * 1000)
+        return min(timings)
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts import search
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search index of the configured search backend."
+
+    def handle(self, *args, **options):
+        backend = search.get_backend()
+        posts = Post.objects.only('id', 'title', 'content').order_by('pk')
+        with transaction.atomic():
+            backend.rebuild(posts.iterator())
+        self.stdout.write(self.style.SUCCESS(
+            f'Indexed {posts.count()} posts with {type(backend).__name__}'
+        ))
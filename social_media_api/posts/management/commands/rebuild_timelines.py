@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+from django.contrib.auth import get_user_model
+
+from accounts.models import UserFollowing
+from posts import timeline
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Rebuild materialized home timelines from the current follow graph."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', action='append', dest='usernames', default=[],
+            help='Only rebuild the timeline of this username (repeatable).',
+        )
+        parser.add_argument(
+            '--clear', action='store_true',
+            help='Drop every stored timeline before rebuilding.',
+        )
+
+    def handle(self, *args, **options):
+        backend = timeline.get_backend()
+        if options['clear']:
+            backend.clear()
+
+        users = User.objects.all()
+        if options['usernames']:
+            users = users.filter(username__in=options['usernames'])
+
+        rebuilt = 0
+        for user in users.only('id').iterator():
+            followed_ids = UserFollowing.objects.filter(following_user=user).values_list('user_id', flat=True)
+            timeline.backfill_timeline_many(user.pk, followed_ids)
+            rebuilt += 1
+
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {rebuilt} timelines'))
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from posts import ranking
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = "Recompute the stored ranked-feed score of every post."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Number of posts rescored per UPDATE (default: 1000).',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        rescored = 0
+        last_pk = 0
+        while True:
+            batch = list(
+                Post.objects.filter(pk__gt=last_pk)
+                .order_by('pk')
+                .values_list('pk', flat=True)[:batch_size]
+            )
+            if not batch:
+                break
+            last_pk = batch[-1]
+            rescored += ranking.refresh_scores(batch)
+        self.stdout.write(self.style.SUCCESS(f'Rescored {rescored} posts'))
@@ -0,0 +1,71 @@
+from django.core.management.base import BaseCommand
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import F, Q
+
+from accounts.models import UserFollowing
+from notifications.models import Notification
+from posts.models import Post, Comment, Like, count_subquery
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Recompute denormalized like/comment/follow/post/unread counters and repair drift."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Number of rows recounted per transaction (default: 1000).',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        post_counters = {
+            'likes_count': count_subquery(Like, 'post'),
+            'comments_count': count_subquery(Comment, 'post'),
+        }
+        user_counters = {
+            # UserFollowing stores the followed user in ``user`` and the follower in ``following_user``
+            'followers_count': count_subquery(UserFollowing, 'user'),
+            'following_count': count_subquery(UserFollowing, 'following_user'),
+            'posts_count': count_subquery(Post, 'author'),
+            'unread_notifications_count': count_subquery(Notification, 'recipient', read=False),
+        }
+
+        repaired_posts = self.recount(Post, post_counters, batch_size)
+        repaired_users = self.recount(User, user_counters, batch_size)
+        self.stdout.write(self.style.SUCCESS(
+            f'Repaired {repaired_posts} posts and {repaired_users} users'
+        ))
+
+    def recount(self, model, counters, batch_size):
+        """Recount ``counters`` on ``model`` in primary-key batches; return the number of drifted rows."""
+        repaired = 0
+        last_pk = 0
+        while True:
+            batch = list(
+                model.objects.filter(pk__gt=last_pk)
+                .order_by('pk')
+                .values_list('pk', flat=True)[:batch_size]
+            )
+            if not batch:
+                return repaired
+            last_pk = batch[-1]
+
+            actual = {f'actual_{field}': expression for field, expression in counters.items()}
+            drifted = Q()
+            for field in counters:
+                drifted |= ~Q(**{field: F(f'actual_{field}')})
+
+            with transaction.atomic():
+                drifted_pks = list(
+                    model.objects.filter(pk__in=batch)
+                    .annotate(**actual)
+                    .filter(drifted)
+                    .values_list('pk', flat=True)
+                )
+                if drifted_pks:
+                    model.objects.filter(pk__in=drifted_pks).update(**counters)
+            repaired += len(drifted_pks)
@@ -0,0 +1,56 @@
+# Generated by Django 5.0.14 on 2026-10-18 02:18
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def _count(model, field):
+    counts = (
+        model.objects.filter(**{field: OuterRef("pk")})
+        .order_by()
+        .values(field)
+        .annotate(total=Count("*"))
+        .values("total")
+    )
+    return Coalesce(Subquery(counts), Value(0))
+
+
+def populate_counters(apps, schema_editor):
+    Post = apps.get_model("posts", "Post")
+    Comment = apps.get_model("posts", "Comment")
+    Like = apps.get_model("posts", "Like")
+    CustomUser = apps.get_model("accounts", "CustomUser")
+    UserFollowing = apps.get_model("accounts", "UserFollowing")
+
+    Post.objects.update(
+        likes_count=_count(Like, "post"),
+        comments_count=_count(Comment, "post"),
+    )
+    CustomUser.objects.update(
+        followers_count=_count(UserFollowing, "user"),
+        following_count=_count(UserFollowing, "following_user"),
+        posts_count=_count(Post, "author"),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0005_customuser_counters"),
+        ("posts", "0004_timelineentry"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="post",
+            name="comments_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="post",
+            name="likes_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.0.14 on 2026-10-18 02:29
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("posts", "0006_keyset_indexes"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="comment",
+            name="posts_comme_post_id_06cfd5_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="post",
+            name="posts_post_author__19d68b_idx",
+        ),
+        migrations.AddIndex(
+            model_name="comment",
+            index=models.Index(
+                fields=["post", "created_at", "id"], name="posts_comment_post_created"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="post",
+            index=models.Index(
+                fields=["author", "-created_at", "-id"], name="posts_post_author_recent"
+            ),
+        ),
+    ]
@@ -0,0 +1,83 @@
+# Generated by Django 5.0.14 on 2026-10-18 02:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def _fts5_available(connection):
+    with connection.cursor() as cursor:
+        cursor.execute("PRAGMA compile_options")
+        return any(row[0] == "ENABLE_FTS5" for row in cursor.fetchall())
+
+
+def _search_vector():
+    from django.contrib.postgres.search import SearchVector
+
+    return SearchVector("title", weight="A", config="english") + SearchVector(
+        "content", weight="B", config="english"
+    )
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == "postgresql":
+        from django.contrib.postgres.indexes import GinIndex
+
+        Post = apps.get_model("posts", "Post")
+        schema_editor.add_index(Post, GinIndex(_search_vector(), name="posts_post_search_gin"))
+    elif connection.vendor == "sqlite" and _fts5_available(connection):
+        schema_editor.execute("CREATE VIRTUAL TABLE posts_post_fts USING fts5(title, content)")
+        schema_editor.execute(
+            "INSERT INTO posts_post_fts (rowid, title, content) "
+            "SELECT id, title, content FROM posts_post"
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == "postgresql":
+        schema_editor.execute("DROP INDEX IF EXISTS posts_post_search_gin")
+    elif connection.vendor == "sqlite":
+        schema_editor.execute("DROP TABLE IF EXISTS posts_post_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("posts", "0007_composite_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SearchTerm",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("term", models.CharField(max_length=64)),
+                ("field", models.CharField(max_length=16)),
+                ("weight", models.PositiveIntegerField(default=1)),
+                (
+                    "post",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="posts.post",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="searchterm",
+            constraint=models.UniqueConstraint(
+                fields=("term", "field", "post"), name="unique_search_term"
+            ),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
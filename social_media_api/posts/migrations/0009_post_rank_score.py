@@ -0,0 +1,40 @@
+# Generated by Django 5.0.14 on 2026-10-18 02:53
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def populate_rank_scores(apps, schema_editor):
+    from posts.ranking import hot_score
+
+    Post = apps.get_model("posts", "Post")
+    posts = Post.objects.only("id", "created_at", "likes_count", "comments_count")
+    batch = []
+    for post in posts.iterator(chunk_size=1000):
+        post.rank_score = hot_score(post.created_at, post.likes_count, post.comments_count)
+        batch.append(post)
+        if len(batch) >= 1000:
+            Post.objects.bulk_update(batch, ["rank_score"])
+            batch = []
+    Post.objects.bulk_update(batch, ["rank_score"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("posts", "0008_search_index"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="post",
+            name="rank_score",
+            field=models.FloatField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name="post",
+            index=models.Index(fields=["-rank_score", "-id"], name="posts_post_rank"),
+        ),
+        migrations.RunPython(populate_rank_scores, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,6 @@
 from django.db import models
+from django.db.models import Count, Exists, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
 from django.contrib.auth import get_user_model
 from django.core.validators import MinLengthValidator
 
@@ -12,6 +14,35 @@ class TestModel(models.Model):
         managed = False  # Don't create database table for this model
 
 
+def count_subquery(model, field, **filters):
+    """Return a correlated COUNT(*) subquery over ``model`` rows whose ``field`` is the outer pk."""
+    counts = (
+        model.objects.filter(**{field: OuterRef('pk')}, **filters)
+        .order_by()
+        .values(field)
+        .annotate(total=Count('*'))
+        .values('total')
+    )
+    return Coalesce(Subquery(counts), Value(0))
+
+
+class PostQuerySet(models.QuerySet):
+    """QuerySet with helpers for list endpoints."""
+    
+    def with_engagement(self, user=None):
+        """
+        Annotate ``is_liked`` for ``user`` with an EXISTS subquery.
+        
+        Like and comment totals are stored on the post (``likes_count`` and
+        ``comments_count``), so serializers need no extra query per row.
+        """
+        if user is not None and user.is_authenticated:
+            is_liked = Exists(Like.objects.filter(post=OuterRef('pk'), user=user))
+        else:
+            is_liked = Value(False)
+        return self.annotate(is_liked=is_liked)
+
+
 class Post(models.Model):
     """Model for user posts."""
     
@@ -22,12 +53,24 @@ class Post(models.Model):
     author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='posts')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Denormalized counters maintained by posts.signals; repaired by recount_counters
+    likes_count = models.PositiveIntegerField(default=0, editable=False)
+    comments_count = models.PositiveIntegerField(default=0, editable=False)
+    # Time-decayed engagement score for the ranked feed; see posts.ranking
+    rank_score = models.FloatField(default=0, editable=False)
+    
+    objects = PostQuerySet.as_manager()
     
     class Meta:
         ordering = ['-created_at']
         indexes = [
-            models.Index(fields=['author']),
             models.Index(fields=['created_at']),
+            # Keyset pagination order
+            models.Index(fields=['-created_at', '-id']),
+            # A user's or followed authors' posts, newest first; also serves lookups on author alone
+            models.Index(fields=['author', '-created_at', '-id'], name='posts_post_author_recent'),
+            # Ranked feed order
+            models.Index(fields=['-rank_score', '-id'], name='posts_post_rank'),
         ]
     
     def __str__(self):
@@ -36,7 +79,7 @@ class Post(models.Model):
     @property
     def comment_count(self):
         """Return the number of comments on this post."""
-        return self.comments.count()
+        return self.comments_count
 
 
 class Comment(models.Model):
@@ -51,9 +94,12 @@ class Comment(models.Model):
     class Meta:
         ordering = ['created_at']
         indexes = [
-            models.Index(fields=['post']),
             models.Index(fields=['author']),
             models.Index(fields=['created_at']),
+            # Keyset pagination order
+            models.Index(fields=['created_at', 'id']),
+            # A post's comments in thread order; also serves lookups on post alone
+            models.Index(fields=['post', 'created_at', 'id'], name='posts_comment_post_created'),
         ]
     
     def __str__(self):
@@ -78,3 +124,45 @@ class Like(models.Model):
     
     def __str__(self):
         return f"{self.user.username} likes {self.post.title}"
+
+
+class TimelineEntry(models.Model):
+    """Materialized home timeline entry: a post pushed into a follower's feed."""
+    
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='timeline_entries')
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='timeline_entries')
+    # Denormalized from the post so timelines can be read and pruned without joins
+    author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    created_at = models.DateTimeField()
+    
+    class Meta:
+        ordering = ['-created_at', '-post_id']
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'post'], name='unique_timeline_entry'),
+        ]
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-post'], name='posts_timeline_user_recent'),
+            models.Index(fields=['user', 'author'], name='posts_timeline_user_author'),
+        ]
+    
+    def __str__(self):
+        return f"Post {self.post_id} in timeline of user {self.user_id}"
+
+
+class SearchTerm(models.Model):
+    """Inverted index posting used by ``posts.search.InvertedIndexBackend``."""
+    
+    term = models.CharField(max_length=64)
+    field = models.CharField(max_length=16)
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='+')
+    # Occurrences of the term in the field, multiplied by the field's boost
+    weight = models.PositiveIntegerField(default=1)
+    
+    class Meta:
+        constraints = [
+            # Also the lookup index: term IN (...) grouped by post
+            models.UniqueConstraint(fields=['term', 'field', 'post'], name='unique_search_term'),
+        ]
+    
+    def __str__(self):
+        return f"{self.term} in {self.field} of post {self.post_id}"
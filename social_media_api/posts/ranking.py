@@ -0,0 +1,72 @@
+"""
+Engagement ranking for the ``?mode=ranked`` feed.
+
+Each post stores a ``rank_score`` so ranked pages are a plain ``ORDER BY
+rank_score DESC`` over an index, with no expressions computed over likes and
+comments at read time. The score is
+
+    log10(max(likes + FEED_RANK_COMMENT_WEIGHT * comments, 1))
+        + (created_at - EPOCH) / FEED_RANK_GRAVITY
+
+``FEED_RANK_GRAVITY`` is the time decay: a post that much older needs ten
+times the engagement to rank level with a newer one. Because time enters as
+a constant offset rather than as a divisor that grows with the post's age,
+the order of stored scores is the same as the time-decayed order at any
+moment, so scores only change when engagement does. ``posts.signals``
+refreshes a post's score when it is liked, unliked or commented on, and
+``manage.py recompute_rank_scores`` recomputes every score, e.g. after
+changing the settings.
+"""
+
+import math
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.utils import timezone
+
+DEFAULT_GRAVITY = 45000
+DEFAULT_COMMENT_WEIGHT = 2
+DEFAULT_WINDOW = 7 * 24 * 3600
+# Keeps scores small; any fixed instant works
+EPOCH = datetime(2024, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def get_gravity():
+    """Return the seconds of age that cost a tenfold engagement."""
+    return getattr(settings, 'FEED_RANK_GRAVITY', DEFAULT_GRAVITY)
+
+
+def get_comment_weight():
+    return getattr(settings, 'FEED_RANK_COMMENT_WEIGHT', DEFAULT_COMMENT_WEIGHT)
+
+
+def get_window():
+    """Return the age, in seconds, of the oldest unengaged post a ranked feed reaches."""
+    return getattr(settings, 'FEED_RANK_WINDOW', DEFAULT_WINDOW)
+
+
+def hot_score(created_at, likes_count=0, comments_count=0):
+    """Return the rank score of a post."""
+    engagement = likes_count + get_comment_weight() * comments_count
+    return math.log10(max(engagement, 1)) + (created_at - EPOCH).total_seconds() / get_gravity()
+
+
+def score_floor():
+    """
+    Return the lowest score a ranked feed reads.
+
+    It is the score of a post with no engagement written ``FEED_RANK_WINDOW``
+    ago, so the index range scan stops there instead of at the oldest post;
+    older posts with enough engagement still score above it.
+    """
+    return hot_score(timezone.now() - timedelta(seconds=get_window()))
+
+
+def refresh_scores(post_ids):
+    """Recompute the stored score of ``post_ids`` from their counters."""
+    from .models import Post
+    posts = list(Post.objects.filter(pk__in=post_ids).only('id', 'created_at', 'likes_count', 'comments_count'))
+    for post in posts:
+        post.rank_score = hot_score(post.created_at, post.likes_count, post.comments_count)
+    Post.objects.bulk_update(posts, ['rank_score'])
+    return len(posts)
@@ -0,0 +1,272 @@
+"""
+Full-text search over posts.
+
+``icontains`` lookups scan and pattern-match every row; these backends look
+the query terms up in an index instead, so the cost depends on how many
+posts match rather than on how many exist. Results are ranked, with title
+matches weighted above content matches.
+
+The engine is picked with the ``SEARCH_BACKEND`` setting:
+
+- ``'auto'`` (default) uses ``PostgresSearchBackend`` on PostgreSQL,
+  ``SQLiteFTS5Backend`` on SQLite builds with FTS5 and
+  ``InvertedIndexBackend`` anywhere else.
+- A dotted path selects a backend explicitly.
+
+Backends that keep their own index are updated by ``posts.signals`` when a
+post is saved or deleted. After switching backends, or for posts written
+before the index existed, run ``manage.py rebuild_search_index``.
+
+Queries match posts containing every term. ``SEARCH_MAX_RESULTS`` (default:
+500) caps how many ranked results are returned, including by the
+``?title=``/``?content=`` filters, which keep the best ranked matches.
+"""
+
+import re
+from collections import Counter
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import connection
+from django.db.models import Case, Count, IntegerField, Sum, Value, When
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+from rest_framework.filters import BaseFilterBackend
+from rest_framework.settings import api_settings
+
+FIELD_WEIGHTS = {'title': 3, 'content': 1}
+TOKEN_RE = re.compile(r'\w+')
+MAX_TERM_LENGTH = 64
+DEFAULT_MAX_RESULTS = 500
+FTS_TABLE = 'posts_post_fts'
+
+
+def tokenize(text):
+    """Split ``text`` into lowercase word tokens."""
+    return [token[:MAX_TERM_LENGTH] for token in TOKEN_RE.findall((text or '').lower())]
+
+
+def get_max_results():
+    return getattr(settings, 'SEARCH_MAX_RESULTS', DEFAULT_MAX_RESULTS)
+
+
+def fts5_available(conn=connection):
+    """Return True when ``conn`` is SQLite compiled with the FTS5 extension."""
+    if conn.vendor != 'sqlite':
+        return False
+    with conn.cursor() as cursor:
+        cursor.execute('PRAGMA compile_options')
+        return any(row[0] == 'ENABLE_FTS5' for row in cursor.fetchall())
+
+
+class BaseSearchBackend:
+    """Interface shared by all search backends."""
+
+    def index(self, post):
+        """Add or refresh ``post`` in the index."""
+
+    def remove(self, post_id):
+        """Drop a post from the index."""
+
+    def rebuild(self, posts):
+        """Replace the whole index with ``posts``."""
+
+    def search(self, query, limit=None, fields=None):
+        """
+        Return ``(post_id, score)`` pairs for posts matching every term of
+        ``query``, best match first. ``fields`` restricts matching to some of
+        ``FIELD_WEIGHTS``.
+        """
+        raise NotImplementedError
+
+
+class InvertedIndexBackend(BaseSearchBackend):
+    """Portable backend storing one ``SearchTerm`` row per (term, field, post)."""
+
+    batch_size = 1000
+
+    def _model(self):
+        from .models import SearchTerm
+        return SearchTerm
+
+    def _terms(self, post):
+        SearchTerm = self._model()
+        for field, boost in FIELD_WEIGHTS.items():
+            for term, occurrences in Counter(tokenize(getattr(post, field))).items():
+                yield SearchTerm(term=term, field=field, post_id=post.pk, weight=occurrences * boost)
+
+    def index(self, post):
+        SearchTerm = self._model()
+        SearchTerm.objects.filter(post_id=post.pk).delete()
+        SearchTerm.objects.bulk_create(self._terms(post), batch_size=self.batch_size)
+
+    def remove(self, post_id):
+        self._model().objects.filter(post_id=post_id).delete()
+
+    def rebuild(self, posts):
+        SearchTerm = self._model()
+        SearchTerm.objects.all().delete()
+        for post in posts:
+            SearchTerm.objects.bulk_create(self._terms(post), batch_size=self.batch_size)
+
+    def search(self, query, limit=None, fields=None):
+        terms = set(tokenize(query))
+        if not terms:
+            return []
+        postings = self._model().objects.filter(term__in=terms)
+        if fields:
+            postings = postings.filter(field__in=fields)
+        ranked = (
+            postings.values('post_id')
+            .annotate(matched=Count('term', distinct=True), score=Sum('weight'))
+            .filter(matched=len(terms))
+            .order_by('-score', '-post_id')
+            .values_list('post_id', 'score')
+        )
+        if limit is not None:
+            ranked = ranked[:limit]
+        return list(ranked)
+
+
+class SQLiteFTS5Backend(BaseSearchBackend):
+    """SQLite FTS5 virtual table ranked with BM25; created by the posts migrations."""
+
+    def index(self, post):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post.pk])
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, title, content) VALUES (%s, %s, %s)',
+                [post.pk, post.title, post.content],
+            )
+
+    def remove(self, post_id):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post_id])
+
+    def rebuild(self, posts):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        for post in posts:
+            self.index(post)
+
+    def search(self, query, limit=None, fields=None):
+        terms = tokenize(query)
+        if not terms:
+            return []
+        # Quoting every token keeps user input from being read as FTS5 query syntax
+        match = ' '.join(f'"{term}"' for term in terms)
+        if fields:
+            match = '{%s} : (%s)' % (' '.join(fields), match)
+        weights = ', '.join(str(float(weight)) for weight in FIELD_WEIGHTS.values())
+        sql = (
+            f'SELECT rowid, bm25({FTS_TABLE}, {weights}) AS score FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s ORDER BY score, rowid DESC'
+        )
+        params = [match]
+        if limit is not None:
+            sql += ' LIMIT %s'
+            params.append(limit)
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            # bm25() is lower for better matches
+            return [(post_id, -score) for post_id, score in cursor.fetchall()]
+
+
+def post_search_vector(fields=None):
+    """Return the weighted ``SearchVector`` covered by the GIN index on PostgreSQL."""
+    from django.contrib.postgres.search import SearchVector
+    labels = dict(zip(FIELD_WEIGHTS, 'ABCD'))
+    vector = None
+    for field in fields or FIELD_WEIGHTS:
+        part = SearchVector(field, weight=labels[field], config='english')
+        vector = part if vector is None else vector + part
+    return vector
+
+
+class PostgresSearchBackend(BaseSearchBackend):
+    """PostgreSQL ``tsvector`` search ranked with ``ts_rank``; uses the posts GIN expression index."""
+
+    def search(self, query, limit=None, fields=None):
+        from django.contrib.postgres.search import SearchQuery, SearchRank
+        from .models import Post
+        if not tokenize(query):
+            return []
+        vector = post_search_vector(fields)
+        search_query = SearchQuery(query, config='english', search_type='plain')
+        ranked = (
+            Post.objects.annotate(document=vector)
+            .filter(document=search_query)
+            .annotate(score=SearchRank(vector, search_query))
+            .order_by('-score', '-id')
+            .values_list('id', 'score')
+        )
+        if limit is not None:
+            ranked = ranked[:limit]
+        return list(ranked)
+
+
+_backends = {}
+
+
+def get_backend():
+    """Return the configured search backend instance."""
+    path = getattr(settings, 'SEARCH_BACKEND', 'auto')
+    if path == 'auto':
+        if connection.vendor == 'postgresql':
+            path = 'posts.search.PostgresSearchBackend'
+        elif fts5_available():
+            path = 'posts.search.SQLiteFTS5Backend'
+        else:
+            path = 'posts.search.InvertedIndexBackend'
+    if path not in _backends:
+        _backends[path] = import_string(path)()
+    return _backends[path]
+
+
+@receiver(setting_changed)
+def _reset_backend(setting, **kwargs):
+    if setting == 'SEARCH_BACKEND':
+        _backends.clear()
+
+
+def filter_matching(queryset, query, fields=None):
+    """
+    Restrict ``queryset`` to posts matching ``query``, keeping its ordering.
+
+    Matching is by whole words, like search, rather than substrings. Only
+    the ``SEARCH_MAX_RESULTS`` best ranked matches are kept, which also
+    bounds the ``pk__in`` list.
+    """
+    ranked = get_backend().search(query, fields=fields, limit=get_max_results())
+    return queryset.filter(pk__in=[post_id for post_id, _ in ranked])
+
+
+def search_posts(queryset, query):
+    """Return the posts of ``queryset`` matching ``query``, best match first."""
+    ranked = get_backend().search(query, limit=get_max_results())
+    if not ranked:
+        return queryset.none()
+    position = Case(
+        *[When(pk=post_id, then=Value(index)) for index, (post_id, _) in enumerate(ranked)],
+        output_field=IntegerField(),
+    )
+    return (
+        queryset.filter(pk__in=[post_id for post_id, _ in ranked])
+        .annotate(search_rank=position)
+        .order_by('search_rank')
+    )
+
+
+class FullTextSearchFilter(BaseFilterBackend):
+    """DRF filter backend ranking ``?search=`` results with the configured search backend."""
+
+    search_param = api_settings.SEARCH_PARAM
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '').strip()
+        if not query:
+            return queryset
+        if api_settings.ORDERING_PARAM in request.query_params:
+            # An explicit ?ordering= wins over relevance
+            return filter_matching(queryset, query)
+        return search_posts(queryset, query)
@@ -1,9 +1,20 @@
 from rest_framework import serializers
+from rest_framework.reverse import reverse
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from social_media_api.fastpath import ValuesSerializer
+from social_media_api.serializers import DynamicFieldsMixin
 from .models import Post, Comment, Like
 
 User = get_user_model()
 
+DEFAULT_COMMENTS_EMBED_LIMIT = 10
+
+
+def get_comments_embed_limit():
+    """Return the number of comments embedded in a post; the rest are paged at ``comments_url``."""
+    return getattr(settings, 'POST_COMMENTS_EMBED_LIMIT', DEFAULT_COMMENTS_EMBED_LIMIT)
+
 
 class AuthorSerializer(serializers.ModelSerializer):
     """Serializer for post/comment author information."""
@@ -14,6 +25,12 @@ class AuthorSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'username', 'first_name', 'last_name']
 
 
+class AuthorValuesSerializer(ValuesSerializer):
+    """Fast read-only rendering of ``AuthorSerializer``."""
+    
+    serializer_class = AuthorSerializer
+
+
 class CommentSerializer(serializers.ModelSerializer):
     """Serializer for Comment model."""
     
@@ -31,29 +48,44 @@ class CommentSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
-class PostSerializer(serializers.ModelSerializer):
-    """Serializer for Post model."""
+class EmbeddedCommentsMixin(serializers.Serializer):
+    """Embed the first ``POST_COMMENTS_EMBED_LIMIT`` comments of a post and link to the rest."""
+    
+    comments = serializers.SerializerMethodField()
+    comments_url = serializers.SerializerMethodField()
+    
+    def get_comments(self, obj):
+        # Views prefetch the capped comments into ``embedded_comments``
+        comments = getattr(obj, 'embedded_comments', None)
+        if comments is None:
+            comments = obj.comments.select_related('author').order_by('created_at', 'id')[:get_comments_embed_limit()]
+        return CommentSerializer(comments, many=True, context=self.context).data
+    
+    def get_comments_url(self, obj):
+        url = reverse('comments-list', request=self.context.get('request'))
+        return f'{url}?post={obj.pk}'
+
+
+class PostSerializer(DynamicFieldsMixin, EmbeddedCommentsMixin, serializers.ModelSerializer):
+    """Serializer for Post model; supports ``?fields=`` (see ``DynamicFieldsMixin``)."""
     
     author = AuthorSerializer(read_only=True)
     comment_count = serializers.ReadOnlyField()
-    comments = CommentSerializer(many=True, read_only=True)
-    likes_count = serializers.SerializerMethodField()
+    likes_count = serializers.ReadOnlyField()
     is_liked = serializers.SerializerMethodField()
     
     class Meta:
         model = Post
         fields = [
             'id', 'title', 'content', 'description', 'author', 'created_at', 
-            'updated_at', 'comment_count', 'comments', 'likes_count', 'is_liked'
+            'updated_at', 'comment_count', 'comments', 'comments_url', 'likes_count', 'is_liked'
         ]
         read_only_fields = ['id', 'author', 'created_at', 'updated_at']
     
-    def get_likes_count(self, obj):
-        """Return the number of likes on this post."""
-        return obj.likes.count()
-    
     def get_is_liked(self, obj):
         """Check if the current user has liked this post."""
+        if hasattr(obj, 'is_liked'):
+            return obj.is_liked
         request = self.context.get('request')
         if request and request.user.is_authenticated:
             return obj.likes.filter(user=request.user).exists()
@@ -66,34 +98,51 @@ class PostSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
-class PostListSerializer(serializers.ModelSerializer):
-    """Serializer for Post list view (without comments to optimize performance)."""
+class PostListSerializer(DynamicFieldsMixin, EmbeddedCommentsMixin, serializers.ModelSerializer):
+    """Serializer for Post list view; comments are only embedded with ``?expand=comments``."""
     
     author = AuthorSerializer(read_only=True)
     comment_count = serializers.ReadOnlyField()
-    likes_count = serializers.SerializerMethodField()
+    likes_count = serializers.ReadOnlyField()
     is_liked = serializers.SerializerMethodField()
     
     class Meta:
         model = Post
         fields = [
             'id', 'title', 'content', 'description', 'author', 'created_at', 
-            'updated_at', 'comment_count', 'likes_count', 'is_liked'
+            'updated_at', 'comment_count', 'comments', 'comments_url', 'likes_count', 'is_liked'
         ]
         read_only_fields = ['id', 'author', 'created_at', 'updated_at']
-    
-    def get_likes_count(self, obj):
-        """Return the number of likes on this post."""
-        return obj.likes.count()
+        expandable_fields = ['comments']
     
     def get_is_liked(self, obj):
         """Check if the current user has liked this post."""
+        if hasattr(obj, 'is_liked'):
+            return obj.is_liked
         request = self.context.get('request')
         if request and request.user.is_authenticated:
             return obj.likes.filter(user=request.user).exists()
         return False
 
 
+class PostListValuesSerializer(ValuesSerializer):
+    """Fast read-only rendering of ``PostListSerializer`` from ``.values()`` rows."""
+    
+    serializer_class = PostListSerializer
+    sources = {'comment_count': 'comments_count'}
+    method_lookups = {'is_liked': ['is_liked'], 'comments_url': ['id']}
+    
+    def prepare(self, rows):
+        self.comments_list_url = reverse('comments-list', request=self.context.get('request'))
+    
+    def get_is_liked(self, row):
+        # Annotated by PostQuerySet.with_engagement
+        return row['is_liked']
+    
+    def get_comments_url(self, row):
+        return f'{self.comments_list_url}?post={row["id"]}'
+
+
 class LikeSerializer(serializers.ModelSerializer):
     """Serializer for Like model."""
     
@@ -0,0 +1,156 @@
+from django.contrib.auth import get_user_model
+from django.db.models import F, QuerySet
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from accounts.signals import user_followed, user_unfollowed, users_followed, users_unfollowed
+from social_media_api.batching import is_batched
+from . import ranking, search, timeline
+from .models import Post, Comment, Like
+
+User = get_user_model()
+
+
+def _adjust(model, pk, field, delta):
+    """Apply ``delta`` to a stored counter with a single UPDATE, never going below zero."""
+    queryset = model.objects.filter(pk=pk)
+    if delta < 0:
+        queryset = queryset.filter(**{f'{field}__gte': -delta})
+    queryset.update(**{field: F(field) + delta})
+
+
+def adjust_likes(post_ids, delta):
+    """
+    Apply ``delta`` to the likes count of ``post_ids`` and rescore them.
+
+    Shared by the Like receivers below and ``BulkLikeView``, which applies a
+    whole batch with the same one UPDATE and one rescore.
+    """
+    post_ids = list(post_ids)
+    if not post_ids:
+        return
+    queryset = Post.objects.filter(pk__in=post_ids)
+    if delta < 0:
+        queryset = queryset.filter(likes_count__gte=-delta)
+    queryset.update(likes_count=F('likes_count') + delta)
+    ranking.refresh_scores(post_ids)
+
+
+def _deleted_with_post(instance, origin):
+    """
+    Return True when the like or comment ``instance`` is removed because its post is deleted.
+
+    Counters and scores of a deleted post need no update, so its children
+    skip that work instead of costing a few queries each.
+    """
+    if isinstance(origin, Post):
+        return origin.pk == instance.post_id
+    # A deleted Post queryset only collects children of the posts it deletes
+    return isinstance(origin, QuerySet) and origin.model is Post
+
+
+@receiver(post_save, sender=Post)
+def fan_out_new_post(sender, instance, created, **kwargs):
+    """Push new posts into the followers' materialized timelines."""
+    if created:
+        timeline.fan_out_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def remove_deleted_post(sender, instance, **kwargs):
+    """Drop deleted posts from timelines kept outside the database."""
+    timeline.get_backend().remove_post(instance.pk)
+
+
+@receiver(user_followed)
+def backfill_on_follow(sender, follower_id, followed_id, **kwargs):
+    """Seed the follower's timeline with the followed author's recent posts."""
+    timeline.backfill_timeline(follower_id, followed_id)
+
+
+@receiver(user_unfollowed)
+def prune_on_unfollow(sender, follower_id, followed_id, **kwargs):
+    """Remove the unfollowed author's posts from the follower's timeline."""
+    timeline.get_backend().remove_author(follower_id, followed_id)
+
+
+@receiver(users_followed)
+def backfill_on_follow_many(sender, follower_id, followed_ids, **kwargs):
+    timeline.backfill_timeline_many(follower_id, followed_ids)
+
+
+@receiver(users_unfollowed)
+def prune_on_unfollow_many(sender, follower_id, followed_ids, **kwargs):
+    timeline.get_backend().remove_authors(follower_id, followed_ids)
+
+
+@receiver(post_save, sender=Post)
+def increment_posts_count(sender, instance, created, **kwargs):
+    if created:
+        _adjust(User, instance.author_id, 'posts_count', 1)
+
+
+@receiver(post_delete, sender=Post)
+def decrement_posts_count(sender, instance, **kwargs):
+    _adjust(User, instance.author_id, 'posts_count', -1)
+
+
+@receiver(post_save, sender=Like)
+def increment_likes_count(sender, instance, created, **kwargs):
+    if created:
+        adjust_likes([instance.post_id], 1)
+
+
+@receiver(post_delete, sender=Like)
+def decrement_likes_count(sender, instance, origin=None, **kwargs):
+    # BulkLikeView applies batched deletes itself
+    if not is_batched(origin) and not _deleted_with_post(instance, origin):
+        adjust_likes([instance.post_id], -1)
+
+
+@receiver(post_save, sender=Comment)
+def increment_comments_count(sender, instance, created, **kwargs):
+    if created:
+        _adjust(Post, instance.post_id, 'comments_count', 1)
+
+
+@receiver(post_delete, sender=Comment)
+def decrement_comments_count(sender, instance, origin=None, **kwargs):
+    if not _deleted_with_post(instance, origin):
+        _adjust(Post, instance.post_id, 'comments_count', -1)
+
+
+@receiver(pre_save, sender=Post)
+def score_new_post(sender, instance, **kwargs):
+    """Give new posts the score of an unengaged post so they enter the ranked feed."""
+    if instance._state.adding:
+        # created_at is only filled in by auto_now_add after this signal
+        instance.rank_score = ranking.hot_score(
+            instance.created_at or timezone.now(), instance.likes_count, instance.comments_count
+        )
+
+
+# Registered after the counter receivers so the score sees the updated counts;
+# likes are rescored by adjust_likes
+@receiver(post_save, sender=Comment)
+def rescore_on_engagement(sender, instance, created, **kwargs):
+    if created:
+        ranking.refresh_scores([instance.post_id])
+
+
+@receiver(post_delete, sender=Comment)
+def rescore_on_disengagement(sender, instance, origin=None, **kwargs):
+    if not _deleted_with_post(instance, origin):
+        ranking.refresh_scores([instance.post_id])
+
+
+@receiver(post_save, sender=Post)
+def index_post(sender, instance, **kwargs):
+    """Keep the full-text search index in step with post edits."""
+    search.get_backend().index(instance)
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post(sender, instance, **kwargs):
+    search.get_backend().remove(instance.pk)
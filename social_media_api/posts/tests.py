@@ -1,7 +1,22 @@
+import json
+from io import StringIO
+from unittest import mock
+
 from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
 from rest_framework import status
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 from django.contrib.auth import get_user_model
-from .models import Post, Comment
+from django.contrib.contenttypes.models import ContentType
+from unittest import skipUnless
+from accounts.models import UserFollowing
+from notifications.models import Notification
+from .models import Post, Comment, Like, TimelineEntry
+from .views import CommentViewSet, PostViewSet
 
 User = get_user_model()
 
@@ -49,3 +64,442 @@ class PostsAPITestCase(APITestCase):
         data = {'title': 'Unauthorized Update'}
         response = self.client.patch(f'/api/posts/{self.post1.id}/', data)
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def count_list_queries(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len(context.captured_queries), response
+
+    def test_post_list_query_count_is_constant(self):
+        """Test list endpoints annotate engagement instead of querying per post"""
+        self.client.force_authenticate(user=self.user2)
+        Like.objects.create(post=self.post1, user=self.user2)
+        Comment.objects.create(post=self.post1, author=self.user2, content='Nice post')
+        baseline, response = self.count_list_queries('/api/posts/')
+        first = response.data['results'][0]
+        self.assertEqual((first['likes_count'], first['comment_count'], first['is_liked']), (1, 1, True))
+
+        for number in range(5):
+            post = Post.objects.create(title=f'Extra post {number}', content='More test content', author=self.user1)
+            Like.objects.create(post=post, user=self.user1)
+        queries, response = self.count_list_queries('/api/posts/')
+        self.assertEqual(len(response.data['results']), 6)
+        self.assertEqual(queries, baseline)
+
+
+class FeedTimelineTestCase(APITestCase):
+    def setUp(self):
+        """Set up a reader following one author"""
+        self.reader = User.objects.create_user(username='reader', password='testpass123')
+        self.author = User.objects.create_user(username='author', password='testpass123')
+        self.stranger = User.objects.create_user(username='stranger', password='testpass123')
+        self.reader.following.add(self.author)
+        self.client.force_authenticate(user=self.reader)
+
+    def feed_titles(self):
+        response = self.client.get('/api/posts/feed/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [post['title'] for post in response.data['results']]
+
+    def test_new_posts_are_fanned_out(self):
+        """Test posts by followed authors are pushed into the reader's timeline"""
+        Post.objects.create(title='First post', content='Some content here', author=self.author)
+        Post.objects.create(title='Second post', content='Some content here', author=self.author)
+        Post.objects.create(title='Unrelated post', content='Some content here', author=self.stranger)
+        self.assertEqual(TimelineEntry.objects.filter(user=self.reader).count(), 2)
+        self.assertEqual(self.feed_titles(), ['Second post', 'First post'])
+
+    def test_follow_backfills_and_unfollow_prunes(self):
+        """Test following seeds the timeline and unfollowing removes the author's posts"""
+        Post.objects.create(title='Older post', content='Some content here', author=self.stranger)
+        self.reader.following.add(self.stranger)
+        self.assertEqual(self.feed_titles(), ['Older post'])
+        self.reader.following.remove(self.stranger)
+        self.assertEqual(self.feed_titles(), [])
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=0)
+    def test_celebrity_posts_are_merged_on_read(self):
+        """Test authors above the fan-out limit are pulled into the feed at read time"""
+        Post.objects.create(title='Celebrity post', content='Some content here', author=self.author)
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertEqual(self.feed_titles(), ['Celebrity post'])
+
+    @override_settings(TIMELINE_BACKEND='posts.timeline.LocMemTimelineBackend', TIMELINE_MAX_LENGTH=2)
+    def test_locmem_backend_is_bounded(self):
+        """Test the in-memory backend serves the feed and keeps only the newest entries"""
+        for number in range(3):
+            Post.objects.create(title=f'Bounded post {number}', content='Some content here', author=self.author)
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertEqual(self.feed_titles(), ['Bounded post 2', 'Bounded post 1'])
+
+    def test_ranked_mode_orders_by_engagement(self):
+        """Test ?mode=ranked puts engaged posts above newer quiet ones and follows like changes"""
+        popular = Post.objects.create(title='Popular post', content='Some content here', author=self.author)
+        Post.objects.create(title='Quiet post', content='Some content here', author=self.author)
+        Post.objects.create(title='Unrelated post', content='Some content here', author=self.stranger)
+        fans = [User.objects.create_user(username=f'fan{number}', password='testpass123') for number in range(3)]
+        for fan in fans:
+            Like.objects.create(post=popular, user=fan)
+        response = self.client.get('/api/posts/feed/?mode=ranked')
+        self.assertEqual([post['title'] for post in response.data['results']], ['Popular post', 'Quiet post'])
+
+        Like.objects.filter(post=popular).delete()
+        response = self.client.get('/api/posts/feed/?mode=ranked&page_size=1')
+        self.assertEqual([post['title'] for post in response.data['results']], ['Quiet post'])
+        response = self.client.get(response.data['next'])
+        self.assertEqual([post['title'] for post in response.data['results']], ['Popular post'])
+
+    def test_recompute_rank_scores(self):
+        """Test the management command restores scores that drifted"""
+        post = Post.objects.create(title='Scored post', content='Some content here', author=self.author)
+        expected = Post.objects.get(pk=post.pk).rank_score
+        Post.objects.filter(pk=post.pk).update(rank_score=0)
+        call_command('recompute_rank_scores', stdout=StringIO())
+        self.assertAlmostEqual(Post.objects.get(pk=post.pk).rank_score, expected)
+
+
+
+class SparseFieldsTestCase(APITestCase):
+    def setUp(self):
+        """Set up a post with more comments than are embedded"""
+        self.user = User.objects.create_user(username='sparse', password='testpass123')
+        self.post = Post.objects.create(title='Sparse post', content='Some content here', author=self.user)
+        for number in range(3):
+            Comment.objects.create(post=self.post, author=self.user, content=f'Comment {number}')
+        self.client.force_authenticate(user=self.user)
+
+    def test_fields_limit_response_and_queries(self):
+        """Test ?fields= trims the response and skips the joins and prefetches it no longer needs"""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(f'/api/posts/{self.post.id}/?fields=id,title')
+        self.assertEqual(response.data, {'id': self.post.id, 'title': 'Sparse post'})
+        sql = ' '.join(query['sql'] for query in queries.captured_queries)
+        self.assertNotIn('posts_comment', sql)
+        self.assertNotIn('posts_like', sql)
+        self.assertNotIn('accounts_customuser', sql)
+
+    @override_settings(POST_COMMENTS_EMBED_LIMIT=2)
+    def test_embedded_comments_are_capped(self):
+        """Test the detail view embeds at most the configured comments and links to the rest"""
+        response = self.client.get(f'/api/posts/{self.post.id}/')
+        self.assertEqual([comment['content'] for comment in response.data['comments']], ['Comment 0', 'Comment 1'])
+        self.assertEqual(response.data['comment_count'], 3)
+        self.assertTrue(response.data['comments_url'].endswith(f'/api/comments/?post={self.post.id}'))
+
+    def test_fast_rendering_matches_serializer(self):
+        """Test list and feed pages rendered from .values() rows match the serializer byte for byte"""
+        reader = User.objects.create_user(username='reader', password='testpass123')
+        reader.following.add(self.user)
+        Post.objects.create(title='Second post', content='More content', author=self.user)
+        Like.objects.create(post=self.post, user=reader)
+        self.client.force_authenticate(user=reader)
+        for url in ['/api/posts/', '/api/posts/?page_size=1', '/api/posts/?fields=id,author,is_liked',
+                    '/api/posts/?page=1', '/api/posts/feed/', '/api/posts/feed/?mode=ranked&page_size=1',
+                    '/api/posts/?expand=comments']:
+            fast = self.client.get(url)
+            with override_settings(FAST_LIST_RENDERING=False):
+                slow = self.client.get(url)
+            self.assertEqual(fast.status_code, status.HTTP_200_OK)
+            self.assertEqual(fast.content, slow.content, url)
+
+    def test_conditional_get(self):
+        """Test an unchanged post answers If-None-Match with 304 and likes or comment edits change its ETag"""
+        url = f'/api/posts/{self.post.id}/'
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+
+        Like.objects.create(post=self.post, user=self.user)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data['is_liked'])
+        etag = response['ETag']
+
+        comment = Comment.objects.first()
+        comment.content = 'Edited comment'
+        comment.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.client.get(f'{url}?fields=id', HTTP_IF_NONE_MATCH=response['ETag']).status_code,
+                         status.HTTP_200_OK)
+
+    @override_settings(ALLOWED_HOSTS=['localhost', '127.0.0.1'])
+    def test_benchmark_command(self):
+        """Test benchmark_serializers runs with the default hosts and leaves no sample rows behind"""
+        stdout = StringIO()
+        call_command('benchmark_serializers', sizes=[1, 3], repeat=1, stdout=stdout)
+        self.assertIn('PostListSerializer', stdout.getvalue())
+        self.assertIn('NotificationSerializer', stdout.getvalue())
+        self.assertFalse(User.objects.filter(username='benchmark-reader').exists())
+
+    def test_list_expands_comments_on_request(self):
+        """Test list items only embed comments with ?expand=comments"""
+        response = self.client.get('/api/posts/')
+        self.assertNotIn('comments', response.data['results'][0])
+        response = self.client.get('/api/posts/?expand=comments')
+        self.assertEqual(len(response.data['results'][0]['comments']), 3)
+
+
+class CountersTestCase(APITestCase):
+    def setUp(self):
+        """Set up a post and a second user to interact with it"""
+        self.author = User.objects.create_user(username='counted', password='testpass123')
+        self.fan = User.objects.create_user(username='fan', password='testpass123')
+        self.post = Post.objects.create(title='Counted post', content='Some content here', author=self.author)
+        self.client.force_authenticate(user=self.fan)
+
+    def test_like_and_comment_counters(self):
+        """Test likes, comments and posts counters follow the write paths"""
+        self.client.post(f'/api/posts/{self.post.id}/like/')
+        self.client.post('/api/comments/', {'post': self.post.id, 'content': 'Great post'})
+        self.post.refresh_from_db()
+        self.author.refresh_from_db()
+        self.assertEqual((self.post.likes_count, self.post.comments_count), (1, 1))
+        self.assertEqual(self.author.posts_count, 1)
+
+        self.client.delete(f'/api/posts/{self.post.id}/unlike/')
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 0)
+
+    @override_settings(NOTIFICATIONS_DISPATCHER={'MODE': 'sync'})
+    def test_bulk_like_and_unlike(self):
+        """Test the bulk endpoint likes and unlikes several posts in a fixed number of queries"""
+        other = Post.objects.create(title='Another post', content='Some more content', author=self.author)
+        Like.objects.create(post=other, user=self.fan)
+        third = Post.objects.create(title='Third post', content='Yet more content', author=self.author)
+        ids = [self.post.id, other.id, third.id, 999999]
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/posts/likes/bulk/', {'ids': ids}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['liked'], [self.post.id, third.id])
+        self.assertEqual(response.data['already_liked'], [other.id])
+        self.assertEqual(response.data['missing'], [999999])
+        self.assertEqual(
+            dict(Post.objects.values_list('id', 'likes_count')), {self.post.id: 1, other.id: 1, third.id: 1}
+        )
+        self.assertEqual(Notification.objects.filter(recipient=self.author, verb='liked your post').count(), 2)
+
+        response = self.client.delete('/api/posts/likes/bulk/', {'ids': [self.post.id, other.id]}, format='json')
+        self.assertEqual(response.data['unliked'], [self.post.id, other.id])
+        self.assertEqual(
+            dict(Post.objects.values_list('id', 'likes_count')), {self.post.id: 0, other.id: 0, third.id: 1}
+        )
+
+    def test_bulk_like_query_count(self):
+        """Test bulk like and unlike run the same queries for 1 and 20 posts"""
+        posts = [
+            Post.objects.create(title=f'Bulk post {i}', content='Some content here', author=self.author)
+            for i in range(20)
+        ]
+        # Notifications look the content type up once per process
+        ContentType.objects.get_for_model(Post)
+        for ids in ([posts[0].id], [post.id for post in posts]):
+            with self.assertNumQueries(9):
+                self.client.post('/api/posts/likes/bulk/', {'ids': ids}, format='json')
+            with self.assertNumQueries(9):
+                self.client.delete('/api/posts/likes/bulk/', {'ids': ids}, format='json')
+        self.assertEqual(set(Post.objects.values_list('likes_count', flat=True)), {0})
+    
+    @override_settings(BULK_ACTION_MAX_IDS=2)
+    def test_bulk_like_limit(self):
+        """Test the bulk endpoint rejects more ids than allowed"""
+        response = self.client.post('/api/posts/likes/bulk/', {'ids': [1, 2, 3]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_recount_counters_repairs_drift(self):
+        """Test the management command restores counters that drifted"""
+        Like.objects.create(post=self.post, user=self.fan)
+        Post.objects.filter(pk=self.post.pk).update(likes_count=7, comments_count=3)
+        User.objects.filter(pk=self.author.pk).update(posts_count=0)
+        call_command('recount_counters', batch_size=1, stdout=StringIO())
+        self.post.refresh_from_db()
+        self.author.refresh_from_db()
+        self.assertEqual((self.post.likes_count, self.post.comments_count), (1, 0))
+        self.assertEqual(self.author.posts_count, 1)
+    
+    def test_post_delete_skips_child_counters(self):
+        """Test deleting a post costs the same queries whatever its number of likes and comments"""
+        fans = [User.objects.create(username=f'fan{i}') for i in range(10)]
+        
+        def delete_queries(children, delete):
+            post = Post.objects.create(title='Doomed post', content='Some content here', author=self.author)
+            for fan in fans[:children]:
+                Like.objects.create(post=post, user=fan)
+                Comment.objects.create(post=post, author=fan, content='Bye')
+            with CaptureQueriesContext(connection) as queries:
+                delete(post)
+            return len(queries)
+        
+        def by_queryset(post):
+            Post.objects.filter(pk=post.pk).delete()
+        
+        self.assertEqual(delete_queries(1, Post.delete), delete_queries(10, Post.delete))
+        self.assertEqual(delete_queries(1, by_queryset), delete_queries(10, by_queryset))
+        
+        # Likes removed with their author still update the posts that remain
+        Like.objects.create(post=self.post, user=fans[0])
+        fans[0].delete()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 0)
+
+
+class KeysetPaginationTestCase(APITestCase):
+    def setUp(self):
+        """Set up posts sharing one timestamp so ties must be broken by id"""
+        self.reader = User.objects.create_user(username='pager', password='testpass123')
+        self.author = User.objects.create_user(username='prolific', password='testpass123')
+        self.reader.following.add(self.author)
+        for number in range(5):
+            Post.objects.create(title=f'Paged post {number}', content='Some content here', author=self.author)
+        Post.objects.update(created_at=timezone.now())
+        TimelineEntry.objects.update(created_at=Post.objects.first().created_at)
+        self.client.force_authenticate(user=self.reader)
+
+    def walk(self, url):
+        titles = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn('count', response.data)
+            titles.extend(post['title'] for post in response.data['results'])
+            url = response.data['next']
+        return titles
+
+    def test_cursor_walks_every_post_once(self):
+        """Test following next links visits each post exactly once, newest first"""
+        expected = [f'Paged post {number}' for number in reversed(range(5))]
+        self.assertEqual(self.walk('/api/posts/?page_size=2'), expected)
+        self.assertEqual(self.walk('/api/posts/feed/?page_size=2'), expected)
+
+    def test_unpaginated_lists_are_streamed(self):
+        """Test my_posts streams a JSON array in chunks when pagination is disabled"""
+        self.client.force_authenticate(user=self.author)
+        Comment.objects.create(post=Post.objects.first(), author=self.author, content='Own comment')
+        with mock.patch.object(PostViewSet, 'pagination_class', None), \
+                mock.patch.object(PostViewSet, 'stream_chunk_size', 2):
+            response = self.client.get('/api/posts/my_posts/')
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        posts = json.loads(b''.join(response.streaming_content))
+        self.assertEqual(len(posts), 5)
+        self.assertEqual({post['title'] for post in posts}, {f'Paged post {number}' for number in range(5)})
+        self.assertEqual(sum(len(post['comments']) for post in posts), 1)
+
+        with mock.patch.object(CommentViewSet, 'pagination_class', None):
+            response = self.client.get('/api/comments/my_comments/')
+        self.assertEqual([comment['content'] for comment in json.loads(b''.join(response.streaming_content))],
+                         ['Own comment'])
+
+    async def test_lists_stream_chunk_by_chunk_under_asgi(self):
+        """Test my_posts sends an async body under ASGI, one chunk per batch, instead of buffering it"""
+        headers = {'Authorization': f'Bearer {AccessToken.for_user(self.author)}'}
+        with mock.patch.object(PostViewSet, 'pagination_class', None), \
+                mock.patch.object(PostViewSet, 'stream_chunk_size', 2):
+            response = await self.async_client.get('/api/posts/my_posts/', headers=headers)
+            self.assertTrue(response.is_async)
+            chunks = [chunk async for chunk in response.streaming_content]
+        # The brackets plus batches of 2, 2 and 1 posts
+        self.assertEqual(len(chunks), 5)
+        self.assertEqual(len(json.loads(b''.join(chunks))), 5)
+    
+    def test_page_numbers_on_request(self):
+        """Test clients can still opt into page-number pagination"""
+        response = self.client.get('/api/posts/?page=2&page_size=2')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 5)
+        self.assertEqual(len(response.data['results']), 2)
+
+    def test_invalid_cursor(self):
+        """Test a tampered cursor is rejected"""
+        response = self.client.get('/api/posts/?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+@skipUnless(connection.vendor == 'sqlite', 'Query plans are checked on SQLite')
+class IndexUsageTestCase(TestCase):
+    def assertUsesIndex(self, queryset, index_name):
+        plan = queryset.explain()
+        self.assertRegex(plan, rf'USING (COVERING )?INDEX {index_name}\b')
+        self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_hot_queries_use_composite_indexes(self):
+        """Test each hot query is answered by its matching index without a sort"""
+        self.assertUsesIndex(
+            Post.objects.filter(author_id=1).order_by('-created_at', '-id')[:10],
+            'posts_post_author_recent',
+        )
+        self.assertUsesIndex(
+            Comment.objects.filter(post_id=1).order_by('created_at', 'id')[:10],
+            'posts_comment_post_created',
+        )
+        self.assertUsesIndex(
+            Notification.objects.filter(recipient_id=1).order_by('-timestamp', '-id')[:10],
+            'notif_recipient_recent',
+        )
+        self.assertUsesIndex(
+            Notification.objects.filter(recipient_id=1, read=False).order_by(),
+            'notif_unread_recipient',
+        )
+        self.assertUsesIndex(
+            UserFollowing.objects.filter(following_user_id=1).order_by().values('user_id'),
+            'accounts_follow_follower',
+        )
+        self.assertUsesIndex(
+            Post.objects.filter(rank_score__gte=0).order_by('-rank_score', '-id')[:10],
+            'posts_post_rank',
+        )
+
+
+class SearchTestCase(APITestCase):
+    def setUp(self):
+        """Set up posts mentioning django in the title or only in the content"""
+        self.user = User.objects.create_user(username='searcher', password='testpass123')
+        self.client.force_authenticate(user=self.user)
+        self.in_content = Post.objects.create(
+            author=self.user, title='Weekend notes', content='Read about Django signals today',
+        )
+        self.in_title = Post.objects.create(
+            author=self.user, title='Django search tips', content='Index your text columns',
+        )
+        Post.objects.create(author=self.user, title='Unrelated post', content='Nothing to see here')
+
+    def search(self, query):
+        response = self.client.get('/api/posts/', {'search': query})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [post['id'] for post in response.data['results']]
+
+    def check_search(self):
+        self.assertEqual(self.search('django'), [self.in_title.id, self.in_content.id])
+        self.assertEqual(self.search('DJANGO signals'), [self.in_content.id])
+        self.assertEqual(self.search('"django" -*'), [self.in_title.id, self.in_content.id])
+
+        self.in_content.content = 'Read about caching today'
+        self.in_content.save()
+        self.in_title.delete()
+        self.assertEqual(self.search('django'), [])
+
+        response = self.client.get('/api/posts/', {'title': 'notes'})
+        self.assertEqual([post['id'] for post in response.data['results']], [self.in_content.id])
+        # Whole words only, unlike the former icontains filter
+        response = self.client.get('/api/posts/', {'title': 'note'})
+        self.assertEqual(response.data['results'], [])
+
+    def test_search_with_default_backend(self):
+        """Test search ranks title matches first and follows edits and deletes"""
+        self.check_search()
+
+    @override_settings(SEARCH_MAX_RESULTS=1)
+    def test_filter_is_capped(self):
+        """Test the title and content filters keep at most SEARCH_MAX_RESULTS matches"""
+        Post.objects.create(author=self.user, title='More notes', content='Read about Django forms')
+        response = self.client.get('/api/posts/', {'content': 'read about'})
+        self.assertEqual(len(response.data['results']), 1)
+
+    @override_settings(SEARCH_BACKEND='posts.search.InvertedIndexBackend')
+    def test_search_with_inverted_index(self):
+        """Test the portable inverted index after a rebuild"""
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.check_search()
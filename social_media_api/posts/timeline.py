@@ -0,0 +1,330 @@
+"""
+Materialized home timelines (fan-out-on-write).
+
+When a post is created its id is pushed into the bounded timeline of every
+follower of the author, so reading a feed page is a single indexed range scan
+instead of a join and sort over every followed author's posts. Authors with
+more followers than ``TIMELINE_FANOUT_LIMIT`` are not fanned out; their posts
+are pulled at read time and merged into the stored entries (fan-out-on-read).
+
+The storage is pluggable through the ``TIMELINE_BACKEND`` setting:
+
+- ``posts.timeline.DatabaseTimelineBackend`` (default) keeps entries in the
+  ``TimelineEntry`` table.
+- ``posts.timeline.LocMemTimelineBackend`` keeps entries in process memory,
+  which is useful for tests and single-process development servers.
+
+Timeline entries are ``(created_at, post_id)`` tuples ordered newest first.
+"""
+
+import bisect
+import heapq
+import threading
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db.models import F, Q, Window
+from django.db.models.functions import RowNumber
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+DEFAULT_BACKEND = 'posts.timeline.DatabaseTimelineBackend'
+DEFAULT_MAX_LENGTH = 800
+DEFAULT_FANOUT_LIMIT = 5000
+
+
+def get_max_length():
+    """Return the maximum number of entries kept per timeline."""
+    return getattr(settings, 'TIMELINE_MAX_LENGTH', DEFAULT_MAX_LENGTH)
+
+
+def get_fanout_limit():
+    """Return the follower count above which posts are fanned out on read."""
+    return getattr(settings, 'TIMELINE_FANOUT_LIMIT', DEFAULT_FANOUT_LIMIT)
+
+
+class BaseTimelineBackend:
+    """Interface shared by all timeline stores."""
+
+    def push(self, post, user_ids):
+        """Add ``post`` to the timelines of ``user_ids``."""
+        raise NotImplementedError
+
+    def backfill(self, user_id, posts):
+        """Add several posts to the timeline of a single user."""
+        raise NotImplementedError
+
+    def remove_post(self, post_id):
+        """Remove a post from every timeline."""
+        raise NotImplementedError
+
+    def remove_author(self, user_id, author_id):
+        """Remove all posts by ``author_id`` from the timeline of ``user_id``."""
+        raise NotImplementedError
+
+    def remove_authors(self, user_id, author_ids):
+        """Remove all posts by any of ``author_ids`` from the timeline of ``user_id``."""
+        for author_id in author_ids:
+            self.remove_author(user_id, author_id)
+
+    def entries(self, user_id, limit, before=None):
+        """
+        Return up to ``limit`` ``(created_at, post_id)`` tuples, newest first.
+
+        When ``before`` is a ``(created_at, post_id)`` tuple only strictly
+        older entries are returned.
+        """
+        raise NotImplementedError
+
+    def clear(self):
+        """Drop every stored timeline."""
+        raise NotImplementedError
+
+
+class DatabaseTimelineBackend(BaseTimelineBackend):
+    """Timeline store backed by the ``TimelineEntry`` table."""
+
+    batch_size = 1000
+
+    def _model(self):
+        from .models import TimelineEntry
+        return TimelineEntry
+
+    def push(self, post, user_ids):
+        TimelineEntry = self._model()
+        user_ids = list(user_ids)
+        for start in range(0, len(user_ids), self.batch_size):
+            batch = user_ids[start:start + self.batch_size]
+            TimelineEntry.objects.bulk_create(
+                [
+                    TimelineEntry(
+                        user_id=user_id,
+                        post_id=post.pk,
+                        author_id=post.author_id,
+                        created_at=post.created_at,
+                    )
+                    for user_id in batch
+                ],
+                ignore_conflicts=True,
+            )
+            self._trim(batch)
+
+    def backfill(self, user_id, posts):
+        TimelineEntry = self._model()
+        TimelineEntry.objects.bulk_create(
+            [
+                TimelineEntry(
+                    user_id=user_id,
+                    post_id=post.pk,
+                    author_id=post.author_id,
+                    created_at=post.created_at,
+                )
+                for post in posts
+            ],
+            batch_size=self.batch_size,
+            ignore_conflicts=True,
+        )
+        self._trim([user_id])
+
+    def remove_post(self, post_id):
+        self._model().objects.filter(post_id=post_id).delete()
+
+    def remove_author(self, user_id, author_id):
+        self._model().objects.filter(user_id=user_id, author_id=author_id).delete()
+
+    def remove_authors(self, user_id, author_ids):
+        self._model().objects.filter(user_id=user_id, author_id__in=list(author_ids)).delete()
+
+    def entries(self, user_id, limit, before=None):
+        queryset = self._model().objects.filter(user_id=user_id)
+        if before is not None:
+            created_at, post_id = before
+            queryset = queryset.filter(
+                Q(created_at__lt=created_at) | Q(created_at=created_at, post_id__lt=post_id)
+            )
+        rows = queryset.order_by('-created_at', '-post_id').values_list('created_at', 'post_id')
+        return list(rows[:limit])
+
+    def clear(self):
+        self._model().objects.all().delete()
+
+    def _trim(self, user_ids):
+        """Delete entries beyond the configured maximum length for ``user_ids``."""
+        TimelineEntry = self._model()
+        stale = (
+            TimelineEntry.objects.filter(user_id__in=user_ids)
+            .annotate(
+                position=Window(
+                    RowNumber(),
+                    partition_by=[F('user_id')],
+                    order_by=[F('created_at').desc(), F('post_id').desc()],
+                )
+            )
+            .filter(position__gt=get_max_length())
+            .values_list('pk', flat=True)
+        )
+        stale_ids = list(stale)
+        if stale_ids:
+            TimelineEntry.objects.filter(pk__in=stale_ids).delete()
+
+
+class LocMemTimelineBackend(BaseTimelineBackend):
+    """In-process timeline store; entries are lost when the process exits."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # user_id -> list of (created_at, post_id, author_id), oldest first
+        self._timelines = {}
+
+    def _insert(self, user_id, item):
+        timeline = self._timelines.setdefault(user_id, [])
+        if any(entry[1] == item[1] for entry in timeline):
+            return
+        bisect.insort(timeline, item)
+        overflow = len(timeline) - get_max_length()
+        if overflow > 0:
+            del timeline[:overflow]
+
+    def push(self, post, user_ids):
+        item = (post.created_at, post.pk, post.author_id)
+        with self._lock:
+            for user_id in user_ids:
+                self._insert(user_id, item)
+
+    def backfill(self, user_id, posts):
+        with self._lock:
+            for post in posts:
+                self._insert(user_id, (post.created_at, post.pk, post.author_id))
+
+    def remove_post(self, post_id):
+        with self._lock:
+            for user_id, timeline in self._timelines.items():
+                self._timelines[user_id] = [entry for entry in timeline if entry[1] != post_id]
+
+    def remove_author(self, user_id, author_id):
+        with self._lock:
+            timeline = self._timelines.get(user_id, [])
+            self._timelines[user_id] = [entry for entry in timeline if entry[2] != author_id]
+
+    def remove_authors(self, user_id, author_ids):
+        author_ids = set(author_ids)
+        with self._lock:
+            timeline = self._timelines.get(user_id, [])
+            self._timelines[user_id] = [entry for entry in timeline if entry[2] not in author_ids]
+
+    def entries(self, user_id, limit, before=None):
+        with self._lock:
+            timeline = list(self._timelines.get(user_id, []))
+        result = []
+        for created_at, post_id, _ in reversed(timeline):
+            if before is not None and (created_at, post_id) >= before:
+                continue
+            result.append((created_at, post_id))
+            if len(result) >= limit:
+                break
+        return result
+
+    def clear(self):
+        with self._lock:
+            self._timelines.clear()
+
+
+_backends = {}
+
+
+def get_backend():
+    """Return the configured timeline backend instance."""
+    path = getattr(settings, 'TIMELINE_BACKEND', DEFAULT_BACKEND)
+    if path not in _backends:
+        _backends[path] = import_string(path)()
+    return _backends[path]
+
+
+@receiver(setting_changed)
+def _reset_backend(setting, **kwargs):
+    if setting == 'TIMELINE_BACKEND':
+        _backends.clear()
+
+
+def follower_ids(author_id):
+    """Return the ids of users following ``author_id``."""
+    from accounts.models import UserFollowing
+    # UserFollowing rows store the followed user in ``user`` and the follower in ``following_user``
+    return UserFollowing.objects.filter(user_id=author_id).values_list('following_user_id', flat=True)
+
+
+def followed_celebrity_ids(user):
+    """Return ids of followed authors whose posts are fanned out on read."""
+    from accounts.models import CustomUser, UserFollowing
+    followed = UserFollowing.objects.filter(following_user=user).values('user_id')
+    return list(
+        CustomUser.objects.filter(pk__in=followed, followers_count__gt=get_fanout_limit())
+        .values_list('pk', flat=True)
+    )
+
+
+def is_celebrity(author_id):
+    """Return True when ``author_id`` has too many followers to fan out on write."""
+    from accounts.models import CustomUser
+    return CustomUser.objects.filter(pk=author_id, followers_count__gt=get_fanout_limit()).exists()
+
+
+def fan_out_post(post):
+    """Push a newly created post into its author's followers' timelines."""
+    if is_celebrity(post.author_id):
+        # Celebrity account: readers pull these posts at read time instead
+        return
+    followers = list(follower_ids(post.author_id))
+    if followers:
+        get_backend().push(post, followers)
+
+
+def backfill_timeline(user_id, author_id):
+    """Copy the recent posts of a newly followed author into a timeline."""
+    backfill_timeline_many(user_id, [author_id])
+
+
+def backfill_timeline_many(user_id, author_ids):
+    """Copy the recent posts of several newly followed authors into a timeline, in one read."""
+    from .models import Post
+    # Celebrity accounts are pulled at read time, so their posts are left out
+    posts = (
+        Post.objects.filter(author_id__in=author_ids, author__followers_count__lte=get_fanout_limit())
+        .order_by('-created_at', '-id')[:get_max_length()]
+    )
+    get_backend().backfill(user_id, posts.only('id', 'author_id', 'created_at'))
+
+
+def get_feed_entries(user, limit, before=None):
+    """
+    Return up to ``limit`` feed entries for ``user``, newest first.
+
+    Stored timeline entries are merged with the recent posts of followed
+    celebrity accounts, which are never fanned out on write.
+    """
+    from .models import Post
+    stored = get_backend().entries(user.pk, limit, before)
+    celebrities = followed_celebrity_ids(user)
+    if not celebrities:
+        return stored
+
+    queryset = Post.objects.filter(author_id__in=celebrities)
+    if before is not None:
+        created_at, post_id = before
+        queryset = queryset.filter(
+            Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=post_id)
+        )
+    pulled = list(
+        queryset.order_by('-created_at', '-id').values_list('created_at', 'id')[:limit]
+    )
+
+    merged = []
+    seen = set()
+    for entry in heapq.merge(stored, pulled, reverse=True):
+        if entry[1] in seen:
+            continue
+        seen.add(entry[1])
+        merged.append(entry)
+        if len(merged) >= limit:
+            break
+    return merged
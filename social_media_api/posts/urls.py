@@ -1,6 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import PostViewSet, FeedView, LikePostView, UnlikePostView
+from .views import PostViewSet, FeedView, LikePostView, UnlikePostView, BulkLikeView
 
 # Create a router and register our viewsets with it
 router = DefaultRouter()
@@ -8,10 +8,12 @@ router.register(r'', PostViewSet, basename='posts')
 
 # The API URLs are now determined automatically by the router
 urlpatterns = [
-    path('', include(router.urls)),
-    # Feed endpoint - as required by the task
+    # Feed endpoint - as required by the task.
+    # Listed before the router so its detail pattern does not capture "feed".
     path('feed/', FeedView.as_view(), name='feed'),
+    path('likes/bulk/', BulkLikeView.as_view(), name='bulk-like'),
+    path('', include(router.urls)),
     # Like and unlike endpoints as required by the checks
     path('<int:pk>/like/', LikePostView.as_view(), name='like-post'),
     path('<int:pk>/unlike/', UnlikePostView.as_view(), name='unlike-post'),
-]
\ No newline at end of file
+]
@@ -2,27 +2,65 @@ from rest_framework import viewsets, permissions, filters, status, generics
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Q
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Prefetch, Q, Subquery
 from django.contrib.auth import get_user_model
-from django.contrib.contenttypes.models import ContentType
 from django.shortcuts import get_object_or_404
 from .models import Post, Comment, Like
-from .serializers import PostSerializer, PostListSerializer, CommentSerializer
+from .serializers import PostSerializer, PostListSerializer, CommentSerializer, get_comments_embed_limit
+from accounts.models import UserFollowing, lock_user
+from notifications.dispatch import notify, notify_many
+from social_media_api.batching import batched
+from social_media_api.conditional import ConditionalRetrieveMixin
+from social_media_api.fastpath import ValuesListMixin
+from social_media_api.pagination import KeysetPagination
+from social_media_api.renderers import StreamingListMixin
+from social_media_api.serializers import BulkIdsSerializer
 from .permissions import IsAuthorOrReadOnly
+from .signals import adjust_likes
+from . import ranking, search, timeline
 
 User = get_user_model()
 
 
-class PostViewSet(viewsets.ModelViewSet):
+def post_queryset_for(fields, user):
+    """
+    Return the posts queryset loading what a representation with ``fields`` needs.
+    
+    Joins, annotations and prefetches are only added for fields the response
+    renders, and large text columns left out with ``?fields=`` are deferred.
+    """
+    queryset = Post.objects.all()
+    if 'author' in fields:
+        queryset = queryset.select_related('author')
+    if 'is_liked' in fields:
+        queryset = queryset.with_engagement(user)
+    if 'comments' in fields:
+        embedded = (
+            Comment.objects.select_related('author')
+            .order_by('created_at', 'id')[:get_comments_embed_limit()]
+        )
+        queryset = queryset.prefetch_related(Prefetch('comments', queryset=embedded, to_attr='embedded_comments'))
+    deferred = [name for name in ('content', 'description') if name not in fields]
+    if deferred:
+        queryset = queryset.defer(*deferred)
+    return queryset
+
+
+class PostViewSet(ConditionalRetrieveMixin, ValuesListMixin, StreamingListMixin, viewsets.ModelViewSet):
     """ViewSet for managing posts with full CRUD operations using Django REST Framework."""
     
     queryset = Post.objects.all()
     permission_classes = [permissions.IsAuthenticated, IsAuthorOrReadOnly]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    # Full-text search runs last so its relevance order is not replaced by the default ordering
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, search.FullTextSearchFilter]
     filterset_fields = ['author']
-    search_fields = ['title', 'content']
     ordering_fields = ['created_at', 'updated_at', 'title']
     ordering = ['-created_at']
+    pagination_class = KeysetPagination
+    keyset_ordering = ('-created_at', '-id')
+    # Search results are ordered by relevance, so they are paged by number
+    page_number_query_params = ('search',)
     
     def get_serializer_class(self):
         """Return appropriate serializer based on action."""
@@ -32,20 +70,46 @@ class PostViewSet(viewsets.ModelViewSet):
     
     def get_queryset(self):
         """Filter queryset based on query parameters."""
-        queryset = Post.objects.select_related('author').prefetch_related('comments__author')
+        # Load only what the selected ?fields= / ?expand= representation renders
+        queryset = post_queryset_for(self.get_serializer().fields, self.request.user)
         
-        # Filter by title if provided
+        # Filter by words in the title if provided; whole words are matched, not substrings
         title_query = self.request.query_params.get('title', None)
         if title_query:
-            queryset = queryset.filter(title__icontains=title_query)
+            queryset = search.filter_matching(queryset, title_query, fields=['title'])
         
-        # Filter by content if provided
+        # Filter by words in the content if provided
         content_query = self.request.query_params.get('content', None)
         if content_query:
-            queryset = queryset.filter(content__icontains=content_query)
+            queryset = search.filter_matching(queryset, content_query, fields=['content'])
             
         return queryset
     
+    def get_conditional_fields(self):
+        """Return the validators of the rendered fields; ``updated_at`` covers the post's own columns."""
+        fields = self.get_serializer().fields
+        lookups = ['updated_at']
+        if 'likes_count' in fields:
+            lookups.append('likes_count')
+        if 'comment_count' in fields:
+            lookups.append('comments_count')
+        if 'comments' in fields:
+            # The count catches added and deleted comments, the latest update edited ones
+            lookups += ['comments_count', 'comments_changed_at']
+        if 'is_liked' in fields:
+            lookups.append('is_liked')
+        if 'author' in fields:
+            lookups += ['author__username', 'author__first_name', 'author__last_name']
+        return list(dict.fromkeys(lookups))
+    
+    def get_conditional_queryset(self):
+        """Annotate the related changes a post's representation shows."""
+        latest_comment = Comment.objects.filter(post=OuterRef('pk')).order_by('-updated_at').values('updated_at')[:1]
+        return Post.objects.annotate(
+            comments_changed_at=Subquery(latest_comment),
+            is_liked=Exists(Like.objects.filter(post=OuterRef('pk'), user=self.request.user)),
+        )
+    
     @action(detail=True, methods=['get'])
     def comments(self, request, pk=None):
         """Get all comments for a specific post."""
@@ -63,15 +127,17 @@ class PostViewSet(viewsets.ModelViewSet):
             serializer = self.get_serializer(page, many=True)
             return self.get_paginated_response(serializer.data)
         
-        serializer = self.get_serializer(posts, many=True)
-        return Response(serializer.data)
+        # Without pagination the list can be long; stream it instead of building it in memory
+        return self.stream_list(posts)
     
-    @action(detail=True, methods=['post'])
+    @action(detail=True, methods=['post'], permission_classes=[permissions.IsAuthenticated])
+    @transaction.atomic
     def like(self, request, pk=None):
         """Like a post."""
         post = self.get_object()
         
         # Check if user already liked this post
+        lock_user(request.user)
         existing_like = Like.objects.filter(post=post, user=request.user).first()
         if existing_like:
             return Response(
@@ -83,28 +149,21 @@ class PostViewSet(viewsets.ModelViewSet):
         like = Like.objects.create(post=post, user=request.user)
         
         # Create notification for post author (if not liking own post)
-        if post.author != request.user:
-            from notifications.models import Notification
-            content_type = ContentType.objects.get_for_model(post)
-            Notification.objects.create(
-                recipient=post.author,
-                actor=request.user,
-                verb='liked your post',
-                target_content_type=content_type,
-                target_object_id=post.id
-            )
+        notify(post.author, request.user, 'liked your post', post)
         
         return Response(
             {'message': 'Post liked successfully'}, 
             status=status.HTTP_201_CREATED
         )
     
-    @action(detail=True, methods=['delete'])
+    @action(detail=True, methods=['delete'], permission_classes=[permissions.IsAuthenticated])
+    @transaction.atomic
     def unlike(self, request, pk=None):
         """Unlike a post."""
         post = self.get_object()
         
         # Check if user has liked this post
+        lock_user(request.user)
         existing_like = Like.objects.filter(post=post, user=request.user).first()
         if not existing_like:
             return Response(
@@ -121,7 +180,7 @@ class PostViewSet(viewsets.ModelViewSet):
         )
 
 
-class CommentViewSet(viewsets.ModelViewSet):
+class CommentViewSet(StreamingListMixin, viewsets.ModelViewSet):
     """ViewSet for managing comments with full CRUD operations using Django REST Framework."""
     
     queryset = Comment.objects.all()
@@ -132,22 +191,16 @@ class CommentViewSet(viewsets.ModelViewSet):
     search_fields = ['content']
     ordering_fields = ['created_at', 'updated_at']
     ordering = ['created_at']
+    pagination_class = KeysetPagination
+    keyset_ordering = ('created_at', 'id')
     
+    @transaction.atomic
     def perform_create(self, serializer):
         """Override to create notification when comment is created."""
         comment = serializer.save(author=self.request.user)
         
         # Create notification for post author (if not commenting on own post)
-        if comment.post.author != self.request.user:
-            from notifications.models import Notification
-            content_type = ContentType.objects.get_for_model(comment)
-            Notification.objects.create(
-                recipient=comment.post.author,
-                actor=self.request.user,
-                verb='commented on your post',
-                target_content_type=content_type,
-                target_object_id=comment.id
-            )
+        notify(comment.post.author, self.request.user, 'commented on your post', comment)
     
     def get_queryset(self):
         """Filter queryset based on query parameters."""
@@ -169,45 +222,92 @@ class CommentViewSet(viewsets.ModelViewSet):
             serializer = self.get_serializer(page, many=True)
             return self.get_paginated_response(serializer.data)
         
-        serializer = self.get_serializer(comments, many=True)
-        return Response(serializer.data)
+        return self.stream_list(comments)
+
 
+class FeedView(ValuesListMixin, generics.ListAPIView):
+    """Feed view that shows posts from users that the current user follows.
 
-class FeedView(generics.ListAPIView):
-    """Feed view that shows posts from users that the current user follows."""
+    Pages are read from the user's materialized timeline (see ``posts.timeline``)
+    rather than by joining and sorting every followed author's posts. With
+    ``?mode=ranked`` posts are ordered by their stored engagement score
+    instead (see ``posts.ranking``).
+    """
     
     serializer_class = PostListSerializer
     permission_classes = [permissions.IsAuthenticated]
-    filter_backends = [filters.OrderingFilter]
-    ordering = ['-created_at']
+    pagination_class = KeysetPagination
+    keyset_model = Post
+    
+    @property
+    def ranked(self):
+        return self.request.query_params.get('mode') == 'ranked'
+    
+    @property
+    def keyset_ordering(self):
+        return ('-rank_score', '-id') if self.ranked else ('-created_at', '-id')
     
     def get_queryset(self):
-        """Return posts from users that the current user follows."""
-        user = self.request.user
-        
-        # Get users that the current user follows
-        following_users = user.following.all()
-        
-        # Get posts from those users, ordered by creation date (most recent first)
-        queryset = Post.objects.filter(author__in=following_users).order_by('-created_at').select_related('author').prefetch_related('comments__author')
-        
-        return queryset
+        """Return the queryset used to load the posts of a feed page."""
+        return post_queryset_for(self.get_serializer().fields, self.request.user)
+    
+    def get_ranked_queryset(self):
+        """Return the followed authors' posts for a ranked page, read in ``posts_post_rank`` index order."""
+        # UserFollowing rows store the followed user in ``user`` and the follower in ``following_user``
+        followed = UserFollowing.objects.filter(following_user=self.request.user).values('user_id')
+        return self.get_queryset().filter(author__in=followed, rank_score__gte=ranking.score_floor())
+    
+    def get_feed_post_ids(self):
+        """Return the ids of the posts in the current user's feed, newest first."""
+        entries = timeline.get_feed_entries(self.request.user, limit=timeline.get_max_length())
+        return [post_id for _, post_id in entries]
+    
+    def load_posts(self, post_ids, fast=None):
+        """Fetch the posts, or ``fast`` rows, for ``post_ids`` preserving the timeline order."""
+        if fast is None:
+            posts = self.get_queryset().in_bulk(post_ids)
+        else:
+            posts = {row['id']: row for row in fast.values(self.get_queryset().filter(pk__in=post_ids), 'id')}
+        return [posts[post_id] for post_id in post_ids if post_id in posts]
+    
+    def render_posts(self, posts, fast=None):
+        if fast is None:
+            return self.get_serializer(posts, many=True).data
+        return fast.render(posts)
         
     def list(self, request, *args, **kwargs):
         """Override list to provide additional context in response."""
-        queryset = self.filter_queryset(self.get_queryset())
+        fast = self.get_values_serializer()
+        if self.ranked:
+            queryset = self.get_ranked_queryset()
+            if fast is not None:
+                queryset = fast.values(queryset, *self.get_keyset_lookups())
+            page = self.paginate_queryset(queryset)
+            return self.get_paginated_response(self.render_posts(page, fast))
+        
+        paginator = self.paginator
+        if isinstance(paginator, KeysetPagination) and not paginator.use_page_numbers(request, self):
+            # Read one page straight from the timeline store, keyed on (created_at, id)
+            entries = paginator.paginate_entries(
+                lambda limit, before: timeline.get_feed_entries(request.user, limit, before),
+                request,
+                self,
+            )
+            posts = self.load_posts([post_id for _, post_id in entries], fast)
+            return self.get_paginated_response(self.render_posts(posts, fast))
+        
+        post_ids = self.get_feed_post_ids()
         
-        page = self.paginate_queryset(queryset)
+        page = self.paginate_queryset(post_ids)
         if page is not None:
-            serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
+            return self.get_paginated_response(self.render_posts(self.load_posts(page, fast), fast))
 
-        serializer = self.get_serializer(queryset, many=True)
+        results = self.render_posts(self.load_posts(post_ids, fast), fast)
         
         # Add additional context
         response_data = {
-            'count': queryset.count(),
-            'results': serializer.data
+            'count': len(post_ids),
+            'results': results
         }
         
         return Response(response_data)
@@ -217,11 +317,13 @@ class LikePostView(generics.GenericAPIView):
     """View to handle liking a post."""
     permission_classes = [permissions.IsAuthenticated]
     
+    @transaction.atomic
     def post(self, request, pk):
         """Like a post."""
         post = generics.get_object_or_404(Post, pk=pk)
         
         # Use get_or_create to handle duplicate likes
+        lock_user(request.user)
         like, created = Like.objects.get_or_create(user=request.user, post=post)
         
         if not created:
@@ -231,16 +333,7 @@ class LikePostView(generics.GenericAPIView):
             )
         
         # Create notification for post author (if not liking own post)
-        if post.author != request.user:
-            from notifications.models import Notification
-            content_type = ContentType.objects.get_for_model(post)
-            Notification.objects.create(
-                recipient=post.author,
-                actor=request.user,
-                verb='liked your post',
-                target_content_type=content_type,
-                target_object_id=post.id
-            )
+        notify(post.author, request.user, 'liked your post', post)
         
         return Response(
             {'message': 'Post liked successfully'}, 
@@ -252,11 +345,13 @@ class UnlikePostView(generics.GenericAPIView):
     """View to handle unliking a post."""
     permission_classes = [permissions.IsAuthenticated]
     
+    @transaction.atomic
     def post(self, request, pk):
         """Unlike a post."""
         post = generics.get_object_or_404(Post, pk=pk)
         
         # Check if user has liked this post
+        lock_user(request.user)
         try:
             like = Like.objects.get(post=post, user=request.user)
             like.delete()
@@ -269,3 +364,63 @@ class UnlikePostView(generics.GenericAPIView):
                 {'message': 'You have not liked this post'}, 
                 status=status.HTTP_400_BAD_REQUEST
             )
+
+
+class BulkLikeView(generics.GenericAPIView):
+    """Like (POST) or unlike (DELETE) up to ``BULK_ACTION_MAX_IDS`` posts in one request.
+    
+    Used by import tools and clients replaying offline actions. Each call
+    runs a fixed number of queries whatever the number of posts.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = BulkIdsSerializer
+    
+    def get_post_ids(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return serializer.validated_data['ids']
+    
+    @transaction.atomic
+    def post(self, request):
+        """Like every existing post in ``ids``."""
+        post_ids = self.get_post_ids(request)
+        # Holding the lock, no other like by this user can land between the read and the insert,
+        # so ``liked`` is exactly the rows inserted below
+        lock_user(request.user)
+        posts = Post.objects.only('id', 'author_id').in_bulk(post_ids)
+        already_liked = set(
+            Like.objects.filter(user=request.user, post_id__in=posts).values_list('post_id', flat=True)
+        )
+        liked = [post_id for post_id in post_ids if post_id in posts and post_id not in already_liked]
+        
+        # bulk_create sends no post_save signals, so the counters are bumped here in one UPDATE
+        Like.objects.bulk_create(
+            [Like(user=request.user, post_id=post_id) for post_id in liked], ignore_conflicts=True
+        )
+        adjust_likes(liked, 1)
+        notify_many(
+            request.user, 'liked your post', [(posts[post_id].author_id, posts[post_id]) for post_id in liked]
+        )
+        
+        return Response({
+            'liked': liked,
+            'already_liked': [post_id for post_id in post_ids if post_id in already_liked],
+            'missing': [post_id for post_id in post_ids if post_id not in posts],
+        })
+    
+    @transaction.atomic
+    def delete(self, request):
+        """Remove the current user's likes from every post in ``ids``."""
+        post_ids = self.get_post_ids(request)
+        lock_user(request.user)
+        likes = Like.objects.filter(user=request.user, post_id__in=post_ids)
+        unliked = set(likes.values_list('post_id', flat=True))
+        
+        # The per-row post_delete counter updates are skipped and applied below in one UPDATE
+        batched(likes).delete()
+        adjust_likes(unliked, -1)
+        
+        return Response({
+            'unliked': [post_id for post_id in post_ids if post_id in unliked],
+            'not_liked': [post_id for post_id in post_ids if post_id not in unliked],
+        })
@@ -36,4 +36,4 @@ echo "Deployment completed successfully!"
 
 # Start the server
 echo "Starting server..."
-gunicorn config.wsgi:application --config gunicorn.conf.py
\ No newline at end of file
+gunicorn social_media_api.asgi:application --config gunicorn.conf.py
\ No newline at end of file
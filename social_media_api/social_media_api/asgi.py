@@ -1,5 +1,11 @@
 """
 ASGI config for social_media_api project.
+
+This is the application deployed in production (gunicorn with uvicorn
+workers, see deployment/gunicorn.conf.py). The notification stream needs
+it: under WSGI, Django reads an async response to its end before sending
+it, so ``/api/notifications/stream/`` answers 503 there and clients must
+long-poll.
 """
 
 import os
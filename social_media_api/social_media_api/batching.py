@@ -0,0 +1,21 @@
+"""
+Bulk deletes whose side effects are applied once per batch.
+
+``QuerySet.delete()`` sends ``post_delete`` for every row it removes, and the
+receivers keeping counters, scores and timelines in step run a few queries
+each, so deleting N rows costs a few N queries. The bulk endpoints delete
+``batched(queryset)`` instead: per-row receivers check ``is_batched(origin)``
+and return early, and the endpoint applies the same changes once for all
+rows.
+"""
+
+
+def batched(queryset):
+    """Mark ``queryset`` so that per-row ``post_delete`` receivers skip its rows; return it."""
+    queryset.batched = True
+    return queryset
+
+
+def is_batched(origin):
+    """Return True when ``origin``, the ``post_delete`` argument, is a ``batched`` queryset."""
+    return getattr(origin, 'batched', False)
@@ -0,0 +1,228 @@
+"""
+Compiled, read-only rendering for hot list endpoints.
+
+For every field of every row, a DRF serializer resolves the attribute on a
+model instance, checks for ``SkipField`` and calls ``to_representation``.
+Nested serializers repeat that for each related object. Once the queries
+are optimized, this dominates the CPU time of list endpoints.
+
+``ValuesSerializer`` compiles the fields a serializer would render, after
+``?fields=``/``?expand=`` have been applied, into ``.values()`` lookups and
+one accessor per field. Rows are then turned into plain dicts without
+building model instances. Fields are emitted in the same order and
+converted with the same DRF field objects, so the rendered JSON is
+byte-identical to the serializer's.
+
+A subclass names the serializer it mirrors in ``serializer_class``:
+
+- Model fields, ``ReadOnlyField`` and nested serializers with a registered
+  ``ValuesSerializer`` compile automatically. ``sources`` maps fields whose
+  source is a property to the column behind it.
+- A ``SerializerMethodField`` needs a ``get_<name>(row)`` method reading
+  the lookups listed in ``method_lookups[name]``.
+- ``prepare(rows)`` may load data for a whole page in bulk before the rows
+  are rendered.
+
+Anything else raises ``Unsupported`` and ``ValuesListMixin`` falls back to
+the regular serializer. ``FAST_LIST_RENDERING = False`` turns the fast path
+off.
+"""
+
+from operator import itemgetter
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.utils import timezone
+from rest_framework import fields as drf_fields
+from rest_framework import serializers
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+# DRF field types whose to_representation returns ``.values()`` output unchanged
+IDENTITY_FIELDS = (
+    drf_fields.ReadOnlyField, drf_fields.CharField, drf_fields.IntegerField, drf_fields.BooleanField,
+)
+
+# Serializer class -> ValuesSerializer class, used to compile nested serializers
+registry = {}
+
+
+class Unsupported(Exception):
+    """The serializer has a field the fast path cannot render identically."""
+
+
+def fast_rendering_enabled():
+    return getattr(settings, 'FAST_LIST_RENDERING', True)
+
+
+def file_url(field, model_field, request):
+    """Return a converter rendering a file name like DRF's ``FileField`` renders a ``FieldFile``."""
+    use_url = getattr(field, 'use_url', api_settings.UPLOADED_FILES_USE_URL)
+
+    def convert(name):
+        if not name:
+            return None
+        if not use_url:
+            return name
+        url = model_field.storage.url(name)
+        return request.build_absolute_uri(url) if request is not None else url
+    return convert
+
+
+def iso_datetime(field):
+    """
+    Return a converter rendering aware datetimes like ``field``, or None.
+    
+    DRF resolves the field's timezone for every value; it does not change
+    within a request, so it is resolved once here.
+    """
+    output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+    field_timezone = field.timezone if hasattr(field, 'timezone') else field.default_timezone()
+    if output_format is None or output_format.lower() != drf_fields.ISO_8601 or field_timezone is None:
+        return None
+    to_representation = field.to_representation
+
+    def convert(value):
+        if value is None or timezone.is_naive(value):
+            return to_representation(value)
+        value = value.astimezone(field_timezone).isoformat()
+        if value.endswith('+00:00'):
+            value = value[:-6] + 'Z'
+        return value
+    return convert
+
+
+class ValuesSerializerMeta(type):
+    def __new__(mcs, name, bases, attrs):
+        cls = super().__new__(mcs, name, bases, attrs)
+        if attrs.get('serializer_class') is not None:
+            registry[attrs['serializer_class']] = cls
+        return cls
+
+
+class ValuesSerializer(metaclass=ValuesSerializerMeta):
+    """Render ``.values()`` rows exactly as ``serializer_class`` renders instances."""
+
+    serializer_class = None
+    # Output field -> lookup, for fields whose source is not a column (e.g. a property)
+    sources = {}
+    # Method field -> lookups its ``get_<name>`` reads
+    method_lookups = {}
+
+    def __init__(self, serializer, prefix=''):
+        self.serializer = serializer
+        self.context = serializer.context
+        self.prefix = prefix
+        self.model = serializer.Meta.model
+        self.lookups = []
+        self.accessors = [(name, self.compile_field(name, field)) for name, field in serializer.fields.items()]
+
+    @classmethod
+    def for_serializer(cls, serializer):
+        """Compile ``serializer`` (a bound instance); raises ``Unsupported``."""
+        if serializer.__class__ not in registry:
+            raise Unsupported(serializer.__class__.__name__)
+        return registry[serializer.__class__](serializer)
+
+    def lookup(self, path):
+        path = self.prefix + path
+        if path not in self.lookups:
+            self.lookups.append(path)
+        return path
+
+    def compile_field(self, name, field):
+        if isinstance(field, serializers.SerializerMethodField):
+            method = getattr(self, f'get_{name}', None)
+            if method is None:
+                raise Unsupported(name)
+            for path in self.method_lookups.get(name, ()):
+                self.lookup(path)
+            return method
+
+        if isinstance(field, serializers.BaseSerializer):
+            nested_class = registry.get(field.__class__)
+            if nested_class is None or getattr(field, 'many', False):
+                raise Unsupported(name)
+            nested = nested_class(field, prefix=f'{self.prefix}{field.source}__')
+            # A null foreign key renders as None, like DRF does
+            pk_path = nested.lookup('pk')
+            self.lookups.extend(path for path in nested.lookups if path not in self.lookups)
+
+            def render_nested(row):
+                return None if row[pk_path] is None else nested.render_row(row)
+            return render_nested
+
+        source = self.sources.get(name, field.source)
+        try:
+            model_field = self.model._meta.get_field(source)
+        except FieldDoesNotExist:
+            raise Unsupported(name)
+        if model_field.is_relation:
+            raise Unsupported(name)
+        path = self.lookup(source)
+        get = itemgetter(path)
+
+        if isinstance(field, serializers.FileField):
+            convert = file_url(field, model_field, self.context.get('request'))
+            return lambda row: convert(get(row))
+        if isinstance(field, IDENTITY_FIELDS):
+            return get
+        if isinstance(field, serializers.DateTimeField):
+            convert_datetime = iso_datetime(field)
+            if convert_datetime is not None:
+                return lambda row: convert_datetime(get(row))
+        to_representation = field.to_representation
+
+        def convert_field(row):
+            value = get(row)
+            return None if value is None else to_representation(value)
+        return convert_field
+
+    def values(self, queryset, *extra):
+        """Return ``queryset`` as the ``.values()`` rows the accessors read, plus ``extra`` lookups."""
+        # Prefetches attach to model instances; the accessors or prepare() load that data instead
+        queryset = queryset.prefetch_related(None)
+        return queryset.values(*self.lookups, *[path for path in extra if path not in self.lookups])
+
+    def prepare(self, rows):
+        """Hook to load page-wide data before rendering."""
+
+    def render_row(self, row):
+        return {name: accessor(row) for name, accessor in self.accessors}
+
+    def render(self, rows):
+        rows = list(rows)
+        self.prepare(rows)
+        render_row = self.render_row
+        return [render_row(row) for row in rows]
+
+
+class ValuesListMixin:
+    """
+    List view mixin rendering pages with the serializer's ``ValuesSerializer``.
+
+    ``list()`` falls back to the regular serializer when the fast path is
+    off or the selected fields cannot be compiled.
+    """
+
+    def get_values_serializer(self):
+        if not fast_rendering_enabled():
+            return None
+        try:
+            return ValuesSerializer.for_serializer(self.get_serializer())
+        except Unsupported:
+            return None
+
+    def get_keyset_lookups(self):
+        """Lookups the paginator reads from the last row of a page."""
+        return [field.lstrip('-') for field in getattr(self, 'keyset_ordering', ())]
+
+    def list(self, request, *args, **kwargs):
+        fast = self.get_values_serializer()
+        if fast is None:
+            return super().list(request, *args, **kwargs)
+        queryset = fast.values(self.filter_queryset(self.get_queryset()), *self.get_keyset_lookups())
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(fast.render(page))
+        return Response(fast.render(queryset))
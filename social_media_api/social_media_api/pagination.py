@@ -0,0 +1,190 @@
+"""
+Keyset (cursor) pagination shared by the list endpoints.
+
+Page-number pagination issues a ``COUNT(*)`` and an ``OFFSET`` scan, both of
+which get slower the deeper a client pages. Keyset pagination instead filters
+on the last row seen, e.g. ``(created_at, id) < (:created_at, :id)``, which is
+a single index range scan on every page.
+
+Views pick their sort key with a ``keyset_ordering`` attribute such as
+``('-created_at', '-id')``. The last field must be unique so the position is
+unambiguous. Clients that still need page numbers can send ``?page=N`` (or an
+``ordering`` other than the keyset) to fall back to ``PageNumberPagination``;
+views can list further such parameters in ``page_number_query_params``.
+"""
+
+import base64
+import binascii
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class PageNumberFallbackPagination(PageNumberPagination):
+    """Page-number pagination used when a client asks for ``?page=N``."""
+
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class KeysetPagination(BasePagination):
+    """Forward-only keyset pagination with opaque cursors."""
+
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+    default_ordering = ('-created_at', '-id')
+    fallback_class = PageNumberFallbackPagination
+
+    def __init__(self):
+        self.fallback = None
+
+    # Mode selection
+
+    def use_page_numbers(self, request, view=None):
+        """Return True when the client asked for page-number pagination."""
+        ordering = request.query_params.get('ordering')
+        return (
+            self.fallback_class.page_query_param in request.query_params
+            or (ordering is not None and ordering != self.get_ordering(view)[0])
+            # Parameters whose results have their own order, such as search relevance
+            or any(param in request.query_params for param in getattr(view, 'page_number_query_params', ()))
+        )
+
+    def get_ordering(self, view):
+        ordering = tuple(getattr(view, 'keyset_ordering', self.default_ordering))
+        descending = {field.startswith('-') for field in ordering}
+        assert len(descending) == 1, 'Keyset ordering fields must share one direction.'
+        return ordering
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if size <= 0:
+            return self.page_size
+        return min(size, self.max_page_size)
+
+    # Cursor encoding
+
+    def encode_cursor(self, position):
+        values = [value.isoformat() if hasattr(value, 'isoformat') else value for value in position]
+        payload = json.dumps(values, separators=(',', ':')).encode('utf-8')
+        return base64.urlsafe_b64encode(payload).decode('ascii').rstrip('=')
+
+    def decode_cursor(self, request, fields, model=None):
+        """Return the position tuple carried by the request's cursor, or None."""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            padded = encoded + '=' * (-len(encoded) % 4)
+            values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8'))
+            if not isinstance(values, list) or len(values) != len(fields):
+                raise ValueError
+            if model is not None:
+                values = [
+                    model._meta.get_field(name).to_python(value)
+                    for name, value in zip(fields, values)
+                ]
+        except (TypeError, ValueError, binascii.Error, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        if any(value is None for value in values):
+            raise NotFound(self.invalid_cursor_message)
+        return tuple(values)
+
+    # Pagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        if self.use_page_numbers(request, view):
+            self.fallback = self.fallback_class()
+            return self.fallback.paginate_queryset(queryset, request, view)
+
+        ordering = self.get_ordering(view)
+        fields = [field.lstrip('-') for field in ordering]
+        self.page_size_value = self.get_page_size(request)
+
+        position = self.decode_cursor(request, fields, queryset.model)
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self.after(fields, position, ordering[0].startswith('-')))
+
+        rows = list(queryset[:self.page_size_value + 1])
+        self.has_next = len(rows) > self.page_size_value
+        rows = rows[:self.page_size_value]
+        if rows:
+            # Rows are model instances, or dicts when the view renders ``.values()``
+            last = rows[-1]
+            if isinstance(last, dict):
+                self.last_position = tuple(last[field] for field in fields)
+            else:
+                self.last_position = tuple(getattr(last, field) for field in fields)
+        return rows
+
+    def paginate_entries(self, fetch, request, view=None):
+        """
+        Paginate a store that is not a queryset.
+
+        ``fetch(limit, before)`` must return position tuples in descending
+        order, strictly older than ``before`` when it is given.
+        """
+        self.request = request
+        ordering = self.get_ordering(view)
+        model = getattr(view, 'keyset_model', None)
+        fields = [field.lstrip('-') for field in ordering]
+        self.page_size_value = self.get_page_size(request)
+
+        position = self.decode_cursor(request, fields, model)
+        entries = list(fetch(self.page_size_value + 1, position))
+        self.has_next = len(entries) > self.page_size_value
+        entries = entries[:self.page_size_value]
+        if entries:
+            self.last_position = tuple(entries[-1])
+        return entries
+
+    @staticmethod
+    def after(fields, position, descending):
+        """Build the ``(f1, f2, ...) > / < position`` row comparison as a Q object."""
+        lookup = 'lt' if descending else 'gt'
+        condition = Q()
+        for index, field in enumerate(fields):
+            term = Q(**{f'{field}__{lookup}': position[index]})
+            for previous, value in zip(fields[:index], position[:index]):
+                term &= Q(**{previous: value})
+            condition |= term
+        return condition
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.last_position))
+
+    def get_paginated_response(self, data):
+        if self.fallback is not None:
+            return self.fallback.get_paginated_response(data)
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
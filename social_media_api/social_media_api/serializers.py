@@ -0,0 +1,67 @@
+"""
+Serializers shared by several apps.
+"""
+
+from django.conf import settings
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+
+DEFAULT_BULK_MAX_IDS = 100
+
+
+def get_bulk_max_ids():
+    return getattr(settings, 'BULK_ACTION_MAX_IDS', DEFAULT_BULK_MAX_IDS)
+
+
+class BulkIdsSerializer(serializers.Serializer):
+    """Validate the ``ids`` list sent to the bulk action endpoints."""
+
+    ids = serializers.ListField(child=serializers.IntegerField(min_value=1), allow_empty=False)
+
+    def validate_ids(self, value):
+        max_ids = get_bulk_max_ids()
+        if len(value) > max_ids:
+            raise serializers.ValidationError(f'At most {max_ids} ids can be sent at once.')
+        # Duplicates are dropped, keeping the order the client sent
+        return list(dict.fromkeys(value))
+
+
+def parse_field_list(value):
+    """Split a comma-separated query parameter into a set of names."""
+    return {name.strip() for name in (value or '').split(',') if name.strip()}
+
+
+class DynamicFieldsMixin:
+    """
+    Sparse fieldsets and expansion for read requests.
+
+    ``?fields=id,title`` keeps only the named fields. Fields listed in
+    ``Meta.expandable_fields`` are left out unless named in ``?expand=``.
+    Only the top-level serializer of a response (or the items of a list) is
+    affected; nested serializers always render in full. Views can read
+    ``serializer.fields`` to load only the data the response will contain.
+    """
+
+    fields_query_param = 'fields'
+    expand_query_param = 'expand'
+
+    def _is_response_root(self):
+        parent = self.parent
+        return parent is None or (isinstance(parent, serializers.ListSerializer) and parent.parent is None)
+
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get('request')
+        applies = request is not None and request.method in SAFE_METHODS and self._is_response_root()
+
+        expand = parse_field_list(request.query_params.get(self.expand_query_param)) if applies else set()
+        for name in getattr(self.Meta, 'expandable_fields', ()):
+            if name not in expand:
+                fields.pop(name, None)
+
+        only = parse_field_list(request.query_params.get(self.fields_query_param)) if applies else set()
+        if only:
+            for name in list(fields):
+                if name not in only:
+                    fields.pop(name)
+        return fields
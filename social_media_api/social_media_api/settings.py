@@ -48,7 +48,7 @@ AUTH_USER_MODEL = 'accounts.CustomUser'
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
-    "whitenoise.middleware.WhiteNoiseMiddleware",  # For static files in production
+    "social_media_api.middleware.AsyncWhiteNoiseMiddleware",  # For static files in production; async-capable WhiteNoise
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -153,10 +153,57 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        # Uses orjson when it is installed
+        'social_media_api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10
 }
 
+# Comments embedded in a post representation; the rest are paged at the post's comments_url
+POST_COMMENTS_EMBED_LIMIT = int(os.environ.get('POST_COMMENTS_EMBED_LIMIT', 10))
+
+# Render post, feed and notification lists from .values() rows (see social_media_api.fastpath)
+FAST_LIST_RENDERING = os.environ.get('FAST_LIST_RENDERING', 'True').lower() == 'true'
+
+# Largest number of ids accepted by the bulk like/follow endpoints
+BULK_ACTION_MAX_IDS = int(os.environ.get('BULK_ACTION_MAX_IDS', 100))
+
+# Who-to-follow suggestions computed by `manage.py compute_suggestions`
+SUGGESTIONS_TOP_K = int(os.environ.get('SUGGESTIONS_TOP_K', 20))
+SUGGESTIONS_CHUNK_SIZE = int(os.environ.get('SUGGESTIONS_CHUNK_SIZE', 500))
+
+# Home timeline (fan-out-on-write) settings
+TIMELINE_BACKEND = os.environ.get('TIMELINE_BACKEND', 'posts.timeline.DatabaseTimelineBackend')
+TIMELINE_MAX_LENGTH = int(os.environ.get('TIMELINE_MAX_LENGTH', 800))
+# Authors with more followers than this are merged into feeds at read time
+TIMELINE_FANOUT_LIMIT = int(os.environ.get('TIMELINE_FANOUT_LIMIT', 5000))
+
+# Ranked feed (?mode=ranked): seconds of age that cost a tenfold engagement, comment weight, read window
+FEED_RANK_GRAVITY = int(os.environ.get('FEED_RANK_GRAVITY', 45000))
+FEED_RANK_COMMENT_WEIGHT = int(os.environ.get('FEED_RANK_COMMENT_WEIGHT', 2))
+FEED_RANK_WINDOW = int(os.environ.get('FEED_RANK_WINDOW', 7 * 24 * 3600))
+
+# Full-text search: 'auto' picks PostgreSQL tsvector, SQLite FTS5 or the portable inverted index
+SEARCH_BACKEND = os.environ.get('SEARCH_BACKEND', 'auto')
+SEARCH_MAX_RESULTS = int(os.environ.get('SEARCH_MAX_RESULTS', 500))
+
+# Notification dispatcher: 'thread' writes in batches from a background thread, 'sync' writes on commit
+NOTIFICATIONS_DISPATCHER = {
+    'MODE': os.environ.get('NOTIFICATIONS_DISPATCH_MODE', 'thread'),
+    'BATCH_SIZE': int(os.environ.get('NOTIFICATIONS_BATCH_SIZE', 100)),
+    'FLUSH_INTERVAL': float(os.environ.get('NOTIFICATIONS_FLUSH_INTERVAL', 1.0)),
+}
+
+# Notification streaming (SSE / long-poll); LocalHub only reaches clients connected to the same process
+NOTIFICATIONS_STREAM = {
+    'HUB': os.environ.get('NOTIFICATIONS_HUB', 'notifications.hub.LocalHub'),
+    'HEARTBEAT': int(os.environ.get('NOTIFICATIONS_STREAM_HEARTBEAT', 15)),
+    'LONG_POLL_TIMEOUT': int(os.environ.get('NOTIFICATIONS_LONG_POLL_TIMEOUT', 25)),
+}
+
 # Internationalization
 LANGUAGE_CODE = "en-us"
 TIME_ZONE = "Africa/Nairobi"